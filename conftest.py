@@ -5,6 +5,7 @@ import json
 from utils.api_client import APIClient
 from utils.validator import Validator
 from helpers.car_ads import get_session_ad_metadata
+from helpers.ad_pool import AdPool
 from dotenv import load_dotenv
 import helpers.auth
 from helpers.auth import get_auth_token
@@ -116,3 +117,11 @@ def load_payload():
         with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
     return _loader
+
+
+@pytest.fixture
+def pooled_ad(api_client, validator, load_payload):
+    """Lease a long-lived ad from the per-account pool; it is recycled on teardown."""
+    pool = AdPool(api_client, validator, load_payload)
+    with pool.lease() as ad:
+        yield ad
@@ -16,6 +16,7 @@ from .auth import (  # noqa: F401
 )
 from .car_ads import (  # noqa: F401
     edit_payload_check,
+    edit_payload_check_many,
     close_used_car_existing,
     edit_used_car,
     edit_used_car_existing,
@@ -24,6 +25,7 @@ from .car_ads import (  # noqa: F401
     feature_used_car_with_credit,
     feature_used_car_with_payment,
     post_used_car,
+    posted_ad_metadata,
     get_ad_ids,
     get_ad_ref,
     get_session_ad_metadata,
@@ -33,7 +35,10 @@ from .car_ads import (  # noqa: F401
     upload_ad_picture,
     # verify_live_or_pending,
     wait_for_ad_state,
-    upsell_product_validation
+    upsell_bucket,
+    upsell_ladder_sweep,
+    upsell_product_validation,
+    boost_product_validation,
 )
 from .new_cars import (  # noqa: F401
     fetch_new_make_details,
@@ -55,6 +60,7 @@ from .lead_forms import (  # noqa: F401
     update_carsure_inspection_request,
     validate_checkout_response,
     verify_auction_sheet,
+    verify_auction_sheets_batch,
     create_auction_sheet_request,
     fetch_auction_sheet_product_options,
     submit_car_insurance_lead,
@@ -62,12 +68,28 @@ from .lead_forms import (  # noqa: F401
     submit_car_finance_lead,
     submit_car_registration_transfer_lead,
     update_car_registration_transfer_lead,
+    run_lead_pipeline,
+    warm_reference_data,
+    LeadPayloadGenerator,
+    run_lead_load,
 )
 from .my_ads import (
     fetch_my_active_ads,
     fetch_my_pending_ads,
     fetch_my_removed_ads,
+    MyAdsIndex,
+    build_my_ads_index,
 )  # noqa: F401
+from .ad_pool import AdPool  # noqa: F401
+from .payload_factory import (  # noqa: F401
+    UsedCarPayloadFactory,
+    post_used_cars_bulk,
+)
+from .ad_state_watcher import (  # noqa: F401
+    AdStateWatcher,
+    get_ad_state_watcher,
+    stop_ad_state_watchers,
+)
 from .number_verification import (  # noqa: F401
     add_mobile_number,
     clear_mobile_number,
@@ -78,6 +100,11 @@ from .search import (  # noqa: F401
     search_request,
     validate_filters_applied
 )
+from .search_index import (  # noqa: F401
+    SearchFacetIndex,
+    crawl_search_index,
+    assert_search_counts_consistent,
+)
 
 __all__ = [
     "get_auth_token",
@@ -91,6 +118,7 @@ __all__ = [
     "add_mobile_number",
     "clear_mobile_number",
     "edit_payload_check",
+    "edit_payload_check_many",
     "close_used_car_existing",
     "edit_used_car",
     "edit_used_car_existing",
@@ -99,6 +127,7 @@ __all__ = [
     "feature_used_car_with_credit",
     "feature_used_car_with_payment",
     "post_used_car",
+    "posted_ad_metadata",
     "get_session_ad_metadata",
     "get_ad_ref",
     "get_ad_ids",
@@ -124,6 +153,7 @@ __all__ = [
     "update_carsure_inspection_request",
     "validate_checkout_response",
     "verify_auction_sheet",
+    "verify_auction_sheets_batch",
     "create_auction_sheet_request",
     "fetch_auction_sheet_product_options",
     "submit_car_insurance_lead",
@@ -131,12 +161,30 @@ __all__ = [
     "submit_car_finance_lead",
     "submit_car_registration_transfer_lead",
     "update_car_registration_transfer_lead",
+    "run_lead_pipeline",
+    "warm_reference_data",
+    "LeadPayloadGenerator",
+    "run_lead_load",
     "fetch_my_active_ads",
     "fetch_my_pending_ads",
     "fetch_my_removed_ads",
+    "MyAdsIndex",
+    "build_my_ads_index",
+    "AdPool",
+    "AdStateWatcher",
+    "get_ad_state_watcher",
+    "stop_ad_state_watchers",
+    "UsedCarPayloadFactory",
+    "post_used_cars_bulk",
     "upsell_product_validation",
+    "boost_product_validation",
+    "upsell_bucket",
+    "upsell_ladder_sweep",
     "search_request",
-    "validate_filters_applied"
+    "validate_filters_applied",
+    "SearchFacetIndex",
+    "crawl_search_index",
+    "assert_search_counts_consistent",
 ]
 
 from .payment import (  # noqa: F401
@@ -148,6 +196,11 @@ from .payment import (  # noqa: F401
     product_upsell_request,
     get_user_credit
 )
+from .payment_poller import (  # noqa: F401
+    PaymentStatusPoller,
+    get_payment_poller,
+    stop_payment_pollers,
+)
 
 __all__.extend(
     [
@@ -157,6 +210,9 @@ __all__.extend(
         "initiate_jazz_cash",
         "payment_status",
         "product_upsell_request",
-        "get_user_credit"
+        "get_user_credit",
+        "PaymentStatusPoller",
+        "get_payment_poller",
+        "stop_payment_pollers",
     ]
 )
@@ -0,0 +1,114 @@
+"""
+Per-ad cache of ``/used-cars/{id}.json`` details responses.
+
+Several helpers resolve the same ad's id, price and listing id from its
+details page, so one lifecycle test used to issue three or four identical
+GETs. ``fetch_ad_details`` serves repeats from memory. Helpers that change an
+ad (edit, close, refresh, feature) call ``invalidate_ad_details`` so the next
+read sees the new state.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from helpers.shared import _extract_id_from_slug, _normalize_slug
+
+__all__ = [
+    "fetch_ad_details",
+    "invalidate_ad_details",
+    "peek_ad_details",
+    "clear_ad_details_cache",
+]
+
+DETAILS_TTL = float(os.getenv("AD_DETAILS_TTL", "300"))
+
+# (base_url, "id:<ad_id>" | "slug:<path>", api_version) -> (stored_at, ad_id, response)
+_DETAILS_CACHE: Dict[Tuple[str, str, str], Tuple[float, Optional[int], dict]] = {}
+_DETAILS_LOCK = threading.Lock()
+
+
+def _ref_key(ad_id: Optional[int], slug: Optional[str]) -> str:
+    if ad_id:
+        return f"id:{int(ad_id)}"
+    return f"slug:{_normalize_slug(slug, ensure_json_suffix=True)}"
+
+
+def _resolved_ad_id(body: dict) -> Optional[int]:
+    listing = body.get("ad_listing") or body.get("used_car") or body
+    value = listing.get("ad_id") if isinstance(listing, dict) else None
+    value = value or body.get("ad_id")
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def fetch_ad_details(
+    api_client,
+    ad_id: Optional[int] = None,
+    slug: Optional[str] = None,
+    api_version: str = "22",
+    refresh: bool = False,
+) -> dict:
+    """
+    GET an ad's details by id (preferred) or slug, returning the APIClient response dict.
+
+    Successful responses are cached for ``AD_DETAILS_TTL`` seconds; ``refresh``
+    forces a new request.
+    """
+    if not ad_id and not slug:
+        raise AssertionError("Need ad_id or slug to fetch ad details.")
+
+    cache_key = (api_client.base_url, _ref_key(ad_id, slug), str(api_version))
+
+    if not refresh:
+        with _DETAILS_LOCK:
+            cached = _DETAILS_CACHE.get(cache_key)
+        if cached and time.time() - cached[0] < DETAILS_TTL:
+            return cached[2]
+
+    endpoint = f"/used-cars/{int(ad_id)}.json" if ad_id else _normalize_slug(slug, ensure_json_suffix=True)
+    resp = api_client.request("GET", endpoint, params={"api_version": api_version})
+
+    if resp.get("status_code") == 200:
+        body = resp.get("json") or {}
+        resolved = int(ad_id) if ad_id else (_resolved_ad_id(body) or _extract_id_from_slug(slug or ""))
+        now = time.time()
+        with _DETAILS_LOCK:
+            _DETAILS_CACHE[cache_key] = (now, resolved, resp)
+            if resolved and not ad_id:
+                _DETAILS_CACHE[(api_client.base_url, f"id:{resolved}", str(api_version))] = (now, resolved, resp)
+    return resp
+
+
+def peek_ad_details(api_client, ad_id: int, api_version: str = "22") -> Optional[dict]:
+    """Return the cached details response for ``ad_id`` without making a request."""
+    with _DETAILS_LOCK:
+        cached = _DETAILS_CACHE.get((api_client.base_url, _ref_key(ad_id, None), str(api_version)))
+    if cached and time.time() - cached[0] < DETAILS_TTL:
+        return cached[2]
+    return None
+
+
+def invalidate_ad_details(ad_id: Optional[int] = None, slug: Optional[str] = None) -> int:
+    """Drop every cached details response for the ad (all api versions); returns entries removed."""
+    target_id = int(ad_id) if ad_id else _extract_id_from_slug(slug or "")
+    slug_key = _ref_key(None, slug) if slug else None
+    with _DETAILS_LOCK:
+        stale = [
+            key
+            for key, (_, cached_id, _) in _DETAILS_CACHE.items()
+            if (target_id is not None and cached_id == target_id) or (slug_key and key[1] == slug_key)
+        ]
+        for key in stale:
+            _DETAILS_CACHE.pop(key, None)
+    return len(stale)
+
+
+def clear_ad_details_cache() -> None:
+    with _DETAILS_LOCK:
+        _DETAILS_CACHE.clear()
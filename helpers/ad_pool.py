@@ -0,0 +1,286 @@
+"""
+Pool of long-lived test ads, persisted across runs.
+
+Posting a fresh ad costs picture uploads, moderation time and posting quota.
+The pool keeps a registry of ads per account in ``AD_POOL_PATH`` (default
+``.cache/ad_pool.json``). Tests check an ad out and use it, then check it back
+in. On check-in the ad is recycled to a known state (close, then reactivate).
+A new ad is only posted when every pooled ad is in use.
+
+Entries are keyed by the account the client is actually logged in as (its
+user id), never by environment settings, so a client for another account
+cannot lease or drop someone else's ads. The registry is guarded by an
+``flock`` so pytest-xdist workers can share it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+import helpers.car_ads as car_ads
+from helpers.ad_details import fetch_ad_details
+from helpers.my_ads import MY_ADS_STATES, MyAdsIndex, build_my_ads_index, fetch_my_ads_state
+
+__all__ = [
+    "AdPool",
+    "ad_pool_account",
+]
+
+AD_POOL_PATH = Path(os.getenv("AD_POOL_PATH", ".cache/ad_pool.json"))
+LEASE_TTL = float(os.getenv("AD_POOL_LEASE_TTL", "3600"))
+
+_THREAD_LOCK = threading.Lock()
+
+# (base_url, access_token) -> registry key, so the identity is resolved once per login.
+_ACCOUNTS: Dict[Tuple[str, str], str] = {}
+_ACCOUNTS_LOCK = threading.Lock()
+
+
+def ad_pool_account(api_client) -> str:
+    """
+    Registry key for the account ``api_client`` is logged in as.
+
+    The user id comes from the ``user`` object of the account's own my-ads
+    entries, so it survives token refreshes. An account without any ads yet
+    falls back to a digest of its access token. Raises AssertionError when
+    the client is not logged in.
+    """
+    token = getattr(api_client, "access_token", None)
+    if not token:
+        raise AssertionError("AdPool needs a logged-in api_client; refusing to guess the account.")
+    key = (api_client.base_url, token)
+    with _ACCOUNTS_LOCK:
+        if key in _ACCOUNTS:
+            return _ACCOUNTS[key]
+
+    who = None
+    for state in MY_ADS_STATES:
+        for ad in fetch_my_ads_state(api_client, state).get("ads") or []:
+            user = ad.get("user") if isinstance(ad, dict) and ad.get("isUserAd") is not False else None
+            if isinstance(user, dict) and user.get("id"):
+                who = f"user:{user['id']}"
+                break
+        if who:
+            break
+    if who is None:
+        who = "token:" + hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+    account = f"{api_client.base_url.rstrip('/')}|{who}"
+    with _ACCOUNTS_LOCK:
+        _ACCOUNTS[key] = account
+    return account
+
+
+class AdPool:
+    """Check-out/check-in registry of reusable ads for one account."""
+
+    def __init__(
+        self,
+        api_client,
+        validator,
+        load_payload,
+        path: Path = AD_POOL_PATH,
+        api_version: str = car_ads.DEFAULT_API_VERSION,
+    ) -> None:
+        self.api_client = api_client
+        self.validator = validator
+        self.load_payload = load_payload
+        self.account = ad_pool_account(api_client)
+        self.path = Path(path)
+        self.api_version = api_version
+
+    # -- registry -------------------------------------------------------------
+
+    @contextmanager
+    def _registry(self) -> Iterator[Dict[str, dict]]:
+        """Yield this account's entries under an exclusive lock and write them back."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with _THREAD_LOCK, open(self.path.with_suffix(".lock"), "w") as lock_fh:
+            if fcntl is not None:
+                fcntl.flock(lock_fh, fcntl.LOCK_EX)
+            try:
+                data: Dict[str, Dict[str, dict]] = {}
+                if self.path.exists():
+                    try:
+                        with self.path.open("r", encoding="utf-8") as fh:
+                            data = json.load(fh) or {}
+                    except (OSError, ValueError) as exc:
+                        print(f"⚠️ Resetting unreadable ad pool registry {self.path}: {exc}")
+                entries = data.setdefault(self.account, {})
+                yield entries
+                tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+                with tmp.open("w", encoding="utf-8") as fh:
+                    json.dump(data, fh, indent=2)
+                os.replace(tmp, self.path)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_fh, fcntl.LOCK_UN)
+
+    def _lease_expired(self, entry: dict) -> bool:
+        return time.time() - float(entry.get("leased_at") or 0) > LEASE_TTL
+
+    def entries(self) -> Dict[str, dict]:
+        with self._registry() as entries:
+            return {key: dict(value) for key, value in entries.items()}
+
+    # -- pool operations ------------------------------------------------------
+
+    def _verify(self, ad: dict, index: MyAdsIndex) -> str:
+        """
+        ``"ok"`` if the pooled ad is listed live or pending, ``"gone"`` if it was
+        removed or its details 404, else ``"unknown"`` (e.g. the lists lag).
+        """
+        state = index.state_of(ad["slug"])
+        if state in ("st_live", "st_pending"):
+            return "ok"
+        if state == "st_removed":
+            return "gone"
+        try:
+            resp = fetch_ad_details(self.api_client, ad_id=int(ad["ad_id"]), refresh=True)
+        except Exception as exc:
+            print(f"⚠️ Could not look up pooled ad {ad.get('ad_id')}: {exc}")
+            return "unknown"
+        return "gone" if resp.get("status_code") == 404 else "unknown"
+
+    def _post_new(self) -> dict:
+        """Post a fresh ad for the pool without replacing the session ad."""
+        ack = car_ads.post_used_car(
+            self.api_client, self.validator, api_version=self.api_version, store_session=False
+        )
+        metadata = car_ads.posted_ad_metadata(ack, self.load_payload("used_car.json"), api_version=self.api_version)
+        if metadata is None:
+            raise AssertionError(f"Posting a pooled ad returned no ad_id: {ack}")
+        return metadata
+
+    def checkout(self) -> dict:
+        """
+        Lease an available ad (or one whose lease expired), posting a new one if none is free.
+
+        Each candidate is looked up in the account's full my-ads lists (no
+        page cap). Ads that are removed, or whose details return 404, are
+        dropped. Ads that cannot be confirmed either way are left in the pool
+        and skipped. The returned metadata has the same shape as
+        ``get_session_ad_metadata``, but the session ad itself is left untouched.
+        """
+        lessee = f"{os.getpid()}:{threading.get_ident()}"
+        index: Optional[MyAdsIndex] = None
+        skipped: Set[str] = set()
+        while True:
+            with self._registry() as entries:
+                for key, entry in entries.items():
+                    if key in skipped:
+                        continue
+                    if entry.get("status") == "available" or self._lease_expired(entry):
+                        previous = {k: entry.get(k) for k in ("status", "leased_at", "leased_by")}
+                        entry.update(status="checked_out", leased_at=time.time(), leased_by=lessee)
+                        ad = dict(entry)
+                        break
+                else:
+                    ad = None
+            if ad is None:
+                break
+            if index is None:
+                index = build_my_ads_index(self.api_client, max_pages=0)
+            verdict = self._verify(ad, index)
+            if verdict == "ok":
+                break
+            key = str(ad["ad_id"])
+            if verdict == "gone":
+                print(f"⚠️ Dropping pooled ad {key}: removed or deleted")
+                self.discard(ad)
+                continue
+            print(f"⚠️ Skipping pooled ad {key}: not listed yet, keeping it in the pool")
+            skipped.add(key)
+            with self._registry() as entries:
+                if key in entries and entries[key].get("leased_by") == lessee:
+                    entries[key].update(previous)
+
+        if ad is None:
+            print("🆕 Ad pool empty for this account; posting a new ad")
+            posted = self._post_new()
+            ad = {
+                "ad_id": posted["ad_id"],
+                "ad_listing_id": posted["ad_listing_id"],
+                "slug": posted["slug"],
+                "price": posted["price"],
+                "api_version": posted["api_version"],
+                "status": "checked_out",
+                "leased_at": time.time(),
+                "leased_by": lessee,
+            }
+            with self._registry() as entries:
+                entries[str(ad["ad_id"])] = dict(ad)
+        else:
+            print(f"♻️ Checked out pooled ad {ad['ad_id']}")
+
+        return {
+            "ad_id": int(ad["ad_id"]),
+            "ad_listing_id": int(ad["ad_listing_id"]),
+            "slug": ad["slug"],
+            "price": int(ad.get("price") or 0),
+            "api_version": ad.get("api_version") or self.api_version,
+            "ack": {},
+            "details": {},
+        }
+
+    def recycle(self, ad: dict) -> None:
+        """Close and reactivate ``ad`` so the next lessee starts from a live/pending ad."""
+        car_ads.close_used_car_existing(
+            self.api_client,
+            None,
+            self.load_payload,
+            ad_ref=ad,
+            api_version=ad.get("api_version") or self.api_version,
+        )
+        result = car_ads.reactivate_and_get_ad(
+            self.api_client,
+            ad,
+            validator=None,
+            api_version_refresh="23",
+            wait_for_state=True,
+        )
+        if result["state"] is None:
+            raise AssertionError(f"Pooled ad {ad['ad_id']} did not return to live/pending after recycling")
+
+    def checkin(self, ad: dict, recycle: bool = True) -> None:
+        """Return ``ad`` to the pool, recycling it first; ads that fail to recycle are dropped."""
+        key = str(ad["ad_id"])
+        keep = True
+        if recycle:
+            try:
+                self.recycle(ad)
+            except Exception as exc:
+                print(f"⚠️ Dropping pooled ad {key}: recycle failed ({exc})")
+                keep = False
+
+        with self._registry() as entries:
+            if not keep:
+                entries.pop(key, None)
+            elif key in entries:
+                entries[key].update(status="available", leased_at=None, leased_by=None)
+
+    def discard(self, ad: dict) -> None:
+        """Remove ``ad`` from the pool without recycling (e.g. after a destructive test)."""
+        with self._registry() as entries:
+            entries.pop(str(ad["ad_id"]), None)
+
+    @contextmanager
+    def lease(self, recycle: bool = True) -> Iterator[dict]:
+        """``with pool.lease() as ad:`` — checkout on entry, recycle and checkin on exit."""
+        ad = self.checkout()
+        try:
+            yield ad
+        finally:
+            self.checkin(ad, recycle=recycle)
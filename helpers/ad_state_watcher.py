@@ -0,0 +1,217 @@
+"""
+Shared my-ads state watcher.
+
+When many ads are waiting on moderation, polling the my-ads lists once per ad
+multiplies list requests. A watcher polls each state list once per tick for
+the whole account, indexes slug path → states and resolves a future
+for every waiting caller, so the polling cost does not grow with the number of
+waiters.
+
+During a transition an ad can be listed in two states at once. Every state is
+kept, and waiters and ``state_of`` resolve to the first of them in
+``STATE_ORDER`` (live, then pending, then removed), regardless of which list
+was fetched last.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from helpers.metrics import record_latency
+from helpers.my_ads import ad_locator, iter_my_ads
+
+__all__ = [
+    "AdStateWatcher",
+    "get_ad_state_watcher",
+    "stop_ad_state_watchers",
+]
+
+AD_STATE_METRIC = "ad_time_to_state"
+STATE_ORDER = ("st_live", "st_pending", "st_removed")
+
+_WATCHERS: Dict[Tuple[str, Optional[str]], "AdStateWatcher"] = {}
+_WATCHERS_LOCK = threading.Lock()
+
+
+class _Waiter:
+    __slots__ = ("slug_path", "states", "since", "future")
+
+    def __init__(self, slug_path: str, states: Tuple[str, ...], since: float) -> None:
+        self.slug_path = slug_path
+        self.states = states
+        self.since = since
+        self.future: Future = Future()
+
+
+class AdStateWatcher:
+    """
+    Background poller for one account's my-ads lists.
+
+    The polling thread starts with the first waiter and exits once no waiters
+    are left. Each tick fetches only the union of states that current waiters
+    care about.
+    """
+
+    def __init__(
+        self,
+        api_client,
+        interval: Optional[float] = None,
+        max_pages: Optional[int] = None,
+        api_version: Optional[str] = None,
+        extra_params: Optional[dict] = None,
+    ) -> None:
+        if extra_params is None and os.getenv("FCM_TOKEN"):
+            extra_params = {"fcm_token": os.getenv("FCM_TOKEN")}
+        self.api_client = api_client
+        self.interval = interval if interval is not None else float(os.getenv("AD_STATE_WATCH_INTERVAL", "2"))
+        self.max_pages = max_pages if max_pages is not None else int(os.getenv("AD_STATE_MAX_PAGES", "5"))
+        self.api_version = api_version
+        self.extra_params = extra_params
+        self.ticks = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._waiters: List[_Waiter] = []
+        self._by_slug: Dict[str, Set[str]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # -- public API ---------------------------------------------------------
+
+    def watch(
+        self,
+        slug_or_url: str,
+        desired_states: Iterable[str] = ("st_live", "st_pending"),
+        since: Optional[float] = None,
+    ) -> Future:
+        """Register a waiter and return a future resolving to the state reached."""
+        slug_path = ad_locator(slug_or_url)[1]
+        waiter = _Waiter(slug_path, tuple(desired_states), since if since is not None else time.perf_counter())
+        with self._lock:
+            self._waiters.append(waiter)
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="ad-state-watcher", daemon=True)
+                self._thread.start()
+        return waiter.future
+
+    def wait(
+        self,
+        slug_or_url: str,
+        desired_states: Iterable[str] = ("st_live", "st_pending"),
+        timeout: Optional[float] = None,
+        since: Optional[float] = None,
+    ) -> Optional[str]:
+        """Block until the ad reaches one of ``desired_states``; None on timeout."""
+        future = self.watch(slug_or_url, desired_states, since=since)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._lock:
+                self._waiters = [w for w in self._waiters if w.future is not future]
+            return None
+
+    def state_of(self, slug_or_url: str) -> Optional[str]:
+        """State of an ad as of the last tick (None if not seen)."""
+        slug_path = ad_locator(slug_or_url)[1]
+        with self._lock:
+            return self._lookup(slug_path)
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._lock:
+            waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            waiter.future.cancel()
+
+    # -- polling ------------------------------------------------------------
+
+    def _lookup(self, slug_path: str, among: Optional[Iterable[str]] = None) -> Optional[str]:
+        # Slug paths only: car, bike and accessory ids share one numeric range.
+        seen = self._by_slug.get(slug_path, set())
+        if among is not None:
+            seen = seen & set(among)
+        ranked = sorted(
+            seen,
+            key=lambda state: (STATE_ORDER.index(state) if state in STATE_ORDER else len(STATE_ORDER), state),
+        )
+        return ranked[0] if ranked else None
+
+    def tick(self) -> None:
+        """Fetch each wanted state list once, rebuild the index and resolve waiters."""
+        with self._lock:
+            states = sorted({state for waiter in self._waiters for state in waiter.states})
+
+        by_slug: Dict[str, Set[str]] = {}
+        for state in states:
+            try:
+                ads = list(
+                    iter_my_ads(
+                        self.api_client,
+                        state,
+                        api_version=self.api_version,
+                        max_pages=self.max_pages,
+                        extra_params=self.extra_params,
+                    )
+                )
+            except Exception as exc:
+                # Network errors and timeouts must not kill the polling thread;
+                # the next tick retries.
+                self.errors += 1
+                print(f"⚠️ Ad state watcher could not fetch {state}: {exc!r}")
+                continue
+            for ad in ads:
+                for key in ("urlSlug", "detail_url"):
+                    if isinstance(ad.get(key), str):
+                        by_slug.setdefault(ad_locator(ad[key])[1], set()).add(state)
+
+        now = time.perf_counter()
+        with self._lock:
+            self.ticks += 1
+            self._by_slug = by_slug
+            pending: List[_Waiter] = []
+            for waiter in self._waiters:
+                if waiter.future.cancelled():
+                    continue
+                state = self._lookup(waiter.slug_path, waiter.states)
+                if state is not None:
+                    elapsed = now - waiter.since
+                    record_latency(AD_STATE_METRIC, elapsed)
+                    record_latency(f"{AD_STATE_METRIC}.{state}", elapsed)
+                    waiter.future.set_result(state)
+                else:
+                    pending.append(waiter)
+            self._waiters = pending
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.tick()
+            with self._lock:
+                if not self._waiters:
+                    self._thread = None
+                    return
+            self._stop.wait(self.interval)
+
+
+def get_ad_state_watcher(api_client) -> AdStateWatcher:
+    """Return the shared watcher for the account behind ``api_client``."""
+    key = (api_client.base_url, getattr(api_client, "access_token", None))
+    with _WATCHERS_LOCK:
+        watcher = _WATCHERS.get(key)
+        if watcher is None:
+            watcher = AdStateWatcher(api_client)
+            _WATCHERS[key] = watcher
+        return watcher
+
+
+def stop_ad_state_watchers() -> None:
+    """Stop and forget every shared watcher (e.g. at session teardown)."""
+    with _WATCHERS_LOCK:
+        watchers = list(_WATCHERS.values())
+        _WATCHERS.clear()
+    for watcher in watchers:
+        watcher.stop()
@@ -4,6 +4,9 @@ from __future__ import annotations
 import json
 import os
 import re
+import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Callable, Iterable, Optional, Tuple, List, Set
 from helpers.car_ads_utils import available_feature_credits, extract_feature_credit_count
@@ -13,7 +16,9 @@ import requests
 from helpers import get_auth_token
 from helpers.shared import (
     _choose_feature_weeks,
+    _compile_path,
     _ensure_slug_path,
+    _extract_id_from_slug,
     _get_value_by_path,
     _log_http,
     _normalize_bool_flag,
@@ -24,12 +29,19 @@ from helpers.shared import (
     _read_json,
     _validate_response,
 )
-from helpers.picture_uploader import upload_ad_picture
+from helpers.ad_details import fetch_ad_details, invalidate_ad_details
+from helpers.credits_ledger import get_credits_ledger
+from helpers.ad_state_watcher import AD_STATE_METRIC, get_ad_state_watcher
+from helpers.metrics import record_latency
+from helpers.my_ads import ad_locator, ad_matches, build_my_ads_index, iter_my_ads
+from helpers.product_cache import invalidate_products_cache
+from helpers.picture_derivatives import derivatives_enabled, prepare_pictures
+from helpers.picture_uploader import invalidate_reused_pictures, upload_ad_picture, upload_ad_pictures
 from helpers.payment import (
     complete_jazz_cash_payment,
-    my_credits_request,
     list_feature_products,
     proceed_checkout,
+    product_upsell_request,
 )
 
 DEFAULT_API_VERSION = os.getenv("API_VERSION", "22")
@@ -37,8 +49,15 @@ POST_ENDPOINT = os.getenv("POST_ENDPOINT", "/used-cars.json")
 
 _POSTED_AD_CACHE: Optional[dict] = None
 CORE = "https://core.pakkey.com"
+REFRESH_METRIC = "ad_refresh"
+
+# Refresh/activate request plan, in fallback order, and the step that last
+# succeeded per refresh api_version.
+_REFRESH_PLAN: Tuple[Tuple[str, str], ...] = (("GET", "refresh"), ("POST", "activate"), ("GET", "activate"))
+_REFRESH_VERB_CACHE: dict = {}
 
 FieldRule = Tuple[str, str, Callable[[Any], Any]]
+CompiledFieldRule = Tuple[str, str, Callable[[Any], Any], Callable[[Any], Any], Callable[[Any], Any]]
 
 _FEATURE_FLAGS = (
     "abs",
@@ -78,6 +97,13 @@ _EDIT_PAYLOAD_RESPONSE_RULES: Tuple[FieldRule, ...] = (
     for feature in _FEATURE_FLAGS
 )
 
+# Rule table with dotted paths pre-split into accessors:
+# (payload_path, response_path, payload_getter, response_getter, normalizer).
+_COMPILED_EDIT_RULES: Tuple[CompiledFieldRule, ...] = tuple(
+    (payload_path, response_path, _compile_path(payload_path), _compile_path(response_path), normalizer)
+    for payload_path, response_path, normalizer in _EDIT_PAYLOAD_RESPONSE_RULES
+)
+
 def _coerce_int(value) -> Optional[int]:
     if isinstance(value, int):
         return value
@@ -90,13 +116,7 @@ def _coerce_int(value) -> Optional[int]:
     return None
 
 def _available_feature_credits(api_client) -> Optional[int]:
-    try:
-        resp = my_credits_request(api_client)
-    except Exception:
-        return None
-    if not isinstance(resp, dict) or resp.get("status_code") != 200:
-        return None
-    return _extract_feature_credit_count(resp.get("json"))
+    return get_credits_ledger(api_client).feature_credits()
 
 
 def _extract_feature_credit_count(payload) -> Optional[int]:
@@ -121,6 +141,27 @@ def _extract_feature_credit_count(payload) -> Optional[int]:
     return None
 
 
+def _attach_pictures(api_client, body: dict, files: List[Path], token: Optional[str]) -> None:
+    """Upload ``files`` (reusing stored ids where possible) into pictures_attributes."""
+    pics_attr = (
+        body.setdefault("used_car", {})
+        .setdefault("ad_listing_attributes", {})
+        .setdefault("pictures_attributes", {})
+    )
+    pics_attr.clear()
+
+    pic_ids = upload_ad_pictures(
+        api_client,
+        files,
+        api_version=os.getenv("PICTURE_UPLOAD_API_VERSION", "18"),
+        access_token=token,
+        fcm_token=os.getenv("FCM_TOKEN"),
+        new_version=True,
+    )
+    for idx, pic_id in enumerate(pic_ids):
+        pics_attr[str(idx)] = {"pictures_ids": str(pic_id)}
+
+
 def post_used_car(
     api_client,
     validator,
@@ -128,46 +169,49 @@ def post_used_car(
     schema_path: str = "schemas/used_car_post_response_ack.json",
     expected_path: Optional[str] = "data/expected_responses/used_car_post.json",
     api_version: str = DEFAULT_API_VERSION,
+    store_session: bool = True,
 ) -> dict:
-    """Post a used-car ad, store its metadata in cache, and return the full response payload."""
+    """
+    Post a used-car ad, store its metadata in cache, and return the full response payload.
+
+    With ``store_session=False`` the session ad (``get_session_ad_metadata``) is
+    left alone; build the metadata with ``posted_ad_metadata`` instead.
+    """
     body = _read_json(payload_path)
 
     pictures_dir = Path("data/pictures")
+    files: List[Path] = []
+    token: Optional[str] = None
     if pictures_dir.exists():
-        # ... (Picture processing logic remains unchanged)
         files = sorted(p for p in pictures_dir.iterdir() if p.is_file())
+        if files and derivatives_enabled():
+            files = prepare_pictures(files)
         if files:
-            pics_attr = (
-                body.setdefault("used_car", {})
-                .setdefault("ad_listing_attributes", {})
-                .setdefault("pictures_attributes", {})
-            )
-            pics_attr.clear()
-
             token = get_auth_token()
-            fcm_token = os.getenv("FCM_TOKEN")
-
-            for idx, file_path in enumerate(files):
-                pic_id = upload_ad_picture(
-                    api_client,
-                    file_path=str(file_path),
-                    api_version=os.getenv("PICTURE_UPLOAD_API_VERSION", "18"),
-                    access_token=token,
-                    fcm_token=fcm_token,
-                    new_version=True,
-                )
-                pics_attr[str(idx)] = {"pictures_ids": str(pic_id)}
+            _attach_pictures(api_client, body, files, token)
 
     via_whatsapp = "true" if (
         body.get("used_car", {}).get("ad_listing_attributes", {}).get("allow_whatsapp") is True
     ) else "false"
 
-    resp = api_client.request(
-        "POST",
-        POST_ENDPOINT,
-        params={"api_version": api_version, "via_whatsapp": via_whatsapp},
-        json_body=body,
-    )
+    def _post() -> dict:
+        return api_client.request(
+            "POST",
+            POST_ENDPOINT,
+            params={"api_version": api_version, "via_whatsapp": via_whatsapp},
+            json_body=body,
+        )
+
+    resp = _post()
+    if files and (resp["status_code"] != 200 or (resp.get("json") or {}).get("error")):
+        # Reused picture ids may have expired server-side; drop them and retry once with fresh uploads.
+        used_ids = [
+            int(entry["pictures_ids"])
+            for entry in body["used_car"]["ad_listing_attributes"]["pictures_attributes"].values()
+        ]
+        if invalidate_reused_pictures(api_client, used_ids, access_token=token):
+            _attach_pictures(api_client, body, files, token)
+            resp = _post()
     print("\n🚗 [SESSION] Post Used Car:", resp["status_code"])
     print(json.dumps(resp.get("json"), indent=2))
 
@@ -175,35 +219,39 @@ def post_used_car(
     
     ack = resp["json"] or {} # Get the response body (acknowledgement)
     _validate_response(validator, ack, schema_path=schema_path, expected_path=expected_path)
+    # Posting uses a normal-car credit, which changes the products offered and
+    # the balances; the ledger re-reads my-credits on its next lookup.
+    invalidate_products_cache(api_client)
+    get_credits_ledger(api_client).mark_stale()
     
     # --- START CACHE POPULATION LOGIC ---
     global _POSTED_AD_CACHE
-    # Assuming _normalize_slug is accessible (as used in the original get_session_ad_metadata)
-
-    if ack and ack.get("ad_id"):
-        ad_id = int(ack["ad_id"])
-        ad_listing_id = int(ack["ad_listing_id"])
-        raw_slug = ack.get("success") or ack.get("slug")
-        slug = _normalize_slug(raw_slug) if raw_slug else None
-        str_price = ack.get("price") or _get_value_by_path(body, "used_car.ad_listing_attributes.price")
-        int_price = int(str_price)
-
-        _POSTED_AD_CACHE = {
-            "ad_id": ad_id,
-            "ad_listing_id": ad_listing_id,
-            "slug": slug,
-            "api_version": api_version,
-            "ack": ack,
-            "price": int_price,
-            "details": {}, 
-        }
-      
 
-        print(f"✅ [CACHE] Posted Ad Metadata stored for ID: {ad_id}")
+    metadata = posted_ad_metadata(ack, body, api_version=api_version)
+    if metadata and store_session:
+        _POSTED_AD_CACHE = metadata
+        print(f"✅ [CACHE] Posted Ad Metadata stored for ID: {metadata['ad_id']}")
     # --- END CACHE POPULATION LOGIC ---
 
     return ack
 
+
+def posted_ad_metadata(ack: dict, body: Optional[dict] = None, api_version: str = DEFAULT_API_VERSION) -> Optional[dict]:
+    """Session-ad metadata (ids, slug, price) from a post acknowledgement; price falls back to ``body``."""
+    if not ack or not ack.get("ad_id"):
+        return None
+    raw_slug = ack.get("success") or ack.get("slug")
+    str_price = ack.get("price") or (_get_value_by_path(body, "used_car.ad_listing_attributes.price") if body else None)
+    return {
+        "ad_id": int(ack["ad_id"]),
+        "ad_listing_id": int(ack["ad_listing_id"]),
+        "slug": _normalize_slug(raw_slug) if raw_slug else None,
+        "api_version": api_version,
+        "ack": ack,
+        "price": int(str_price),
+        "details": {},
+    }
+
 def get_session_ad_metadata(
     api_client, 
     validator, 
@@ -236,12 +284,8 @@ def get_ad_ids(posted_ad: dict) -> dict:
         "ad_listing_id": int(posted_ad["ad_listing_id"]),
     }
 
-def edit_payload_check(payload: dict, response: dict) -> None:
-    """
-    Compare an edit payload against the ad_listing section of an API response.
-
-    Raises AssertionError if any mapped field is missing or has different value.
-    """
+def _edit_payload_diff(payload: dict, response: dict) -> Tuple[List[dict], List[dict]]:
+    """Return (missing, mismatches) for one payload/response pair using the compiled rules."""
     if not isinstance(payload, dict):
         raise AssertionError("Payload must be a dict.")
     if not isinstance(response, dict):
@@ -253,14 +297,13 @@ def edit_payload_check(payload: dict, response: dict) -> None:
     missing = []
     mismatches = []
 
-    for payload_path, response_path, normalizer in _EDIT_PAYLOAD_RESPONSE_RULES:
-        expected = _get_value_by_path(payload, payload_path)
+    for payload_path, response_path, get_expected, get_actual, normalizer in _COMPILED_EDIT_RULES:
+        expected = get_expected(payload)
         if expected is None:
             continue
 
-        actual = _get_value_by_path(response, response_path)
+        actual = get_actual(response)
         normalized_expected = normalizer(expected)
-        normalized_actual = normalizer(actual) if actual is not None else None
 
         if actual is None:
             missing.append(
@@ -272,6 +315,7 @@ def edit_payload_check(payload: dict, response: dict) -> None:
             )
             continue
 
+        normalized_actual = normalizer(actual)
         if normalized_expected != normalized_actual:
             mismatches.append(
                 {
@@ -282,6 +326,17 @@ def edit_payload_check(payload: dict, response: dict) -> None:
                 }
             )
 
+    return missing, mismatches
+
+
+def edit_payload_check(payload: dict, response: dict) -> None:
+    """
+    Compare an edit payload against the ad_listing section of an API response.
+
+    Raises AssertionError if any mapped field is missing or has different value.
+    """
+    missing, mismatches = _edit_payload_diff(payload, response)
+
     if missing or mismatches:
         details = {"missing": missing, "mismatches": mismatches}
         raise AssertionError(
@@ -292,6 +347,35 @@ def edit_payload_check(payload: dict, response: dict) -> None:
     print("✅ Payload fields reflected in response.")
 
 
+def edit_payload_check_many(pairs: Iterable[Tuple[dict, dict]]) -> int:
+    """
+    Run ``edit_payload_check`` over many (payload, response) pairs.
+
+    Every pair is checked before failing, so one AssertionError reports all
+    failing pairs by index. Returns the number of pairs checked.
+    """
+    failures = {}
+    checked = 0
+    for index, (payload, response) in enumerate(pairs):
+        checked += 1
+        try:
+            missing, mismatches = _edit_payload_diff(payload, response)
+        except AssertionError as exc:
+            failures[index] = {"error": str(exc)}
+            continue
+        if missing or mismatches:
+            failures[index] = {"missing": missing, "mismatches": mismatches}
+
+    if failures:
+        raise AssertionError(
+            f"{len(failures)}/{checked} edit payloads do not match their responses.\n"
+            f"{json.dumps(failures, indent=2)}"
+        )
+
+    print(f"✅ Payload fields reflected in {checked} responses.")
+    return checked
+
+
 
 def close_used_car_existing(
     api_client,
@@ -335,6 +419,7 @@ def close_used_car_existing(
 
     if resp.status_code != 200:
         raise AssertionError(f"Close failed: status={resp.status_code} body={body}")
+    invalidate_ad_details(ad_id=ad_ref.get("ad_id"), slug=slug)
 
     _validate_response(
         validator,
@@ -392,17 +477,14 @@ def edit_used_car_existing(
         raise AssertionError(f"Edit failed: {body.get('error')}")
 
     validator.assert_status_code(edit_resp["status_code"], 200)
+    invalidate_ad_details(ad_id=ad_id)
     validator.assert_json_schema(body, "schemas/used_car_edit_response_ack.json")
 
     # --- FIX STARTS HERE ---
     
     # 2. After successful ACK, perform a GET request to fetch the fully updated details.
     print(f"🔄 Fetching updated details for ad ID {ad_id}...")
-    details_resp = api_client.request(
-        "GET",
-        endpoint, # Reuse the same endpoint, but with GET method
-        params=params,
-    )
+    details_resp = fetch_ad_details(api_client, ad_id=ad_id, api_version=api_version)
     
     # 3. Validate the GET request
     validator.assert_status_code(details_resp["status_code"], 200)
@@ -420,20 +502,9 @@ edit_used_car = edit_used_car_existing
 def _resolve_ad_id_and_price(api_client, ref: dict, api_version: str) -> Tuple[int, int]:
     """Resolve ad id and price from either ad_id or slug."""
     ad_id = ref.get("ad_id")
-    if ad_id:
-        details = api_client.request(
-            "GET",
-            f"/used-cars/{ad_id}.json",
-            params={"api_version": api_version},
-        )
-    else:
-        slug = ref.get("slug") or ref.get("success")
-        assert slug, "Need ad_id or slug in ad_ref to resolve."
-        details = api_client.request(
-            "GET",
-            _normalize_slug(slug, ensure_json_suffix=True),
-            params={"api_version": api_version},
-        )
+    slug = ref.get("slug") or ref.get("success")
+    assert ad_id or slug, "Need ad_id or slug in ad_ref to resolve."
+    details = fetch_ad_details(api_client, ad_id=ad_id, slug=slug, api_version=api_version)
 
     body = details.get("json") or {}
     listing = body.get("ad_listing") or body.get("used_car") or body
@@ -479,7 +550,12 @@ def feature_used_car_with_credit(
     print(json.dumps(resp.get("json"), indent=2))
 
     if resp["status_code"] == 200:
+        invalidate_ad_details(ad_id=ad_id)
+        invalidate_products_cache(api_client)
         body = resp.get("json") or {}
+        ledger = get_credits_ledger(api_client)
+        if not ledger.apply_response(body):
+            ledger.debit_feature(weeks)
         _validate_response(validator, body, schema_path=schema_path, expected_path=expected_path)
         return {"method": "credit", "weeks": weeks, "response": body}
 
@@ -509,7 +585,7 @@ def feature_used_car_with_payment(
     print(f"  Resolved Ad Listing ID: {ad_listing_id}")
 
     print("  1. Listing feature products...")
-    products_resp = list_feature_products(api_client, ad_id)
+    products_resp = list_feature_products(api_client, ad_id, ad_price=price)
     validator.assert_status_code(products_resp["status_code"], 200)
     
     product = _select_feature_product(products_resp.get("json"), weeks)
@@ -610,11 +686,7 @@ def feature_used_car(
 def _ensure_ad_listing_id(api_client, ad_ref: dict, ad_id: int, api_version: str) -> int:
     if "ad_listing_id" in ad_ref and ad_ref["ad_listing_id"] is not None:
         return int(ad_ref["ad_listing_id"])
-    details = api_client.request(
-        "GET",
-        f"/used-cars/{ad_id}.json",
-        params={"api_version": api_version},
-    )
+    details = fetch_ad_details(api_client, ad_id=ad_id, api_version=api_version)
     body = details.get("json") or {}
     candidates = []
     for key in ("ad_listing_id", "listing_id"):
@@ -707,14 +779,77 @@ def wait_for_ad_state(
     desired_states: Iterable[str] = ("st_live", "st_pending"),
     attempts: int = 10,
     delay: float = 0.8,
+    timeout: Optional[float] = None,
+    since: Optional[float] = None,
+    extra_params: Optional[dict] = None,
 ) -> Optional[str]:
     """
     Poll the My-Ads lists until the ad appears in one of the desired states.
 
-    Returns the state name if found, otherwise None.
+    ``extra_params`` are sent with every list request; by default the
+    ``FCM_TOKEN`` env value is sent as ``fcm_token``, as the list helpers do.
+
+    Sleeps grow by ``AD_STATE_BACKOFF`` (default 1.5x) up to
+    ``AD_STATE_MAX_DELAY`` seconds; polling stops after ``attempts`` rounds or
+    once ``timeout`` seconds have passed. A list request that fails (non-200
+    or network error) is logged and retried on the next attempt. Time-to-state (measured from
+    ``since``, a ``time.perf_counter()`` value, or from the call) is recorded
+    under ``ad_time_to_state`` and ``ad_time_to_state.<state>``.
+
+    With ``AD_STATE_SHARED_WATCHER=true`` the wait is delegated to the
+    account's shared AdStateWatcher, so many concurrent waiters share one set
+    of list requests per tick.
+
+    Returns the state name if found, otherwise None once attempts or the
+    deadline run out.
     """
     desired_states = tuple(desired_states)
+    if _normalize_bool_flag(os.getenv("AD_STATE_SHARED_WATCHER", "false")):
+        watcher = get_ad_state_watcher(api_client)
+        budget = timeout if timeout is not None else max(1, attempts) * max(watcher.interval, delay)
+        return watcher.wait(slug_or_url, desired_states, timeout=budget, since=since)
+
+    if extra_params is None:
+        fcm_token = os.getenv("FCM_TOKEN")
+        extra_params = {"fcm_token": fcm_token} if fcm_token else None
+
+    ad_id, slug_path = ad_locator(slug_or_url)
+    backoff = float(os.getenv("AD_STATE_BACKOFF", "1.5"))
+    max_delay = float(os.getenv("AD_STATE_MAX_DELAY", "5"))
+    max_pages = int(os.getenv("AD_STATE_MAX_PAGES", "5"))
+
+    started = since if since is not None else time.perf_counter()
+    deadline = time.perf_counter() + timeout if timeout is not None else None
+    wait = delay
+
+    for attempt in range(1, max(1, attempts) + 1):
+        for state in desired_states:
+            try:
+                ads = iter_my_ads(api_client, state, max_pages=max_pages, extra_params=extra_params)
+                found = any(ad_matches(ad, ad_id, slug_path) for ad in ads)
+            except Exception as exc:
+                # A 5xx (AssertionError from the list helper) or a network error
+                # only costs this attempt; back off and poll again.
+                print(f"⚠️ Could not fetch {state} for {slug_path} (attempt {attempt}): {exc!r}")
+                continue
+            if found:
+                elapsed = time.perf_counter() - started
+                record_latency(AD_STATE_METRIC, elapsed)
+                record_latency(f"{AD_STATE_METRIC}.{state}", elapsed)
+                print(f"⏱️ Ad {slug_path} reached {state} after {elapsed:.2f}s (attempt {attempt})")
+                return state
+
+        if attempt >= attempts:
+            break
+        if deadline is not None:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            wait = min(wait, remaining)
+        time.sleep(wait)
+        wait = min(wait * backoff, max_delay)
 
+    print(f"⌛ Ad {slug_path} not in {desired_states} after {time.perf_counter() - started:.2f}s")
     return None
 
 
@@ -760,23 +895,17 @@ def reactivate_and_get_ad(
         except Exception:
             return 0
 
-    # Resolve identifiers and price
+    # Resolve identifiers and price; session/pool ad refs already carry both.
     details: Optional[dict] = None
-    try:
-        if ad_id:
-            details = api_client.request(
-                "GET",
-                f"/used-cars/{ad_id}.json",
-                params={"api_version": api_version_refresh},
-            )
-        elif slug:
-            details = api_client.request(
-                "GET",
-                _normalize_slug(slug, ensure_json_suffix=True),
-                params={"api_version": api_version_refresh},
-            )
-    except Exception:
-        details = None
+    has_price = ad_ref.get("price") is not None
+    if has_price and slug:
+        price = _normalize_digits(ad_ref.get("price")) or 0
+    else:
+        try:
+            if ad_id or slug:
+                details = fetch_ad_details(api_client, ad_id=ad_id, slug=slug, api_version=api_version_refresh)
+        except Exception:
+            details = None
 
     if details:
         body = details.get("json") or {}
@@ -792,7 +921,7 @@ def reactivate_and_get_ad(
         if slug_candidate:
             slug_path = _ensure_slug_path(slug_candidate)
     else:
-        resolved_id = ad_id if ad_id is not None else None
+        resolved_id = ad_id if ad_id is not None else _extract_id_from_slug(slug or "")
         if slug:
             slug_path = _ensure_slug_path(slug)
 
@@ -818,25 +947,28 @@ def reactivate_and_get_ad(
         params["fcm_token"] = fcm_token
 
     headers = {"Cache-Control": "no-cache", "Pragma": "no-cache", "Accept": "application/json"}
-    base_url = f"{CORE}{slug_path}"
-
-    # Attempt refresh
-    refresh_url = f"{base_url}/refresh.json"
-    resp = api_client.session.get(refresh_url, params=params, headers=headers, timeout=30)
-    _log_http("REFRESH (consolidated)", resp)
-
-    if not (200 <= resp.status_code < 300 or resp.status_code == 304):
-        activate_url = f"{base_url}/activate.json"
-        resp = api_client.session.post(activate_url, params=params, headers=headers, timeout=30)
-        _log_http("ACTIVATE (POST, consolidated)", resp)
-        if not (200 <= resp.status_code < 300):
-            resp = api_client.session.get(activate_url, params=params, headers=headers, timeout=30)
-            _log_http("ACTIVATE (GET, consolidated)", resp)
 
-    try:
-        body = resp.json()
-    except Exception:
-        body = {"raw": resp.text}
+    # Try the verb that last worked for this api_version first, then the rest in order.
+    plan = list(_REFRESH_PLAN)
+    remembered = _REFRESH_VERB_CACHE.get(api_version_refresh)
+    if remembered in plan:
+        plan.remove(remembered)
+        plan.insert(0, remembered)
+
+    refreshed_at = time.perf_counter()
+    result: Optional[dict] = None
+    for method, action in plan:
+        result = api_client.request(method, f"{slug_path}/{action}.json", params=params, headers=headers)
+        record_latency(f"{REFRESH_METRIC}.{action}", result["elapsed"])
+        _log_http(f"{action.upper()} ({method}, consolidated)", result["response"])
+        status = result["status_code"]
+        if 200 <= status < 300 or (action == "refresh" and status == 304):
+            _REFRESH_VERB_CACHE[api_version_refresh] = (method, action)
+            break
+    assert result is not None
+    resp = result["response"]
+    body = result["json"]
+    invalidate_ad_details(ad_id=resolved_id, slug=slug_path)
 
     if validator:
         _validate_response(validator, body, schema_path=schema_path, expected_path=expected_path)
@@ -849,6 +981,7 @@ def reactivate_and_get_ad(
             desired_states=desired_states,
             attempts=attempts,
             delay=delay,
+            since=refreshed_at,
         )
 
     return {
@@ -896,6 +1029,9 @@ def reactivate_and_verify_lists(
     """
     Reactivate the ad, ensure it disappears from st_removed,
     confirm it appears in live/pending, and optionally probe the image URL.
+
+    The live, pending and removed lists are fetched concurrently into one
+    ``MyAdsIndex``, so both checks are lookups rather than list scans.
     """
     slug_path = _normalize_slug(posted_ad["slug"])
 
@@ -907,36 +1043,17 @@ def reactivate_and_verify_lists(
     )
     assert resp.status_code in (200, 304), f"Unexpected refresh status: {resp.status_code}"
 
-    token = get_auth_token()
     fcm = os.getenv("FCM_TOKEN")
-    removed_params = {
-        "api_version": "22",
-        "access_token": token,
-        "page": "1",
-        "extra_info": "true",
-    }
-    if fcm:
-        removed_params["fcm_token"] = fcm
+    list_params = {"fcm_token": fcm} if fcm else None
+    index = build_my_ads_index(api_client, extra_params=list_params)
 
-    resp_removed = api_client.session.get(
-        f"{CORE}/users/my-ads/st_removed.json",
-        params=removed_params,
-        headers={"Accept": "application/json"},
-        timeout=30,
-    )
-    try:
-        body_removed = resp_removed.json()
-    except Exception:
-        body_removed = {"raw": resp_removed.text[:500]}
+    removed = index.find(slug_path, "st_removed")
+    assert removed is None, f"Ad {slug_path} still appears in st_removed: {json.dumps(removed)[:500]}"
 
-    print(f"\nGET {resp_removed.url} → {resp_removed.status_code}")
-    print(json.dumps(body_removed, indent=2))
-    assert resp_removed.status_code == 200, "st_removed should return HTTP 200."
-    removed_ads = body_removed.get("ads") or []
-    slug_in_removed = any(slug_path in (ad.get("detail_url") or "") for ad in removed_ads)
-    assert not slug_in_removed, f"Ad {slug_path} still appears in st_removed."
-
-    polled_state = wait_for_ad_state(api_client, slug_path, attempts=1, delay=0.1)
+    polled_state = index.state_of(slug_path, ("st_live", "st_pending"))
+    if polled_state is None:
+        # The lists can lag the refresh; fall back to polling.
+        polled_state = wait_for_ad_state(api_client, slug_path, extra_params=list_params)
     assert polled_state in ("st_live", "st_pending"), "Ad not found in live or pending after refresh."
 
     if image_url:
@@ -955,6 +1072,7 @@ __all__ = [
     "feature_used_car_with_credit",
     "feature_used_car_with_payment",
     "post_used_car",
+    "posted_ad_metadata",
     "get_session_ad_metadata",
     "get_ad_ref",
     "get_ad_ids",
@@ -998,6 +1116,61 @@ def _extract_payment_id(payload: dict) -> Optional[str]:
     return None
 
 
+FORTY_LAC = 4_000_000
+EIGHTY_LAC = 8_000_000
+
+# Required boost_upsell bumpAdCredits values, the same for every bucket; empty
+# means only "non-empty and consistent within a bucket" is checked.
+_BOOST_BUMP_CREDITS = frozenset(
+    int(v) for v in os.getenv("UPSELL_BOOST_BUMP_CREDITS", "").split(",") if v.strip().isdigit()
+)
+
+# Upsell buckets keyed by their lower price bound (ascending). Each row holds the
+# required upsell / business featureCarCount sets, the boost bumpAdCredits set
+# and the expected normalCarCount as (default, {normal_credit_count: override}).
+_UPSELL_BUCKET_BOUNDS: Tuple[int, ...] = (0, FORTY_LAC, EIGHTY_LAC)
+_UPSELL_BUCKETS: Tuple[dict, ...] = (
+    {
+        "upsell": frozenset({1, 2, 4}),
+        "upsell_name": "0 - 40 Lac",
+        "business": frozenset({5, 10, 20}),
+        "business_name": "0 - 40 Lac (business)",
+        "boost": _BOOST_BUMP_CREDITS,
+        "boost_name": "0 - 40 Lac (boost)",
+        "normal": (1, {}),
+    },
+    {
+        "upsell": frozenset({2, 4}),
+        "upsell_name": "40 Lac - 80 Lac",
+        "business": frozenset({5, 10, 20}),
+        "business_name": "40 Lac - 80 Lac (business)",
+        "boost": _BOOST_BUMP_CREDITS,
+        "boost_name": "40 Lac - 80 Lac (boost)",
+        "normal": (2, {1: 1}),
+    },
+    {
+        "upsell": frozenset({4, 6, 8}),
+        "upsell_name": "80 Lac and above",
+        "business": frozenset({5, 10, 20}),
+        "business_name": "80 Lac and above (business)",
+        "boost": _BOOST_BUMP_CREDITS,
+        "boost_name": "80 Lac and above (boost)",
+        "normal": (4, {2: 2, 3: 1}),
+    },
+)
+
+# Prices either side of every bucket boundary.
+UPSELL_BOUNDARY_PRICES: Tuple[int, ...] = (0, FORTY_LAC - 1, FORTY_LAC, EIGHTY_LAC - 1, EIGHTY_LAC)
+UPSELL_SWEEP_METRIC = "upsell_sweep"
+
+
+def upsell_bucket(ad_price: int) -> dict:
+    """Return the upsell bucket row for ``ad_price``."""
+    if ad_price < 0:
+        raise AssertionError("ad_price cannot be negative")
+    return _UPSELL_BUCKETS[bisect_right(_UPSELL_BUCKET_BOUNDS, ad_price) - 1]
+
+
 def _extract_FeatureCount(section: List[dict]) -> Set[int]: #Extracting ids of products from productlist api response  
     """Safely pull integer `id`s from a list of dicts."""
     return {
@@ -1045,43 +1218,10 @@ def upsell_product_validation(prod_list_resp: dict, ad_price: int,include_normal
     print(f"Upsell Feature Count   : {sorted(actual_upsell)}")
     print(f"Business Feature Count : {sorted(actual_business_upsell)}")
 
-    # Price ranges
-    FORTY_LAC = 4_000_000
-    EIGHTY_LAC = 8_000_000
-
-    PRICE_RANGES = [
-        (0,          FORTY_LAC,   {1, 2, 4}, "0 - 40 Lac",          {5, 10, 20}, "0 - 40 Lac (business)"),
-        (FORTY_LAC,  EIGHTY_LAC, {2, 4},      "40 Lac - 80 Lac",     {5, 10, 20},     "40 Lac - 80 Lac (business)"),
-        (EIGHTY_LAC, None,       {4, 6, 8}, "80 Lac and above",    {5, 10, 20},         "80 Lac and above (business)")
-    ]
-
-    if ad_price < 0:
-        raise AssertionError("ad_price cannot be negative")
-
-    # Find matching range
-    required_upsell: Set[int] | None = None
-    required_business: Set[int] | None = None
-    upsell_range_name: str | None = None
-    business_range_name: str | None = None
-
-    for low, high, ups_set, u_name, bus_set, b_name in PRICE_RANGES:
-        if high is None:
-            if ad_price >= low:
-                required_upsell, required_business = ups_set, bus_set
-                upsell_range_name, business_range_name = u_name, b_name
-                break
-        elif low <= ad_price < high:
-            required_upsell, required_business = ups_set, bus_set
-            upsell_range_name, business_range_name = u_name, b_name
-            break
+    bucket = upsell_bucket(ad_price)
+    required_upsell, upsell_range_name = bucket["upsell"], bucket["upsell_name"]
+    required_business, business_range_name = bucket["business"], bucket["business_name"]
 
-    # This can NEVER be None — every price matches a bucket
-    assert required_upsell is not None
-    assert required_business is not None
-    assert upsell_range_name is not None
-    assert business_range_name is not None
-
-    # Now safe to pass to _report (all are non-None)
     upsell_err = upsell_report("upsell", required_upsell, actual_upsell, upsell_range_name, ad_price)
     business_err = upsell_report("business", required_business, actual_business_upsell, business_range_name, ad_price)
 
@@ -1103,22 +1243,9 @@ def upsell_product_validation(prod_list_resp: dict, ad_price: int,include_normal
       if "normalCarCount" not in prod:
         raise AssertionError("normalProduct[0] missing 'normalCarCount' key")
 
-      # Expected normalCarCount based on ad_price
-      if ad_price < FORTY_LAC:
-        expected_normal_count = 1
-      elif ad_price < EIGHTY_LAC:
-            if(normal_credit_count == 1):
-                expected_normal_count = 1
-            else:
-                expected_normal_count = 2
-      else:
-          if(normal_credit_count == 2):
-              expected_normal_count = 2
-          elif(normal_credit_count == 3):
-              expected_normal_count = 1
-          else:
-              expected_normal_count = 4
-          
+      # Expected normalCarCount based on ad_price bucket and remaining normal credits
+      default_count, by_credits = bucket["normal"]
+      expected_normal_count = by_credits.get(normal_credit_count, default_count)
 
       actual_count = prod["normalCarCount"]
       if actual_count != expected_normal_count:
@@ -1144,3 +1271,150 @@ def upsell_product_validation(prod_list_resp: dict, ad_price: int,include_normal
         raise AssertionError(full_err)
 
     print(f"Both upsell & business validated for {upsell_range_name}")
+
+
+def boost_product_validation(prod_list_resp: dict, ad_price: int) -> Set[int]:
+    """Check a ``boost_upsell`` list against the bucket table; returns its bumpAdCredits set."""
+    json_data = prod_list_resp.get("json") if isinstance(prod_list_resp, dict) else None
+    products = json_data.get("products") if isinstance(json_data, dict) else None
+    if not isinstance(products, list) or not products:
+        raise AssertionError(f"boost_upsell returned no products for ad_price={ad_price:,}: {json_data}")
+
+    actual = {
+        prod["bumpAdCredits"]
+        for prod in products
+        if isinstance(prod, dict) and isinstance(prod.get("bumpAdCredits"), int)
+    }
+    print(f"Boost Bump Credits     : {sorted(actual)}")
+
+    bucket = upsell_bucket(ad_price)
+    boost_err = upsell_report("boost", bucket["boost"], actual, bucket["boost_name"], ad_price)
+    if boost_err:
+        raise AssertionError(boost_err)
+    return actual
+
+
+def _set_ad_price(api_client, ad: dict, price: int, api_version: str) -> None:
+    """PUT the standard edit payload for ``ad`` with ``price``."""
+    edit_payload = _read_json(Path("data/payloads/edit_ad_full.json"))
+    attrs = edit_payload.setdefault("used_car", {}).setdefault("ad_listing_attributes", {})
+    attrs["id"] = int(ad["ad_listing_id"])
+    attrs["price"] = str(price)
+
+    resp = api_client.request(
+        "PUT",
+        f"/used-cars/{int(ad['ad_id'])}.json",
+        params={"api_version": api_version},
+        json_body=edit_payload,
+    )
+    invalidate_ad_details(ad_id=ad["ad_id"])
+    body = resp.get("json") or {}
+    if resp["status_code"] != 200 or body.get("error"):
+        raise AssertionError(f"Setting price {price:,} failed ({resp['status_code']}): {body.get('error') or body}")
+
+
+def upsell_ladder_sweep(
+    api_client,
+    validator,
+    ads: List[dict],
+    prices: Optional[Iterable[int]] = None,
+    api_version: str = DEFAULT_API_VERSION,
+    max_workers: Optional[int] = None,
+) -> List[dict]:
+    """
+    Validate the upsell ladder at every price in ``prices`` (boundary prices by default).
+
+    Prices are spread over ``ads``; each ad is edited to its prices in turn while
+    different ads run in parallel. At each price the ``used_car_upsell`` and
+    ``boost_upsell`` product lists are fetched concurrently and checked against
+    the bucket table; boost lists must also agree across prices in one bucket.
+    Every ad is put back to its original price afterwards. All failures are
+    collected into one AssertionError.
+    """
+    if not ads:
+        raise AssertionError("Need at least one ad to sweep upsell prices.")
+    if prices is None:
+        raw = os.getenv("UPSELL_SWEEP_PRICES")
+        prices = [int(p) for p in raw.split(",")] if raw else UPSELL_BOUNDARY_PRICES
+    prices = list(prices)
+
+    # Ad i takes prices i, i + len(ads), ... so edits to one ad never overlap.
+    schedule = [(ad, prices[i :: len(ads)]) for i, ad in enumerate(ads) if prices[i :: len(ads)]]
+    max_workers = max_workers or int(os.getenv("UPSELL_SWEEP_WORKERS", "4"))
+
+    def _products(ad_id: int, product_type: str, price: int) -> dict:
+        start = time.perf_counter()
+        try:
+            # The sweep exists to check the server's own bucket boundaries, so it never
+            # answers from the bucket-keyed cache; it refreshes it for later flows instead.
+            return product_upsell_request(
+                api_client, validator, ad_id, product_type=product_type, ad_price=price, refresh=True
+            )
+        finally:
+            record_latency(f"{UPSELL_SWEEP_METRIC}.{product_type}", time.perf_counter() - start)
+
+    def _original_price(ad: dict) -> Optional[int]:
+        if ad.get("price") is not None:
+            return _normalize_digits(ad["price"])
+        details = fetch_ad_details(api_client, ad_id=ad["ad_id"], api_version=api_version, refresh=True)
+        body = details.get("json") or {}
+        listing = body.get("ad_listing") or body.get("used_car") or body
+        attrs = listing.get("ad_listing_attributes") or listing.get("ad_listing") or listing
+        return _normalize_digits(attrs.get("price"))
+
+    def _sweep_ad(ad: dict, ad_prices: List[int], fetch_pool: ThreadPoolExecutor) -> List[dict]:
+        results = []
+        original = _original_price(ad)
+        try:
+            for price in ad_prices:
+                result = {
+                    "ad_id": int(ad["ad_id"]),
+                    "price": price,
+                    "bucket": upsell_bucket(price)["upsell_name"],
+                    "boost": None,
+                    "error": None,
+                }
+                try:
+                    _set_ad_price(api_client, ad, price, api_version)
+                    upsell = fetch_pool.submit(_products, ad["ad_id"], "used_car_upsell", price)
+                    boost = fetch_pool.submit(_products, ad["ad_id"], "boost_upsell", price)
+                    upsell_product_validation(upsell.result(), price)
+                    result["boost"] = frozenset(boost_product_validation(boost.result(), price))
+                except AssertionError as exc:
+                    result["error"] = str(exc)
+                results.append(result)
+        finally:
+            if original:
+                _set_ad_price(api_client, ad, original, api_version)
+                print(f"↩️ Restored ad {ad['ad_id']} to {original:,} PKR")
+            else:
+                print(f"⚠️ Could not restore ad {ad['ad_id']}: original price unknown")
+        return results
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as ad_pool, ThreadPoolExecutor(max_workers=max_workers * 2) as fetch_pool:
+        futures = [ad_pool.submit(_sweep_ad, ad, ad_prices, fetch_pool) for ad, ad_prices in schedule]
+        results = sorted((r for f in futures for r in f.result()), key=lambda r: r["price"])
+    record_latency(UPSELL_SWEEP_METRIC, time.perf_counter() - started)
+
+    # Boost products depend only on the bucket, so every price in a bucket must agree.
+    boost_by_bucket: dict = {}
+    for r in results:
+        if r["boost"] is None:
+            continue
+        expected = boost_by_bucket.setdefault(r["bucket"], (r["price"], r["boost"]))
+        if r["boost"] != expected[1]:
+            r["error"] = (
+                f"BOOST VALIDATION FAILED\nPrice: {r['price']:,} PKR ({r['bucket']})\n"
+                f"bumpAdCredits {sorted(r['boost'])} differ from {sorted(expected[1])} at {expected[0]:,} PKR"
+            )
+
+    failures = [r for r in results if r["error"]]
+    for r in results:
+        print(f"{'❌' if r['error'] else '✅'} {r['price']:>12,} PKR → {r['bucket']} (ad {r['ad_id']})")
+    if failures:
+        raise AssertionError(
+            f"Upsell ladder failed at {len(failures)}/{len(results)} prices:\n\n"
+            + "\n\n".join(f"[{r['price']:,} PKR, ad {r['ad_id']}]\n{r['error']}" for r in failures)
+        )
+    return results
@@ -2,18 +2,12 @@ from __future__ import annotations
 
 from typing import Iterable, Optional, Tuple
 
-from helpers.payment import my_credits_request
-from helpers.shared import _normalize_slug
+from helpers.ad_details import fetch_ad_details
+from helpers.credits_ledger import get_credits_ledger
 
 
 def available_feature_credits(api_client) -> Optional[int]:
-    try:
-        resp = my_credits_request(api_client)
-    except Exception:
-        return None
-    if not isinstance(resp, dict) or resp.get("status_code") != 200:
-        return None
-    return extract_feature_credit_count(resp.get("json"))
+    return get_credits_ledger(api_client).feature_credits()
 
 
 def extract_feature_credit_count(payload) -> Optional[int]:
@@ -53,20 +47,9 @@ def _coerce_int(value) -> Optional[int]:
 def resolve_ad_id_and_price(api_client, ref: dict, api_version: str) -> Tuple[int, int]:
     """Resolve ad id and price from either ad_id or slug."""
     ad_id = ref.get("ad_id")
-    if ad_id:
-        details = api_client.request(
-            "GET",
-            f"/used-cars/{ad_id}.json",
-            params={"api_version": api_version},
-        )
-    else:
-        slug = ref.get("slug") or ref.get("success")
-        assert slug, "Need ad_id or slug in ad_ref to resolve."
-        details = api_client.request(
-            "GET",
-            _normalize_slug(slug, ensure_json_suffix=True),
-            params={"api_version": api_version},
-        )
+    slug = ref.get("slug") or ref.get("success")
+    assert ad_id or slug, "Need ad_id or slug in ad_ref to resolve."
+    details = fetch_ad_details(api_client, ad_id=ad_id, slug=slug, api_version=api_version)
 
     body = details.get("json") or {}
     listing = body.get("ad_listing") or body.get("used_car") or body
@@ -90,11 +73,7 @@ def resolve_ad_id_and_price(api_client, ref: dict, api_version: str) -> Tuple[in
 def ensure_ad_listing_id(api_client, ad_ref: dict, ad_id: int, api_version: str) -> int:
     if "ad_listing_id" in ad_ref and ad_ref["ad_listing_id"] is not None:
         return int(ad_ref["ad_listing_id"])
-    details = api_client.request(
-        "GET",
-        f"/used-cars/{ad_id}.json",
-        params={"api_version": api_version},
-    )
+    details = fetch_ad_details(api_client, ad_id=ad_id, api_version=api_version)
     body = details.get("json") or {}
     candidates = []
     for key in ("ad_listing_id", "listing_id"):
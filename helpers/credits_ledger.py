@@ -0,0 +1,192 @@
+"""
+Per-account local ledger of user credits.
+
+``feature_used_car`` and ``get_user_credit`` used to call
+``/users/my-credits.json`` every time they needed a balance. The ledger loads
+the balances once and then answers locally. Feature and checkout responses
+update it, and it reconciles with the server every
+``CREDITS_RECONCILE_INTERVAL`` seconds or after a change it cannot account
+for. When the server disagrees with the local balances, the difference is
+logged and recorded as drift, and the server values are adopted.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from helpers.metrics import record_value
+
+__all__ = [
+    "CreditsLedger",
+    "get_credits_ledger",
+    "clear_credits_ledgers",
+]
+
+RECONCILE_INTERVAL = float(os.getenv("CREDITS_RECONCILE_INTERVAL", "120"))
+DRIFT_METRIC = "credits_drift"
+
+_LEDGERS: Dict[Tuple[str, Optional[str]], "CreditsLedger"] = {}
+_LEDGERS_LOCK = threading.Lock()
+
+
+def _parse_credits(payload) -> Optional[Dict[str, int]]:
+    """Pull ``credit_details.user_credits`` (name -> count) out of a response body."""
+    if not isinstance(payload, dict):
+        return None
+    user_credits = (payload.get("credit_details") or {}).get("user_credits")
+    if not isinstance(user_credits, dict):
+        return None
+    parsed = {}
+    for name, value in user_credits.items():
+        try:
+            parsed[name] = int(value)
+        except (TypeError, ValueError):
+            continue
+    return parsed
+
+
+def _feature_key(credits: Dict[str, int]) -> Optional[str]:
+    for name in credits:
+        lowered = name.lower()
+        if "feature" in lowered and "credit" in lowered:
+            return name
+    return None
+
+
+class CreditsLedger:
+    """Local view of one account's credit balances."""
+
+    def __init__(self, api_client, reconcile_interval: Optional[float] = None) -> None:
+        self.api_client = api_client
+        self.reconcile_interval = reconcile_interval if reconcile_interval is not None else RECONCILE_INTERVAL
+        self.drift_events: List[dict] = []
+        self._lock = threading.RLock()
+        self._credits: Optional[Dict[str, int]] = None
+        self._synced_at = 0.0
+        self._stale = True
+
+    # -- server sync ----------------------------------------------------------
+
+    def _fetch(self) -> Optional[Dict[str, int]]:
+        # Imported here: helpers.payment imports this module.
+        from helpers.payment import my_credits_request
+
+        try:
+            resp = my_credits_request(self.api_client)
+        except Exception as exc:
+            print(f"⚠️ my-credits lookup failed: {exc}")
+            return None
+        if not isinstance(resp, dict) or resp.get("status_code") != 200:
+            return None
+        parsed = _parse_credits(resp.get("json")) or {}
+        if _feature_key(parsed) is None:
+            # Some payloads report feature credits outside user_credits.
+            from helpers.car_ads_utils import extract_feature_credit_count
+
+            count = extract_feature_credit_count(resp.get("json"))
+            if count is not None:
+                parsed["feature_credits"] = count
+        return parsed
+
+    def reconcile(self) -> Dict[str, Tuple[Optional[int], Optional[int]]]:
+        """
+        Re-read balances from the server and adopt them.
+
+        Returns the drift as ``{name: (local, server)}`` for every balance that
+        differed from the local ledger (empty on first load or when in sync).
+        """
+        server = self._fetch()
+        with self._lock:
+            if server is None:
+                return {}
+            drift: Dict[str, Tuple[Optional[int], Optional[int]]] = {}
+            if self._credits is not None and not self._stale:
+                for name in set(self._credits) | set(server):
+                    local, remote = self._credits.get(name), server.get(name)
+                    if local != remote:
+                        drift[name] = (local, remote)
+            if drift:
+                print(f"⚠️ Credits ledger drifted from server: {drift}")
+                record_value(DRIFT_METRIC, len(drift))
+                self.drift_events.append({"at": time.time(), "drift": drift})
+            self._credits = server
+            self._synced_at = time.monotonic()
+            self._stale = False
+            return drift
+
+    def _ensure_fresh(self) -> None:
+        with self._lock:
+            due = self._credits is None or self._stale or (
+                time.monotonic() - self._synced_at >= self.reconcile_interval
+            )
+        if due:
+            self.reconcile()
+
+    def mark_stale(self) -> None:
+        """Force a reconcile on the next lookup (after a change the ledger cannot model)."""
+        with self._lock:
+            self._stale = True
+
+    # -- lookups --------------------------------------------------------------
+
+    def available(self) -> bool:
+        self._ensure_fresh()
+        with self._lock:
+            return self._credits is not None
+
+    def balances(self) -> Dict[str, int]:
+        self._ensure_fresh()
+        with self._lock:
+            return dict(self._credits or {})
+
+    def get(self, name: str, default: int = 0) -> int:
+        return self.balances().get(name, default)
+
+    def feature_credits(self) -> Optional[int]:
+        """Remaining feature credits, or None when the balance is unknown."""
+        balances = self.balances()
+        key = _feature_key(balances)
+        return balances.get(key) if key else None
+
+    # -- local updates --------------------------------------------------------
+
+    def debit(self, name: str, amount: int) -> None:
+        with self._lock:
+            if self._credits is not None and name in self._credits:
+                self._credits[name] = self._credits[name] - int(amount)
+
+    def debit_feature(self, weeks: int) -> None:
+        with self._lock:
+            key = _feature_key(self._credits or {})
+        if key:
+            self.debit(key, weeks)
+        else:
+            self.mark_stale()
+
+    def apply_response(self, payload) -> bool:
+        """Adopt balances carried by a feature/checkout response body; True if it had any."""
+        parsed = _parse_credits(payload)
+        if parsed is None:
+            return False
+        with self._lock:
+            self._credits = {**(self._credits or {}), **parsed}
+        return True
+
+
+def get_credits_ledger(api_client) -> CreditsLedger:
+    """Return the shared ledger for the account behind ``api_client``."""
+    key = (api_client.base_url, getattr(api_client, "access_token", None))
+    with _LEDGERS_LOCK:
+        ledger = _LEDGERS.get(key)
+        if ledger is None:
+            ledger = CreditsLedger(api_client)
+            _LEDGERS[key] = ledger
+        return ledger
+
+
+def clear_credits_ledgers() -> None:
+    with _LEDGERS_LOCK:
+        _LEDGERS.clear()
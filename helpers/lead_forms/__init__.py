@@ -9,6 +9,7 @@ from .inspection import (
 )
 from .auction_sheet import (
     verify_auction_sheet,
+    verify_auction_sheets_batch,
     create_auction_sheet_request,
     fetch_auction_sheet_product_options,
 )
@@ -16,6 +17,9 @@ from .insurance import submit_car_insurance_lead, fetch_car_insurance_packages
 from .finance import submit_car_finance_lead
 from .registration import submit_car_registration_transfer_lead, update_car_registration_transfer_lead
 from .utils import compare_against_snapshot, validate_against_schema
+from .reference_data import cached_reference_request, get_reference_cache, warm_reference_data
+from .load_driver import LeadPayloadGenerator, read_lead_stream, run_lead_load, write_lead_stream
+from .pipeline import Stage, StageSkipped, register_lead_pipeline, run_lead_pipeline
 
 __all__ = [
     "fetch_carsure_cities",
@@ -24,6 +28,7 @@ __all__ = [
     "update_carsure_inspection_request",
     "validate_checkout_response",
     "verify_auction_sheet",
+    "verify_auction_sheets_batch",
     "create_auction_sheet_request",
     "fetch_auction_sheet_product_options",
     "submit_car_insurance_lead",
@@ -33,4 +38,15 @@ __all__ = [
     "update_car_registration_transfer_lead",
     "validate_against_schema",
     "compare_against_snapshot",
+    "cached_reference_request",
+    "get_reference_cache",
+    "warm_reference_data",
+    "LeadPayloadGenerator",
+    "read_lead_stream",
+    "run_lead_load",
+    "write_lead_stream",
+    "Stage",
+    "StageSkipped",
+    "register_lead_pipeline",
+    "run_lead_pipeline",
 ]
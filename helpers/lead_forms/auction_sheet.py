@@ -1,7 +1,14 @@
 from __future__ import annotations
 
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from helpers.metrics import percentile, record_latency
 
 from .utils import compare_against_snapshot, validate_against_schema
 VERIFY_SCHEMA_PATH = Path("schemas/lead_forms/auction_sheet_verify_schema.json")
@@ -10,6 +17,24 @@ VERIFY_SNAPSHOT_PATH = Path("data/expected_responses/lead_forms/auction_sheet_ve
 CREATE_SCHEMA_PATH = Path("schemas/lead_forms/auction_sheet_request_schema.json")
 CREATE_SNAPSHOT_PATH = Path("data/expected_responses/lead_forms/auction_sheet_request.json")
 
+VERIFY_METRIC = "auction_sheet_verify"
+VERIFY_CACHE_TTL = float(os.getenv("AUCTION_SHEET_CACHE_TTL", "3600"))
+
+# (base_url, api_version, chassis) -> (stored_at, result row)
+_VERIFY_CACHE: Dict[Tuple[str, str, str], Tuple[float, dict]] = {}
+_VERIFY_CACHE_LOCK = threading.Lock()
+
+
+def _verify_request(api_client, chassis_number: str, version: str) -> dict:
+    return api_client.request(
+        "GET",
+        "/auction_sheet_requests/verify.json",
+        params={
+            "api_version": version,
+            "chassis_number": chassis_number,
+        },
+    )
+
 
 def verify_auction_sheet(
     api_client,
@@ -26,14 +51,7 @@ def verify_auction_sheet(
         raise ValueError("chassis_number is required to verify auction sheet")
 
     version = str(api_version or "22")
-    response = api_client.request(
-        "GET",
-        "/auction_sheet_requests/verify.json",
-        params={
-            "api_version": version,
-            "chassis_number": chassis_number,
-        },
-    )
+    response = _verify_request(api_client, chassis_number, version)
     validator.assert_status_code(response["status_code"], 200)
 
     payload = response.get("json") or {}
@@ -98,3 +116,199 @@ def fetch_auction_sheet_product_options(
     validator.assert_status_code(response["status_code"], 200)
 
     return response.get("json") or {}
+
+
+def read_chassis_numbers(path: Union[str, Path]) -> Iterator[str]:
+    """Yield chassis numbers from a file: one per line (first CSV column), ``#`` comments skipped."""
+    with Path(path).open("r", encoding="utf-8") as handle:
+        for line in handle:
+            value = line.split("#", 1)[0].split(",", 1)[0].strip()
+            if value and value.lower() != "chassis_number":
+                yield value
+
+
+def clear_auction_sheet_cache() -> None:
+    with _VERIFY_CACHE_LOCK:
+        _VERIFY_CACHE.clear()
+
+
+def _verify_one(api_client, validator, chassis_number: str, version: str, schema_file: Optional[Path]) -> dict:
+    row = {"chassis_number": chassis_number, "status_code": None, "elapsed": None, "error": None}
+    start = time.perf_counter()
+    try:
+        response = _verify_request(api_client, chassis_number, version)
+    except Exception as exc:
+        row["error"] = str(exc)[:500]
+        return row
+    finally:
+        row["elapsed"] = round(time.perf_counter() - start, 4)
+    record_latency(VERIFY_METRIC, row["elapsed"])
+
+    payload = response.get("json")
+    row["status_code"] = response["status_code"]
+    if not isinstance(payload, dict):
+        row["error"] = f"HTTP {response['status_code']}: expected a JSON object, got {type(payload).__name__}"
+        return row
+    row["found"] = payload.get("auctionSheetFound")
+    row["matches_used_car"] = payload.get("matchesUsedCar")
+    row["auction_sheet_id"] = (payload.get("auctionSheet") or {}).get("id")
+    if response["status_code"] != 200:
+        row["error"] = f"HTTP {response['status_code']}: {json.dumps(payload)[:300]}"
+    elif schema_file is not None:
+        try:
+            validate_against_schema(validator, payload, schema_file)
+        except AssertionError as exc:
+            row["error"] = f"schema: {exc}"[:500]
+    return row
+
+
+def verify_auction_sheets_batch(
+    api_client,
+    validator,
+    chassis_numbers: Union[str, Path, Iterable[str]],
+    *,
+    report_path: Optional[Union[str, Path]] = None,
+    max_workers: Optional[int] = None,
+    api_version: Optional[str] = None,
+    schema_path: Optional[str] = None,
+    refresh: bool = False,
+) -> dict:
+    """
+    Verify many chassis numbers with at most ``max_workers`` requests in flight.
+
+    ``chassis_numbers`` is a file path (see ``read_chassis_numbers``) or an
+    iterable. It is consumed lazily. Numbers are normalised (stripped,
+    upper-cased) and each is requested once. Repeats, including ones still
+    in flight, share the first result. Successful results stay cached for
+    ``AUCTION_SHEET_CACHE_TTL`` seconds across batches unless ``refresh`` is set.
+
+    One JSON line per input number is streamed to ``report_path`` as results
+    arrive (``chassis_number``, ``status_code``, ``found``, ``matches_used_car``,
+    ``auction_sheet_id``, ``elapsed``, ``cached``, ``error``); rows are not kept
+    in memory. Returns a summary with counts, throughput and request latency
+    percentiles. Failures are reported, not raised.
+    """
+    version = str(api_version or "22")
+    max_workers = max_workers or int(os.getenv("AUCTION_SHEET_VERIFY_WORKERS", "8"))
+    schema_file = Path(schema_path) if schema_path else VERIFY_SCHEMA_PATH
+    if isinstance(chassis_numbers, (str, Path)):
+        chassis_numbers = read_chassis_numbers(chassis_numbers)
+
+    lock = threading.Lock()
+    report = None
+    if report_path:
+        Path(report_path).parent.mkdir(parents=True, exist_ok=True)
+        report = Path(report_path).open("w", encoding="utf-8")
+
+    # Only running totals are kept. Futures stay in ``pending`` while in flight;
+    # finished successes are read back from ``_VERIFY_CACHE`` and failures from
+    # ``failed``, so memory does not grow with every row.
+    counts = {"total": 0, "cache_hits": 0, "found": 0, "errors": 0}
+    latencies: List[float] = []
+    seen: set = set()
+    pending: Dict[str, Future] = {}
+    failed: Dict[str, dict] = {}
+    in_flight = threading.BoundedSemaphore(max_workers * 2)
+    batch_started = time.time()
+
+    def _emit(row: dict) -> None:
+        with lock:
+            counts["total"] += 1
+            counts["cache_hits"] += 1 if row["cached"] else 0
+            counts["found"] += 1 if row.get("found") else 0
+            counts["errors"] += 1 if row["error"] else 0
+            if not row["cached"] and row["elapsed"] is not None:
+                latencies.append(row["elapsed"])
+            if report is not None:
+                report.write(json.dumps(row, ensure_ascii=False) + "\n")
+                report.flush()
+
+    def _verify(key: str) -> dict:
+        try:
+            try:
+                row = _verify_one(api_client, validator, key, version, schema_file)
+            except Exception as exc:
+                # Never let a worker raise: the callback would drop the row from the report and counts.
+                row = {"chassis_number": key, "status_code": None, "elapsed": None, "error": f"{exc!r}"[:500]}
+            if row["error"] is None:
+                with _VERIFY_CACHE_LOCK:
+                    _VERIFY_CACHE[(api_client.base_url, version, key)] = (time.time(), row)
+            else:
+                with lock:
+                    failed[key] = row
+            return row
+        finally:
+            in_flight.release()
+
+    def _done(key: str, raw: str, future: Future) -> None:
+        with lock:
+            pending.pop(key, None)
+        _emit({**future.result(), "chassis_number": raw, "cached": False})
+
+    def _cached_row(key: str, use_ttl: bool) -> Optional[dict]:
+        with _VERIFY_CACHE_LOCK:
+            entry = _VERIFY_CACHE.get((api_client.base_url, version, key))
+        if not entry:
+            return None
+        # Results stored during this batch are reused whatever the TTL, so each
+        # number is requested once even with AUCTION_SHEET_CACHE_TTL=0.
+        if entry[0] >= batch_started or (use_ttl and time.time() - entry[0] < VERIFY_CACHE_TTL):
+            return entry[1]
+        return None
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for raw in chassis_numbers:
+                key = raw.strip().upper()
+                if not key:
+                    continue
+                with lock:
+                    future = pending.get(key)
+                    row = failed.get(key)
+                if future is not None:
+                    future.add_done_callback(lambda f, raw=raw: _emit({**f.result(), "chassis_number": raw, "cached": True}))
+                    continue
+                if key in seen:
+                    # Finished earlier in this batch: reuse its result even with ``refresh``.
+                    row = row or _cached_row(key, use_ttl=not refresh)
+                else:
+                    seen.add(key)
+                    row = None if refresh else _cached_row(key, use_ttl=True)
+                if row is not None:
+                    _emit({**row, "chassis_number": raw, "cached": True})
+                    continue
+                in_flight.acquire()
+                future = pool.submit(_verify, key)
+                with lock:
+                    pending[key] = future
+                future.add_done_callback(lambda f, key=key, raw=raw: _done(key, raw, f))
+    finally:
+        if report is not None:
+            report.close()
+    wall = time.perf_counter() - started
+
+    summary = {
+        "total": counts["total"],
+        "unique": len(seen),
+        "requests": len(latencies),
+        "cache_hits": counts["cache_hits"],
+        "found": counts["found"],
+        "errors": counts["errors"],
+        "elapsed": round(wall, 3),
+        "throughput": round(counts["total"] / wall, 2) if wall else None,
+        "request_rate": round(len(latencies) / wall, 2) if wall else None,
+        "latency": {
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies) if latencies else None,
+        },
+        "report_path": str(report_path) if report_path else None,
+    }
+    print(
+        f"🔎 Verified {summary['total']} chassis numbers ({summary['unique']} unique, "
+        f"{summary['requests']} requests, {summary['cache_hits']} cached, {summary['errors']} errors) in {wall:.1f}s "
+        f"({summary['throughput']}/s) latency={summary['latency']}"
+    )
+    return summary
@@ -3,6 +3,7 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Optional
 
+from .reference_data import cached_reference_request
 from .utils import compare_against_snapshot, validate_against_schema
 
 CITIES_SCHEMA_PATH = Path("schemas/lead_forms/carsure_cities_schema.json")
@@ -28,16 +29,18 @@ def fetch_carsure_cities(
     api_version: Optional[str] = None,
     expected_path: Optional[str] = None,
     schema_path: Optional[str] = None,
+    refresh: bool = False,
 ) -> dict:
-    """Return the list of Carsure inspection cities for the authenticated user."""
+    """Return the list of Carsure inspection cities (via the shared reference-data cache)."""
     if not access_token:
         raise ValueError("access_token is required to fetch Carsure cities")
 
     version = str(api_version or "22")
-    response = api_client.request(
-        "GET",
+    response = cached_reference_request(
+        api_client,
         "/main/carsure_cities.json",
-        params={"access_token": access_token, "api_version": version},
+        {"access_token": access_token, "api_version": version},
+        refresh=refresh,
     )
     validator.assert_status_code(response["status_code"], 200)
 
@@ -56,23 +59,25 @@ def fetch_carsure_city_areas(
     city_areas_type: str = "inspection",
     expected_path: Optional[str] = None,
     schema_path: Optional[str] = None,
+    refresh: bool = False,
 ) -> dict:
-    """Return Carsure inspection areas for the given city id."""
+    """Return Carsure inspection areas for the given city id (via the shared reference-data cache)."""
     if not access_token:
         raise ValueError("access_token is required to fetch Carsure city areas")
     if not city_id:
         raise ValueError("city_id is required to fetch Carsure city areas")
 
     version = str(api_version or "18")
-    response = api_client.request(
-        "GET",
+    response = cached_reference_request(
+        api_client,
         "/main/get_all_city_areas.json",
-        params={
+        {
             "access_token": access_token,
             "api_version": version,
             "city_id": city_id,
             "city_areas_type": city_areas_type,
         },
+        refresh=refresh,
     )
     validator.assert_status_code(response["status_code"], 200)
 
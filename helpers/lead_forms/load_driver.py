@@ -0,0 +1,419 @@
+"""
+Load driver for the lead intake endpoints.
+
+The lead tests send one fixed payload per product. To reproduce
+marketing-campaign spikes, ``run_lead_load`` replays a stream of lead records
+at a target rate, round-robin across a pool of authenticated clients. Each
+record is one JSON object::
+
+    {"product": "sifm", "payload": {...}, "update": {...}}
+
+``product`` is one of ``sifm``, ``insurance``, ``finance`` or ``registration``.
+``payload`` is the submit body and ``update`` the optional phase-2 body (SIFM
+and registration only). Records come from a JSONL file (``read_lead_stream``)
+or from ``LeadPayloadGenerator``. Record ``i`` of a generator depends only on
+``(seed, i)``, and ``write_lead_stream`` saves a generated stream so a spike
+can be replayed exactly.
+
+The existing submit/update helpers send the requests. Status codes and
+schemas are still checked, but snapshot comparison is skipped because each
+record differs from the fixed snapshot.
+
+``tests/lead_forms/test_lead_load.py`` runs a small load when ``LEAD_LOAD_RECORDS``
+is set; it is skipped otherwise so normal runs do not create leads in bulk.
+"""
+
+from __future__ import annotations
+
+import copy
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from helpers.metrics import percentile, record_latency
+
+from .finance import submit_car_finance_lead
+from .insurance import submit_car_insurance_lead
+from .registration import submit_car_registration_transfer_lead, update_car_registration_transfer_lead
+from .sifm import submit_sell_it_for_me_lead, update_sell_it_for_me_lead
+
+__all__ = [
+    "LEAD_PRODUCTS",
+    "LeadPayloadGenerator",
+    "read_lead_stream",
+    "write_lead_stream",
+    "run_lead_load",
+]
+
+LOAD_METRIC = "lead_load"
+PAYLOADS = Path("data/payloads")
+SIFM_CITIES_SNAPSHOT = Path("data/expected_responses/sifm/cities.json")
+MOBILE_PREFIX = os.getenv("LEAD_LOAD_MOBILE_PREFIX", "0360")
+
+NAMES = ("Ali", "Ahmed", "Sara", "Usman", "Ayesha", "Bilal", "Hina", "Test")
+YEARS = tuple(range(2012, 2025))
+
+
+class _LoadValidator:
+    """Checks status codes and schemas through ``validator`` but skips snapshot comparison."""
+
+    def __init__(self, validator, check_schema: bool = True) -> None:
+        self._validator = validator
+        self._check_schema = check_schema
+
+    def assert_status_code(self, actual, expected) -> None:
+        self._validator.assert_status_code(actual, expected)
+
+    def assert_json_schema(self, payload, schema_path) -> None:
+        if self._check_schema:
+            self._validator.assert_json_schema(payload, schema_path)
+
+    def compare_with_expected(self, *args, **kwargs) -> None:
+        return None
+
+
+def _sifm_submit(client, validator, payload):
+    return submit_sell_it_for_me_lead(client, validator, lead_payload=payload.get("sell_it_for_me_lead"))
+
+
+def _sifm_update(client, validator, lead_id, payload):
+    return update_sell_it_for_me_lead(client, validator, lead_id=lead_id, lead_payload=payload.get("sell_it_for_me_lead"))
+
+
+def _registration_update(client, validator, lead_id, payload):
+    return update_car_registration_transfer_lead(client, validator, lead_id=lead_id, payload=payload)
+
+
+# product -> submit(client, validator, payload), lead-id key, update(client, validator, lead_id, payload)
+LEAD_PRODUCTS: Dict[str, dict] = {
+    "sifm": {"submit": _sifm_submit, "id_key": "sell_it_for_me_lead_id", "update": _sifm_update},
+    "insurance": {
+        "submit": lambda client, validator, payload: submit_car_insurance_lead(client, validator, payload=payload),
+        "id_key": None,
+        "update": None,
+    },
+    "finance": {
+        "submit": lambda client, validator, payload: submit_car_finance_lead(client, validator, payload=payload),
+        "id_key": None,
+        "update": None,
+    },
+    "registration": {
+        "submit": lambda client, validator, payload: submit_car_registration_transfer_lead(
+            client, validator, payload=payload
+        ),
+        "id_key": "car_registration_transfer_lead_id",
+        "update": _registration_update,
+    },
+}
+
+
+def _read_json(path: Path) -> dict:
+    with path.open("r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def read_lead_stream(path: Union[str, Path]) -> Iterator[dict]:
+    """Yield lead records from a JSONL file, skipping blank lines."""
+    with Path(path).open("r", encoding="utf-8") as handle:
+        for line_no, line in enumerate(handle, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get("product") not in LEAD_PRODUCTS:
+                raise ValueError(f"{path}:{line_no}: unknown lead product {record.get('product')!r}")
+            yield record
+
+
+def write_lead_stream(path: Union[str, Path], records: Iterable[dict]) -> int:
+    """Write ``records`` as JSONL (e.g. a generated spike to replay later); returns the count."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with path.open("w", encoding="utf-8") as handle:
+        for record in records:
+            handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+class LeadPayloadGenerator:
+    """Deterministic generator of lead records built from the payload files."""
+
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        products: Optional[Dict[str, float]] = None,
+        update_fraction: float = 0.0,
+    ) -> None:
+        self.seed = int(seed if seed is not None else os.getenv("LEAD_LOAD_SEED", "1337"))
+        weights = products or {name: 1.0 for name in LEAD_PRODUCTS}
+        unknown = set(weights) - set(LEAD_PRODUCTS)
+        if unknown:
+            raise ValueError(f"Unknown lead products: {sorted(unknown)}")
+        self.products = list(weights)
+        self.weights = [float(weights[name]) for name in self.products]
+        self.update_fraction = update_fraction
+
+        self.sifm = _read_json(PAYLOADS / "sifm_lead.json")
+        self.sifm_update = _read_json(PAYLOADS / "sifm_lead_phase2.json")
+        self.insurance = _read_json(PAYLOADS / "lead_forms/car_insurance_request.json")
+        self.finance = [
+            _read_json(PAYLOADS / "lead_forms/car_finance_request.json"),
+            _read_json(PAYLOADS / "lead_forms/car_finance_used_request.json"),
+        ]
+        self.registration = _read_json(PAYLOADS / "lead_forms/car_registration_transfer_request.json")
+        self.registration_update = _read_json(PAYLOADS / "lead_forms/car_registration_transfer_update.json")
+        self.sifm_cities = [1]
+        if SIFM_CITIES_SNAPSHOT.exists():
+            cities = _read_json(SIFM_CITIES_SNAPSHOT).get("sell_it_for_me_cities") or []
+            self.sifm_cities = [city["id"] for city in cities if city.get("id")] or self.sifm_cities
+
+    @staticmethod
+    def _mobile(rng: random.Random) -> str:
+        return f"{MOBILE_PREFIX}{rng.randrange(10 ** (11 - len(MOBILE_PREFIX))):0{11 - len(MOBILE_PREFIX)}d}"
+
+    def make(self, index: int) -> dict:
+        """Return record number ``index`` for this seed."""
+        rng = random.Random(f"{self.seed}:{index}")
+        product = rng.choices(self.products, weights=self.weights)[0]
+        mobile, name = self._mobile(rng), rng.choice(NAMES)
+        record: dict = {"product": product, "index": index}
+
+        if product == "sifm":
+            payload = copy.deepcopy(self.sifm)
+            payload["sell_it_for_me_lead"].update(
+                {"city_id": rng.choice(self.sifm_cities), "name": name, "mobile_number": mobile}
+            )
+            update = copy.deepcopy(self.sifm_update)
+            update["sell_it_for_me_lead"].update({"model_year": rng.choice(YEARS), "mobile_number": mobile})
+        elif product == "insurance":
+            payload = copy.deepcopy(self.insurance)
+            payload["car_insurance_lead"].update(
+                {
+                    "name": name,
+                    "mobile_number": mobile,
+                    "year": str(rng.choice(YEARS)),
+                    "car_value": str(rng.randrange(1_000, 15_000) * 1000),
+                }
+            )
+            update = None
+        elif product == "finance":
+            payload = copy.deepcopy(rng.choice(self.finance))
+            lead = payload["car_finance_lead"]
+            lead.update({"name": name, "mobile": mobile, "down_payment": str(rng.choice((20, 30, 40, 50)))})
+            if lead.get("cnic") in {"00000-0000000-0", "", None}:
+                lead["cnic"] = "99999-9999999-9"
+            payload["user"]["email"] = payload["user"].get("email") or f"leadload+{self.seed}-{index}@mailinator.com"
+            update = None
+        else:
+            payload = copy.deepcopy(self.registration)
+            payload["car_registration_transfer_lead"].update({"name": name, "mobile_number": mobile})
+            update = copy.deepcopy(self.registration_update)
+            update["car_registration_transfer_lead"]["model_year"] = rng.choice(YEARS)
+
+        record["payload"] = payload
+        if update is not None and rng.random() < self.update_fraction:
+            record["update"] = update
+        return record
+
+    def stream(self, count: int, start: int = 0) -> Iterator[dict]:
+        """Yield ``count`` records starting at ``start``."""
+        for index in range(start, start + count):
+            yield self.make(index)
+
+
+def _summarise(values: List[float]) -> dict:
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4),
+        "p50": round(percentile(values, 50), 4),
+        "p90": round(percentile(values, 90), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(max(values), 4),
+    }
+
+
+def run_lead_load(
+    api_clients: Sequence,
+    validator,
+    records: Iterable[dict],
+    rate: Optional[float] = None,
+    update_fraction: Optional[float] = None,
+    max_workers: Optional[int] = None,
+    check_schema: bool = True,
+    max_in_flight: Optional[int] = None,
+    on_result: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Submit ``records`` round-robin across ``api_clients`` at ``rate`` leads/second.
+
+    ``rate`` (``LEAD_LOAD_RATE``) submits record ``i`` at ``start + i / rate``
+    without waiting for earlier responses, so slow responses do not lower the
+    offered load. Submit latency is measured from that scheduled time, so time
+    spent queued behind slow calls counts too. A record that comes due while
+    ``max_in_flight`` (``LEAD_LOAD_MAX_IN_FLIGHT``, default ``16 * max_workers``)
+    leads are outstanding is dropped and counted, not delayed. Without ``rate``,
+    at most ``2 * max_workers`` leads are queued and the run goes as fast as
+    ``max_workers`` allows. A record's phase-2 update runs when it carries an ``update``
+    body. If ``update_fraction`` is given, it overrides the records: that
+    fraction of updatable leads is updated (decided per index, so reruns
+    match), using the record's update body or the product's payload file.
+
+    Returns ``{"products": {product: report}, "submitted", "dropped", "errors",
+    "elapsed", "target_rate", "achieved_rate"}``. Each product report has
+    throughput, error rate, successful updates and submit/update latency percentiles.
+    """
+    if not api_clients:
+        raise AssertionError("Need at least one api_client to drive lead load.")
+    rate = rate if rate is not None else (float(os.getenv("LEAD_LOAD_RATE")) if os.getenv("LEAD_LOAD_RATE") else None)
+    max_workers = max_workers or int(os.getenv("LEAD_LOAD_WORKERS", "16"))
+    max_in_flight = max_in_flight or int(os.getenv("LEAD_LOAD_MAX_IN_FLIGHT", str(max_workers * 16)))
+    checker = _LoadValidator(validator, check_schema=check_schema)
+    defaults = None
+
+    def _should_update(record: dict, index: int) -> Optional[dict]:
+        nonlocal defaults
+        spec = LEAD_PRODUCTS[record["product"]]
+        if spec["update"] is None:
+            return None
+        if update_fraction is None:
+            return record.get("update")
+        if random.Random(f"update:{index}").random() >= update_fraction:
+            return None
+        if record.get("update") is not None:
+            return record["update"]
+        if defaults is None:
+            defaults = LeadPayloadGenerator(update_fraction=1.0)
+        template = defaults.sifm_update if record["product"] == "sifm" else defaults.registration_update
+        return copy.deepcopy(template)
+
+    def _run(index: int, record: dict, scheduled: float) -> dict:
+        product = record["product"]
+        spec = LEAD_PRODUCTS[product]
+        client = api_clients[index % len(api_clients)]
+        result = {"index": record.get("index", index), "product": product, "account": index % len(api_clients),
+                  "submit": None, "update": None, "updated": False, "lead_id": None, "error": None}
+
+        try:
+            body = spec["submit"](client, checker, record["payload"])
+        except Exception as exc:
+            result["error"] = f"submit: {exc}"[:500]
+            return result
+        finally:
+            result["submit"] = round(time.perf_counter() - scheduled, 4)
+            record_latency(f"{LOAD_METRIC}.{product}.submit", result["submit"])
+
+        try:
+            update = _should_update(record, index)
+        except Exception as exc:
+            result["error"] = f"update: {exc!r}"[:500]
+            return result
+        if update is None:
+            return result
+        lead_id = body.get(spec["id_key"]) if isinstance(body, dict) else None
+        result["lead_id"] = lead_id
+        if not lead_id:
+            result["error"] = f"update: no {spec['id_key']} in submit response"
+            return result
+        start = time.perf_counter()
+        try:
+            spec["update"](client, checker, lead_id, update)
+            result["updated"] = True
+        except Exception as exc:
+            result["error"] = f"update: {exc}"[:500]
+        finally:
+            result["update"] = round(time.perf_counter() - start, 4)
+            record_latency(f"{LOAD_METRIC}.{product}.update", result["update"])
+        return result
+
+    results: List[dict] = []
+    results_lock = threading.Lock()
+
+    outstanding = 0
+    dropped = 0
+
+    def _collect(future, index: int, product: str) -> None:
+        nonlocal outstanding
+        try:
+            result = future.result()
+        except Exception as exc:
+            # Unexpected failure in the driver itself; report it as an error row.
+            result = {"index": index, "product": product, "account": index % len(api_clients), "submit": None,
+                      "update": None, "updated": False, "lead_id": None, "error": f"driver: {exc!r}"[:500]}
+        finally:
+            with results_lock:
+                outstanding -= 1
+            if not rate:
+                closed_loop.release()
+        with results_lock:
+            results.append(result)
+        if on_result is not None:
+            on_result(result)
+
+    closed_loop = threading.BoundedSemaphore(max_workers * 2)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for index, record in zip(itertools.count(), records):
+            if rate:
+                scheduled = started + index / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                with results_lock:
+                    if outstanding >= max_in_flight:
+                        dropped += 1
+                        continue
+                    outstanding += 1
+            else:
+                closed_loop.acquire()
+                scheduled = time.perf_counter()
+                with results_lock:
+                    outstanding += 1
+            future = pool.submit(_run, index, record, scheduled)
+            future.add_done_callback(lambda f, index=index, product=record.get("product"): _collect(f, index, product))
+    wall = time.perf_counter() - started
+
+    products: Dict[str, dict] = {}
+    for product in sorted({r["product"] for r in results}):
+        rows = [r for r in results if r["product"] == product]
+        errors = sum(1 for r in rows if r["error"])
+        products[product] = {
+            "submitted": len(rows),
+            "updated": sum(1 for r in rows if r["updated"]),
+            "errors": errors,
+            "error_rate": round(errors / len(rows), 4),
+            "throughput": round(len(rows) / wall, 2) if wall else None,
+            "submit_latency": _summarise([r["submit"] for r in rows if r["submit"] is not None]),
+            "update_latency": _summarise([r["update"] for r in rows if r["update"] is not None]),
+            "sample_errors": [r["error"] for r in rows if r["error"]][:5],
+        }
+
+    total_errors = sum(p["errors"] for p in products.values())
+    achieved = len(results) / wall if wall else 0.0
+    print(
+        f"📈 Lead load: {len(results)} leads across {len(api_clients)} account(s) in {wall:.1f}s "
+        f"({achieved:.1f}/s, target {rate or 'max'}/s, errors={total_errors}, dropped={dropped})"
+    )
+    for product, report in products.items():
+        print(
+            f"   {product}: {report['submitted']} submitted, {report['updated']} updated, "
+            f"{report['throughput']}/s, error_rate={report['error_rate']}, submit={report['submit_latency']}"
+        )
+    return {
+        "products": products,
+        "submitted": len(results),
+        "dropped": dropped,
+        "errors": total_errors,
+        "elapsed": round(wall, 3),
+        "target_rate": rate,
+        "achieved_rate": round(achieved, 2),
+    }
@@ -0,0 +1,288 @@
+"""
+Declarative lead-form pipelines.
+
+Each lead product (SIFM, Carsure inspection, auction sheet, insurance,
+finance, registration transfer) is a list of ``Stage`` objects. A stage
+names the stages it depends on (``after``) and reads their responses from
+``ctx.results``, so values such as ticket ids flow between stages without
+extra lookups. ``run_lead_pipeline`` runs each stage once its dependencies
+have finished. Independent stages run concurrently. A ``fan_out`` stage runs
+once per item (e.g. per city id), with all items in flight together.
+Latency is recorded per stage under ``lead_pipeline.<product>.<stage>``.
+
+The product specs live in ``helpers.lead_forms.pipelines``. A new product only
+needs a stage list, passed directly or registered with ``register_lead_pipeline``.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from helpers.metrics import percentile, record_latency
+
+__all__ = [
+    "Stage",
+    "StageSkipped",
+    "PipelineContext",
+    "register_lead_pipeline",
+    "get_lead_pipeline",
+    "run_lead_pipeline",
+]
+
+PIPELINE_METRIC = "lead_pipeline"
+
+_PIPELINES: Dict[str, List["Stage"]] = {}
+_PIPELINES_LOCK = threading.Lock()
+
+
+class StageSkipped(Exception):
+    """Raised by a stage that cannot run (missing input or id); its dependents are skipped too."""
+
+
+class Stage:
+    """
+    One step of a lead pipeline.
+
+    ``run(ctx)`` returns the stage result. With ``fan_out``, ``fan_out(ctx)``
+    yields hashable items and ``run(ctx, item)`` is called for each of them
+    concurrently. The stage result is then ``{item: result}``.
+    """
+
+    __slots__ = ("name", "run", "after", "fan_out")
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[..., Any],
+        after: Sequence[str] = (),
+        fan_out: Optional[Callable[["PipelineContext"], Iterable[Any]]] = None,
+    ) -> None:
+        self.name = name
+        self.run = run
+        self.after = tuple(after)
+        self.fan_out = fan_out
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name!r}, after={self.after!r}, fan_out={self.fan_out is not None})"
+
+
+class PipelineContext:
+    """State shared by the stages of one pipeline run."""
+
+    def __init__(self, api_client, validator, product: str, inputs: Optional[dict] = None) -> None:
+        self.api_client = api_client
+        self.validator = validator
+        self.product = product
+        self.inputs: Dict[str, Any] = dict(inputs or {})
+        self.results: Dict[str, Any] = {}
+        self.access_token = self.inputs.get("access_token") or getattr(api_client, "access_token", None)
+
+    def input(self, name: str, default: Any = None, env: Optional[str] = None) -> Any:
+        """Value from ``inputs``, then the ``env`` variable, then ``default``."""
+        if self.inputs.get(name) is not None:
+            return self.inputs[name]
+        if env and os.getenv(env):
+            return os.getenv(env)
+        return default
+
+
+def _summarise(values: List[float]) -> dict:
+    """count/mean/p50/p90/p99/max of one run's call durations, like ``latency_summary``."""
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4),
+        "p50": round(percentile(values, 50), 4),
+        "p90": round(percentile(values, 90), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(max(values), 4),
+    }
+
+
+def _check_stages(stages: Sequence[Stage]) -> None:
+    names = [stage.name for stage in stages]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate stage names in pipeline: {names}")
+    known = set(names)
+    for stage in stages:
+        missing = [dep for dep in stage.after if dep not in known]
+        if missing:
+            raise ValueError(f"Stage {stage.name!r} depends on unknown stages {missing}")
+
+    order: List[str] = []
+    remaining = {stage.name: set(stage.after) for stage in stages}
+    while remaining:
+        ready = [name for name, deps in remaining.items() if deps <= set(order)]
+        if not ready:
+            raise ValueError(f"Pipeline has a dependency cycle among {sorted(remaining)}")
+        order.extend(ready)
+        for name in ready:
+            remaining.pop(name)
+
+
+def register_lead_pipeline(product: str, stages: Sequence[Stage]) -> None:
+    """Register (or replace) the stage list for ``product``."""
+    _check_stages(stages)
+    with _PIPELINES_LOCK:
+        _PIPELINES[product] = list(stages)
+
+
+def get_lead_pipeline(product: str) -> List[Stage]:
+    # Imported here so the product specs register themselves on first use.
+    from helpers.lead_forms import pipelines  # noqa: F401
+
+    with _PIPELINES_LOCK:
+        if product not in _PIPELINES:
+            raise KeyError(f"Unknown lead pipeline {product!r}; known: {sorted(_PIPELINES)}")
+        return list(_PIPELINES[product])
+
+
+def run_lead_pipeline(
+    api_client,
+    validator,
+    product: str,
+    stages: Optional[Sequence[Stage]] = None,
+    inputs: Optional[dict] = None,
+    max_workers: Optional[int] = None,
+) -> dict:
+    """
+    Run the pipeline for ``product`` (or the given ``stages``).
+
+    ``inputs`` overrides per-product values such as ``city_id`` or payloads
+    (see ``helpers.lead_forms.pipelines``). At most ``max_workers``
+    (``LEAD_PIPELINE_WORKERS``, default 8) calls are in flight.
+
+    Returns ``{"product", "results", "skipped", "stages", "latency", "elapsed"}``.
+    ``results`` maps stage name to response. ``skipped`` maps skipped stage names to
+    reasons. ``stages`` holds each stage's wall time. ``latency`` summarises this
+    run's calls per stage (fan-out stages have one call per item). The first stage failure is
+    re-raised once in-flight calls finish, so validator assertions surface
+    unchanged.
+    """
+    if stages is None:
+        stages = get_lead_pipeline(product)
+    else:
+        _check_stages(stages)
+    max_workers = max_workers or int(os.getenv("LEAD_PIPELINE_WORKERS", "8"))
+
+    ctx = PipelineContext(api_client, validator, product, inputs)
+    by_name = {stage.name: stage for stage in stages}
+    waiting = dict(by_name)
+    started_at: Dict[str, float] = {}
+    outstanding: Dict[str, int] = {}
+    partial: Dict[str, dict] = {}
+    stage_times: Dict[str, float] = {}
+    skipped: Dict[str, str] = {}
+    durations: Dict[str, List[float]] = {stage.name: [] for stage in stages}
+    durations_lock = threading.Lock()
+    failure: Optional[BaseException] = None
+
+    def _call(stage: Stage, item: Any = None, fanned: bool = False):
+        start = time.perf_counter()
+        try:
+            result = stage.run(ctx, item) if fanned else stage.run(ctx)
+        finally:
+            elapsed = time.perf_counter() - start
+            record_latency(f"{PIPELINE_METRIC}.{ctx.product}.{stage.name}", elapsed)
+            with durations_lock:
+                durations[stage.name].append(elapsed)
+        return result
+
+    def _finish(name: str, result: Any) -> None:
+        ctx.results[name] = result
+        stage_times[name] = round(time.perf_counter() - started_at[name], 3)
+
+    def _skip(name: str, reason: str) -> None:
+        skipped[name] = reason
+        print(f"⏭️ [{ctx.product}] Skipping stage '{name}': {reason}")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending: Dict[Any, tuple] = {}
+
+        def _schedule() -> None:
+            progressed = True
+            while progressed and failure is None:
+                progressed = False
+                for name, stage in list(waiting.items()):
+                    blocked = [dep for dep in stage.after if dep in skipped]
+                    if blocked:
+                        waiting.pop(name)
+                        _skip(name, f"depends on skipped stage(s) {blocked}")
+                        progressed = True
+                        continue
+                    if not all(dep in ctx.results for dep in stage.after):
+                        continue
+                    waiting.pop(name)
+                    started_at[name] = time.perf_counter()
+                    if stage.fan_out is None:
+                        pending[pool.submit(_call, stage)] = (name, None)
+                        continue
+                    try:
+                        items = list(dict.fromkeys(stage.fan_out(ctx)))
+                    except StageSkipped as exc:
+                        _skip(name, str(exc))
+                        progressed = True
+                        continue
+                    if not items:
+                        _finish(name, {})
+                        progressed = True
+                        continue
+                    outstanding[name] = len(items)
+                    partial[name] = {}
+                    for item in items:
+                        pending[pool.submit(_call, stage, item, True)] = (name, item)
+
+        _schedule()
+        while pending:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                name, item = pending.pop(future)
+                try:
+                    result = future.result()
+                except StageSkipped as exc:
+                    if name not in skipped:
+                        _skip(name, str(exc))
+                    outstanding.pop(name, None)
+                    continue
+                except Exception as exc:
+                    if failure is None:
+                        failure = exc
+                        print(f"❌ [{ctx.product}] Stage '{name}' failed: {exc}")
+                    continue
+                if name in skipped:
+                    continue
+                if name in outstanding:
+                    partial[name][item] = result
+                    outstanding[name] -= 1
+                    if outstanding[name] == 0:
+                        outstanding.pop(name)
+                        _finish(name, partial.pop(name))
+                else:
+                    _finish(name, result)
+            _schedule()
+    wall = time.perf_counter() - started
+
+    if failure is not None:
+        raise failure
+    for name in waiting:
+        _skip(name, "dependencies did not complete")
+
+    latency = {name: _summarise(values) for name, values in durations.items()}
+    print(
+        f"🧩 [{ctx.product}] Pipeline finished in {wall:.2f}s "
+        f"(ran={len(ctx.results)}, skipped={len(skipped)}, stages={stage_times})"
+    )
+    return {
+        "product": ctx.product,
+        "results": ctx.results,
+        "skipped": skipped,
+        "stages": stage_times,
+        "latency": latency,
+        "elapsed": round(wall, 3),
+    }
@@ -0,0 +1,385 @@
+"""
+Pipeline specs for the lead products.
+
+Each spec wires the existing lead-form helpers into stages for
+``run_lead_pipeline``. Every stage still validates against its schema and
+snapshot. Values a stage needs come from ``inputs`` first, then the same
+environment variables the lead-form tests use, then the payload files.
+
+Common inputs: ``city_id``, ``city_ids`` (cities whose areas to fetch,
+default ``max_cities`` from the cities response), ``mobile``, ``email``,
+``payment_method_id`` and ``checkout`` (False skips the checkout stage).
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+from helpers.credits_ledger import get_credits_ledger
+from helpers.lead_forms.auction_sheet import (
+    create_auction_sheet_request,
+    fetch_auction_sheet_product_options,
+    verify_auction_sheet,
+)
+from helpers.lead_forms.finance import submit_car_finance_lead
+from helpers.lead_forms.inspection import (
+    fetch_carsure_cities,
+    fetch_carsure_city_areas,
+    submit_carsure_inspection_request,
+    update_carsure_inspection_request,
+    validate_checkout_response,
+)
+from helpers.lead_forms.insurance import fetch_car_insurance_packages, submit_car_insurance_lead
+from helpers.lead_forms.pipeline import PipelineContext, Stage, StageSkipped, register_lead_pipeline
+from helpers.lead_forms.registration import (
+    submit_car_registration_transfer_lead,
+    update_car_registration_transfer_lead,
+)
+from helpers.lead_forms.sifm import (
+    fetch_sell_it_for_me_cities,
+    fetch_sell_it_for_me_city_areas,
+    submit_sell_it_for_me_lead,
+    update_sell_it_for_me_lead,
+)
+from helpers.payment import proceed_checkout
+
+__all__ = [
+    "LEAD_PIPELINES",
+]
+
+PAYLOADS = Path("data/payloads/lead_forms")
+CARSURE_CREATE_PAYLOAD = PAYLOADS / "carsure_request.json"
+CARSURE_UPDATE_PAYLOAD = PAYLOADS / "carsure_request_update.json"
+AUCTION_SHEET_PAYLOAD = PAYLOADS / "auction_sheet_request.json"
+INSURANCE_PAYLOAD = PAYLOADS / "car_insurance_request.json"
+FINANCE_PAYLOADS = {
+    "new": PAYLOADS / "car_finance_request.json",
+    "used": PAYLOADS / "car_finance_used_request.json",
+}
+REGISTRATION_PAYLOAD = PAYLOADS / "car_registration_transfer_request.json"
+REGISTRATION_UPDATE_PAYLOAD = PAYLOADS / "car_registration_transfer_update.json"
+
+DEFAULT_MAX_CITIES = 3
+DEFAULT_PAYMENT_METHOD_ID = 107
+
+
+def _load(path: Path) -> Dict[str, Any]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _payload(ctx: PipelineContext, name: str, path: Path) -> Dict[str, Any]:
+    """``inputs[name]`` when given, otherwise a fresh copy of the payload file."""
+    return copy.deepcopy(ctx.inputs[name]) if ctx.inputs.get(name) is not None else _load(path)
+
+
+def _require_token(ctx: PipelineContext) -> str:
+    if not ctx.access_token:
+        raise StageSkipped("API client does not have an access token")
+    return ctx.access_token
+
+
+# -- shared city/area stages ----------------------------------------------------
+
+
+def _city_ids(cities: List[dict]) -> List[int]:
+    return [city["id"] for city in cities if isinstance(city, dict) and city.get("id")]
+
+
+def _primary_city(ctx: PipelineContext, cities_key: str, env: str):
+    city_id = ctx.input("city_id", env=env)
+    if city_id:
+        return int(city_id)
+    ids = _city_ids(ctx.results["cities"].get(cities_key) or [])
+    if not ids:
+        raise StageSkipped("no city id available")
+    return ids[0]
+
+
+def _area_cities(cities_key: str, env: str):
+    """Fan-out items for the areas stage; always includes the lead's own city."""
+
+    def fan_out(ctx: PipelineContext) -> List[int]:
+        if ctx.inputs.get("city_ids"):
+            ids = [int(city_id) for city_id in ctx.inputs["city_ids"]]
+        else:
+            cities = ctx.results["cities"].get(cities_key) or []
+            ids = _city_ids(cities)[: int(ctx.input("max_cities", DEFAULT_MAX_CITIES))]
+        return [_primary_city(ctx, cities_key, env)] + ids
+
+    return fan_out
+
+
+def _checkout(s_type: str, s_id_from, product_id_from):
+    def run(ctx: PipelineContext) -> dict:
+        if ctx.input("checkout", True) is False:
+            raise StageSkipped("checkout disabled by inputs")
+        s_id, product_id = s_id_from(ctx), product_id_from(ctx)
+        if not s_id or not product_id:
+            raise StageSkipped(f"no {s_type} id or product id for checkout")
+        resp = proceed_checkout(
+            ctx.api_client,
+            product_id=int(product_id),
+            s_id=s_id,
+            s_type=s_type,
+            payment_method_id=int(ctx.input("payment_method_id", DEFAULT_PAYMENT_METHOD_ID)),
+        )
+        ctx.validator.assert_status_code(resp["status_code"], 200)
+        return resp.get("json") or {}
+
+    return run
+
+
+# -- Sell It For Me -------------------------------------------------------------
+
+
+def _sifm_cities(ctx):
+    return fetch_sell_it_for_me_cities(ctx.api_client, ctx.validator, access_token=_require_token(ctx))
+
+
+def _sifm_areas(ctx, city_id):
+    return fetch_sell_it_for_me_city_areas(ctx.api_client, ctx.validator, access_token=ctx.access_token, city_id=city_id)
+
+
+def _sifm_submit(ctx):
+    return submit_sell_it_for_me_lead(
+        ctx.api_client,
+        ctx.validator,
+        lead_payload={
+            "city_id": _primary_city(ctx, "sell_it_for_me_cities", "SIFM_CITY_ID"),
+            "name": ctx.input("name", "NEW USER", env="SIFM_LEAD_NAME"),
+            "mobile_number": ctx.input("mobile", "03234822302", env="SIFM_LEAD_MOBILE"),
+        },
+    )
+
+
+def _sifm_update(ctx):
+    lead_id = ctx.results["submit"].get("sell_it_for_me_lead_id")
+    if not lead_id:
+        raise StageSkipped("API did not return sell_it_for_me_lead_id")
+    return update_sell_it_for_me_lead(
+        ctx.api_client,
+        ctx.validator,
+        lead_id=lead_id,
+        lead_payload=ctx.inputs.get("update_payload"),
+    )
+
+
+SIFM_PIPELINE = [
+    Stage("cities", _sifm_cities),
+    Stage("areas", _sifm_areas, after=["cities"], fan_out=_area_cities("sell_it_for_me_cities", "SIFM_CITY_ID")),
+    Stage("submit", _sifm_submit, after=["cities"]),
+    Stage("update", _sifm_update, after=["submit"]),
+]
+
+
+# -- Carsure inspection ---------------------------------------------------------
+
+
+def _carsure_cities(ctx):
+    return fetch_carsure_cities(ctx.api_client, ctx.validator, access_token=_require_token(ctx))
+
+
+def _carsure_areas(ctx, city_id):
+    return fetch_carsure_city_areas(
+        ctx.api_client,
+        ctx.validator,
+        access_token=ctx.access_token,
+        city_id=city_id,
+        city_areas_type="inspection",
+    )
+
+
+def _carsure_submit(ctx):
+    payload = _payload(ctx, "payload", CARSURE_CREATE_PAYLOAD)
+    request = payload["car_certification_request"]
+    request["mobile"] = ctx.input("mobile", request.get("mobile"), env="MOBILE_NUMBER")
+    request["city_id"] = _primary_city(ctx, "carsure_cities", "CARSURE_CITY_ID")
+    payload["user"]["email"] = ctx.input("email", payload["user"].get("email"), env="EMAIL")
+    return submit_carsure_inspection_request(
+        ctx.api_client, ctx.validator, access_token=ctx.access_token, payload=payload
+    )
+
+
+def _carsure_update(ctx):
+    ticket_id = ctx.results["submit"].get("carsure_ticket_id")
+    if not ticket_id:
+        raise AssertionError("Carsure ticket id not returned; cannot proceed to update step.")
+
+    city_area_id = ctx.input("city_area_id", env="CARSURE_CITY_AREA_ID")
+    if not city_area_id:
+        city_id = _primary_city(ctx, "carsure_cities", "CARSURE_CITY_ID")
+        popular = (ctx.results["areas"].get(city_id) or {}).get("popular") or []
+        if not popular:
+            raise StageSkipped(f"no city area id available for city {city_id}")
+        city_area_id = popular[0].get("id")
+
+    payload = _payload(ctx, "update_payload", CARSURE_UPDATE_PAYLOAD)
+    payload["car_certification_request"]["city_area_id"] = int(city_area_id)
+    payload["user"]["email"] = ctx.input("email", payload["user"].get("email"), env="EMAIL")
+    return update_carsure_inspection_request(
+        ctx.api_client,
+        ctx.validator,
+        access_token=ctx.access_token,
+        carsure_ticket_id=ticket_id,
+        payload=payload,
+    )
+
+
+_carsure_checkout_request = _checkout(
+    "car_certification_request",
+    lambda ctx: ctx.results["submit"].get("carsure_ticket_id"),
+    lambda ctx: ctx.input("product_id", env="CARSURE_PRODUCT_ID")
+    or (ctx.results["update"].get("product") or {}).get("id"),
+)
+
+
+def _carsure_checkout(ctx):
+    body = _carsure_checkout_request(ctx)
+    if not (body.get("payment_id") or body.get("paymentId")):
+        raise AssertionError(f"Checkout did not return payment_id: {body}")
+    validate_checkout_response(ctx.validator, body)
+    return body
+
+
+INSPECTION_PIPELINE = [
+    Stage("cities", _carsure_cities),
+    Stage("areas", _carsure_areas, after=["cities"], fan_out=_area_cities("carsure_cities", "CARSURE_CITY_ID")),
+    Stage("submit", _carsure_submit, after=["cities"]),
+    Stage("update", _carsure_update, after=["submit", "areas"]),
+    Stage("checkout", _carsure_checkout, after=["update"]),
+]
+
+
+# -- Auction sheet --------------------------------------------------------------
+
+
+def _auction_verify(ctx):
+    chassis = ctx.input("chassis_number", env="AUCTION_SHEET_CHASSIS")
+    if not chassis:
+        raise StageSkipped("AUCTION_SHEET_CHASSIS not configured")
+    return verify_auction_sheet(ctx.api_client, ctx.validator, chassis_number=chassis)
+
+
+def _auction_create(ctx):
+    auction_sheet_id = int((ctx.results["verify"].get("auctionSheet") or {}).get("id") or 0)
+    if not auction_sheet_id:
+        raise StageSkipped("auction sheet id not available from verification response")
+    payload = _payload(ctx, "payload", AUCTION_SHEET_PAYLOAD)
+    inner = payload["auction_sheet_request"]
+    inner["auction_sheet_id"] = auction_sheet_id
+    inner["used_car_id"] = str(inner.get("used_car_id") or "")
+    if inner.get("product_id"):
+        inner["product_id"] = int(inner["product_id"])
+    return create_auction_sheet_request(ctx.api_client, ctx.validator, payload=payload)
+
+
+def _auction_products(ctx):
+    created = ctx.results["create"]
+    return fetch_auction_sheet_product_options(
+        ctx.api_client,
+        ctx.validator,
+        product_id=int(created.get("product_id") or 0),
+        s_id=int(created.get("s_id") or 0),
+    )
+
+
+def _auction_checkout(ctx):
+    if get_credits_ledger(ctx.api_client).get("auction_sheet_credits") > 0:
+        raise StageSkipped("auction sheet credits available")
+    return _auction_checkout_request(ctx)
+
+
+_auction_checkout_request = _checkout(
+    "auction_sheet",
+    lambda ctx: ctx.results["create"].get("s_id"),
+    lambda ctx: ctx.results["create"].get("product_id"),
+)
+
+AUCTION_SHEET_PIPELINE = [
+    Stage("verify", _auction_verify),
+    Stage("create", _auction_create, after=["verify"]),
+    Stage("products", _auction_products, after=["create"]),
+    Stage("checkout", _auction_checkout, after=["products"]),
+]
+
+
+# -- Insurance ------------------------------------------------------------------
+
+
+def _insurance_packages(ctx):
+    params = ctx.inputs.get("package_params")
+    if not params:
+        raise StageSkipped("no package_params given")
+    return fetch_car_insurance_packages(ctx.api_client, ctx.validator, params=params)
+
+
+def _insurance_submit(ctx):
+    payload = _payload(ctx, "payload", INSURANCE_PAYLOAD)
+    lead = payload["car_insurance_lead"]
+    lead["mobile_number"] = lead.get("mobile_number") or ctx.input("mobile", "03601234567", env="MOBILE_NUMBER")
+    return submit_car_insurance_lead(ctx.api_client, ctx.validator, payload=payload)
+
+
+INSURANCE_PIPELINE = [
+    Stage("packages", _insurance_packages),
+    Stage("submit", _insurance_submit),
+]
+
+
+# -- Finance --------------------------------------------------------------------
+
+
+def _finance_submit(ctx, kind):
+    payload = _payload(ctx, f"{kind}_payload", FINANCE_PAYLOADS[kind])
+    lead = dict(payload.get("car_finance_lead") or {})
+    user = dict(payload.get("user") or {})
+    lead["mobile"] = lead.get("mobile") or ctx.input("mobile", "03601234567", env="MOBILE_NUMBER")
+    user["email"] = user.get("email") or ctx.input("email", "apitest00@mailinator.com", env="EMAIL")
+    if lead.get("cnic") in {"00000-0000000-0", "", None}:
+        lead["cnic"] = "99999-9999999-9"
+    return submit_car_finance_lead(ctx.api_client, ctx.validator, payload={"car_finance_lead": lead, "user": user})
+
+
+FINANCE_PIPELINE = [
+    Stage("submit", _finance_submit, fan_out=lambda ctx: ctx.input("finance_kinds", list(FINANCE_PAYLOADS))),
+]
+
+
+# -- Registration transfer ------------------------------------------------------
+
+
+def _registration_submit(ctx):
+    payload = _payload(ctx, "payload", REGISTRATION_PAYLOAD)
+    lead = payload["car_registration_transfer_lead"]
+    lead["mobile_number"] = lead.get("mobile_number") or ctx.input("mobile", "03601234567", env="MOBILE_NUMBER")
+    return submit_car_registration_transfer_lead(ctx.api_client, ctx.validator, payload=payload)
+
+
+def _registration_update(ctx):
+    lead_id = ctx.results["submit"].get("car_registration_transfer_lead_id")
+    if not lead_id:
+        raise AssertionError("Expected car_registration_transfer_lead_id in submit response")
+    payload = _payload(ctx, "update_payload", REGISTRATION_UPDATE_PAYLOAD)
+    return update_car_registration_transfer_lead(ctx.api_client, ctx.validator, lead_id=lead_id, payload=payload)
+
+
+REGISTRATION_PIPELINE = [
+    Stage("submit", _registration_submit),
+    Stage("update", _registration_update, after=["submit"]),
+]
+
+
+LEAD_PIPELINES = {
+    "sifm": SIFM_PIPELINE,
+    "inspection": INSPECTION_PIPELINE,
+    "auction_sheet": AUCTION_SHEET_PIPELINE,
+    "insurance": INSURANCE_PIPELINE,
+    "finance": FINANCE_PIPELINE,
+    "registration": REGISTRATION_PIPELINE,
+}
+
+for _product, _stages in LEAD_PIPELINES.items():
+    register_lead_pipeline(_product, _stages)
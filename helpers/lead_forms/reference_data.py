@@ -0,0 +1,276 @@
+"""
+Shared cache for lead-form reference data (cities and city areas).
+
+SIFM and Carsure both list cities and fetch ``/main/get_all_city_areas.json``
+per city. The data is near-static, yet it was fetched again by every test in
+every worker. Responses are now cached per ``base_url`` under the endpoint
+and its query (the access token is ignored), for ``REFERENCE_DATA_TTL``
+seconds. The cache is persisted to ``REFERENCE_DATA_PATH`` (default
+``.cache/reference_data.json``) so other workers and later runs reuse it.
+
+The first lookup in a process warms the cache: both city lists are fetched
+concurrently, then the areas of every listed city. Set ``REFERENCE_DATA_WARM=0``
+to fetch lazily instead.
+
+The cache is meant for callers that only need the data (pipelines, load runs).
+Tests of the cities/city-areas endpoints themselves pass ``refresh=True``,
+which always hits the endpoint, skips the warm-up and stores the fresh response.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from helpers.metrics import record_latency
+
+__all__ = [
+    "ReferenceDataCache",
+    "cached_reference_request",
+    "get_reference_cache",
+    "warm_reference_data",
+]
+
+REFERENCE_DATA_PATH = Path(os.getenv("REFERENCE_DATA_PATH", ".cache/reference_data.json"))
+REFERENCE_DATA_TTL = float(os.getenv("REFERENCE_DATA_TTL", "43200"))
+REFERENCE_METRIC = "reference_data_fetch"
+
+CITY_AREAS_ENDPOINT = "/main/get_all_city_areas.json"
+
+# City list endpoint, the key holding its cities, and the api_version each
+# helper uses for the list and for its city areas.
+REFERENCE_SOURCES: Dict[str, dict] = {
+    "sifm": {
+        "cities_endpoint": "/main/sell-it-for-me-cities.json",
+        "cities_key": "sell_it_for_me_cities",
+        "api_version": os.getenv("API_VERSION", "22"),
+        "areas_api_version": os.getenv("API_VERSION", "22"),
+    },
+    "carsure": {
+        "cities_endpoint": "/main/carsure_cities.json",
+        "cities_key": "carsure_cities",
+        "api_version": "22",
+        "areas_api_version": "18",
+    },
+}
+
+_CACHE: Optional["ReferenceDataCache"] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def _request_key(endpoint: str, params: Optional[dict]) -> str:
+    query = sorted((str(k), str(v)) for k, v in (params or {}).items() if k != "access_token")
+    return endpoint + "?" + "&".join(f"{k}={v}" for k, v in query)
+
+
+class ReferenceDataCache:
+    """Thread-safe ``base_url → request key → {json, stored_at}`` map with a TTL."""
+
+    def __init__(self, path: Optional[Path] = REFERENCE_DATA_PATH, ttl: float = REFERENCE_DATA_TTL) -> None:
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, dict]] = {}
+        self._warmed: Dict[str, threading.Event] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path or not self.path.exists():
+            return
+        try:
+            with self.path.open("r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError) as exc:
+            print(f"⚠️ Ignoring unreadable reference data cache {self.path}: {exc}")
+            return
+        if isinstance(data, dict):
+            for base_url, entries in data.items():
+                if isinstance(entries, dict):
+                    self._entries.setdefault(base_url, {}).update(entries)
+
+    def _persist(self) -> None:
+        if not self.path:
+            return
+        # Merge with what other workers wrote since we loaded, then swap atomically.
+        merged: Dict[str, Dict[str, dict]] = {}
+        if self.path.exists():
+            try:
+                with self.path.open("r", encoding="utf-8") as fh:
+                    merged = json.load(fh) or {}
+            except (OSError, ValueError):
+                merged = {}
+        with self._lock:
+            for base_url, entries in self._entries.items():
+                merged.setdefault(base_url, {}).update(entries)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with tmp.open("w", encoding="utf-8") as fh:
+            json.dump(merged, fh)
+        os.replace(tmp, self.path)
+
+    def _fresh(self, entry: dict) -> bool:
+        return time.time() - float(entry.get("stored_at", 0)) < self.ttl
+
+    def get(self, base_url: str, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(base_url, {}).get(key)
+        if entry and self._fresh(entry):
+            return entry["json"]
+        return None
+
+    def put(self, base_url: str, key: str, body: dict, persist: bool = True) -> None:
+        with self._lock:
+            self._entries.setdefault(base_url, {})[key] = {"json": body, "stored_at": time.time()}
+        if persist:
+            self._persist()
+
+    def request(self, api_client, endpoint: str, params: Optional[dict] = None, refresh: bool = False,
+                persist: bool = True) -> dict:
+        """
+        GET ``endpoint`` through the cache.
+
+        Returns a response dict like ``APIClient.request`` (``status_code`` and
+        ``json``, plus ``cached``). Only 200 responses with a JSON object body are stored.
+        """
+        base_url, key = api_client.base_url, _request_key(endpoint, params)
+        if not refresh:
+            body = self.get(base_url, key)
+            if body is not None:
+                with self._lock:
+                    self.hits += 1
+                return {"status_code": 200, "json": body, "cached": True}
+
+        start = time.perf_counter()
+        resp = api_client.request("GET", endpoint, params=params)
+        record_latency(REFERENCE_METRIC, time.perf_counter() - start)
+        with self._lock:
+            self.misses += 1
+        if resp.get("status_code") == 200 and isinstance(resp.get("json"), dict):
+            self.put(base_url, key, resp["json"], persist=persist)
+        return {**resp, "cached": False}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._warmed.clear()
+            self.hits = self.misses = 0
+
+    # -- warm-up --------------------------------------------------------------
+
+    def warm(
+        self,
+        api_client,
+        sources: Iterable[str] = tuple(REFERENCE_SOURCES),
+        city_areas_types: Iterable[str] = ("inspection",),
+        max_workers: Optional[int] = None,
+    ) -> dict:
+        """
+        Fetch every source's city list, then all their city areas, concurrently.
+
+        Entries that are still fresh are not fetched again. Returns
+        ``{"cities", "areas", "fetched", "errors", "elapsed"}``.
+        """
+        max_workers = max_workers or int(os.getenv("REFERENCE_DATA_WORKERS", "8"))
+        token = getattr(api_client, "access_token", None)
+        sources = [REFERENCE_SOURCES[name] for name in sources]
+        misses_before = self.misses
+        errors: List[str] = []
+        started = time.perf_counter()
+
+        def _get(endpoint: str, params: dict) -> Tuple[str, dict]:
+            try:
+                return endpoint, self.request(api_client, endpoint, params, persist=False)
+            except Exception as exc:
+                return endpoint, {"status_code": None, "json": None, "error": str(exc)}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            city_lists = list(
+                pool.map(
+                    lambda source: _get(
+                        source["cities_endpoint"],
+                        {"access_token": token, "api_version": source["api_version"]},
+                    ),
+                    sources,
+                )
+            )
+
+            area_requests = []
+            for source, (endpoint, resp) in zip(sources, city_lists):
+                if resp.get("status_code") != 200:
+                    errors.append(f"{endpoint}: {resp.get('error') or resp.get('status_code')}")
+                    continue
+                for city in (resp.get("json") or {}).get(source["cities_key"]) or []:
+                    if not isinstance(city, dict) or not city.get("id"):
+                        continue
+                    for areas_type in city_areas_types:
+                        area_requests.append({
+                            "access_token": token,
+                            "api_version": source["areas_api_version"],
+                            "city_id": city["id"],
+                            "city_areas_type": areas_type,
+                        })
+
+            area_responses = list(pool.map(lambda params: _get(CITY_AREAS_ENDPOINT, params), area_requests))
+
+        for params, (_, resp) in zip(area_requests, area_responses):
+            if resp.get("status_code") != 200:
+                errors.append(f"city_id={params['city_id']}: {resp.get('error') or resp.get('status_code')}")
+        self._persist()
+
+        wall = time.perf_counter() - started
+        fetched = self.misses - misses_before
+        print(
+            f"🗺️ Reference data warm: {len(city_lists)} city lists, {len(area_requests)} city areas "
+            f"({fetched} fetched, {len(errors)} errors) in {wall:.1f}s"
+        )
+        return {
+            "cities": len(city_lists),
+            "areas": len(area_requests),
+            "fetched": fetched,
+            "errors": errors,
+            "elapsed": round(wall, 3),
+        }
+
+    def ensure_warm(self, api_client) -> None:
+        """Warm once per ``base_url`` per process; concurrent callers wait for the first."""
+        with self._lock:
+            event = self._warmed.get(api_client.base_url)
+            owner = event is None
+            if owner:
+                event = self._warmed[api_client.base_url] = threading.Event()
+        if not owner:
+            event.wait()
+            return
+        try:
+            self.warm(api_client)
+        finally:
+            event.set()
+
+
+def get_reference_cache() -> ReferenceDataCache:
+    """Return the process-wide reference data cache."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ReferenceDataCache()
+        return _CACHE
+
+
+def cached_reference_request(api_client, endpoint: str, params: Optional[dict] = None, refresh: bool = False) -> dict:
+    """GET reference data through the shared cache, warming it on first use (unless ``refresh``)."""
+    cache = get_reference_cache()
+    if not refresh and os.getenv("REFERENCE_DATA_WARM", "1") != "0" and getattr(api_client, "access_token", None):
+        cache.ensure_warm(api_client)
+    return cache.request(api_client, endpoint, params, refresh=refresh)
+
+
+def warm_reference_data(api_client, **kwargs) -> dict:
+    """Warm the shared cache for ``api_client`` (see ``ReferenceDataCache.warm``)."""
+    return get_reference_cache().warm(api_client, **kwargs)
@@ -6,6 +6,8 @@ import json
 from pathlib import Path
 from typing import Any, Dict, Optional
 
+from .reference_data import cached_reference_request
+
 DEFAULT_API_VERSION = os.getenv("API_VERSION", "22")
 DEFAULT_SCHEMA_PATH = Path("schemas/sifm/cities.json")
 DEFAULT_EXPECTED_PATH = Path("data/expected_responses/sifm/cities.json")
@@ -26,6 +28,7 @@ def fetch_sell_it_for_me_cities(
     api_version: Optional[str] = None,
     expected_path: Optional[str] = None,
     schema_path: Optional[str] = None,
+    refresh: bool = False,
 ) -> dict:
     """
     Fetch Sell It For Me (SIFM) city listings and validate the response.
@@ -44,6 +47,8 @@ def fetch_sell_it_for_me_cities(
         Optional JSON snapshot path for strict comparison.
     schema_path : str, optional
         Optional JSON schema path for validation.
+    refresh : bool, optional
+        Bypass the shared reference-data cache and fetch again.
 
     Returns
     -------
@@ -58,7 +63,7 @@ def fetch_sell_it_for_me_cities(
     }
 
     print(f"\n🏙️ Fetching Sell It For Me cities (api_version={version})")
-    resp = api_client.request("GET", endpoint, params=params)
+    resp = cached_reference_request(api_client, endpoint, params, refresh=refresh)
     validator.assert_status_code(resp["status_code"], 200)
 
     body = resp.get("json") or {}
@@ -88,9 +93,12 @@ def fetch_sell_it_for_me_city_areas(
     city_areas_type: str = "inspection",
     expected_path: Optional[str] = None,
     schema_path: Optional[str] = None,
+    refresh: bool = False,
 ) -> dict:
     """
     Fetch Sell It For Me city areas (popular/other) for a given city id.
+
+    Served from the reference-data cache shared with the Carsure helpers.
     """
     version = str(api_version or DEFAULT_API_VERSION)
     endpoint = "/main/get_all_city_areas.json"
@@ -104,7 +112,7 @@ def fetch_sell_it_for_me_city_areas(
     print(
         f"\n🏙️ Fetching Sell It For Me city areas (city_id={city_id}, type={city_areas_type}, api_version={version})"
     )
-    resp = api_client.request("GET", endpoint, params=params)
+    resp = cached_reference_request(api_client, endpoint, params, refresh=refresh)
     validator.assert_status_code(resp["status_code"], 200)
 
     body = resp.get("json") or {}
@@ -0,0 +1,97 @@
+"""
+In-process latency metrics shared by helper modules.
+
+Helpers record wall-clock durations under a metric name (e.g.
+``picture_upload``) and tests or load drivers read back a summary with
+percentiles at the end of a run.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+__all__ = [
+    "record_latency",
+    "record_value",
+    "get_latencies",
+    "latency_summary",
+    "percentile",
+    "summarise",
+    "reset_metrics",
+    "timed",
+]
+
+_LATENCIES: Dict[str, List[float]] = {}
+_LOCK = threading.Lock()
+
+
+def record_latency(metric: str, seconds: float) -> None:
+    """Append one duration (in seconds) to ``metric``."""
+    record_value(metric, seconds)
+
+
+def record_value(metric: str, value: float) -> None:
+    """Append a non-duration sample (bytes, MB, counts) to ``metric``."""
+    with _LOCK:
+        _LATENCIES.setdefault(metric, []).append(float(value))
+
+
+def get_latencies(metric: str) -> List[float]:
+    """Return a copy of the durations recorded for ``metric``."""
+    with _LOCK:
+        return list(_LATENCIES.get(metric, ()))
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of ``values`` (``pct`` in 0-100)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarise(values: List[float]) -> dict:
+    """count/mean/p50/p90/p99/max of ``values`` (e.g. one run's durations)."""
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4),
+        "p50": round(percentile(values, 50), 4),
+        "p90": round(percentile(values, 90), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(max(values), 4),
+    }
+
+
+def latency_summary(metric: Optional[str] = None) -> Dict[str, dict]:
+    """Summarise one metric (or all of them) as count/mean/p50/p90/p99/max."""
+    with _LOCK:
+        names = [metric] if metric else sorted(_LATENCIES)
+        snapshot = {name: list(_LATENCIES.get(name, ())) for name in names}
+
+    return {name: summarise(values) for name, values in snapshot.items()}
+
+
+def reset_metrics(metric: Optional[str] = None) -> None:
+    """Drop recorded durations for ``metric`` (or everything)."""
+    with _LOCK:
+        if metric:
+            _LATENCIES.pop(metric, None)
+        else:
+            _LATENCIES.clear()
+
+
+@contextmanager
+def timed(metric: str) -> Iterator[None]:
+    """Record the duration of the ``with`` block under ``metric``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_latency(metric, time.perf_counter() - start)
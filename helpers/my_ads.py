@@ -1,7 +1,13 @@
 from __future__ import annotations
 
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Optional
+from urllib.parse import urlparse
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from helpers.shared import _ensure_slug_path, _extract_id_from_slug
 
 DEFAULT_API_VERSION = "22"
 SNAPSHOT_ROOT = Path("data/expected_responses/my_ads")
@@ -10,6 +16,7 @@ SNAPSHOT_PENDING = SNAPSHOT_ROOT / "pending_ads.json"
 SCHEMA_PENDING = Path("schemas/my_ads/pending_ads_schema.json")
 SNAPSHOT_REMOVED = SNAPSHOT_ROOT / "removed_ads.json"
 SCHEMA_REMOVED = Path("schemas/my_ads/removed_ads_schema.json")
+MY_ADS_STATES = ("st_live", "st_pending", "st_removed")
 
 
 def fetch_my_active_ads(
@@ -172,3 +179,213 @@ def fetch_my_pending_ads(
         print(f"⚠️ Pending ads snapshot not found at {snapshot_file}; skipping snapshot comparison.")
 
     return body
+
+
+def fetch_my_ads_state(
+    api_client,
+    state: str,
+    page: int = 1,
+    api_version: Optional[str] = None,
+    extra_info: bool = True,
+    extra_params: Optional[dict] = None,
+) -> dict:
+    """Fetch one page of a my-ads state list (``st_live``, ``st_pending``, ...) without validation."""
+    version = str(api_version or DEFAULT_API_VERSION)
+    params = {"api_version": version, "page": page, "extra_info": str(extra_info).lower()}
+    params.update(extra_params or {})
+    resp = api_client.request("GET", f"/users/my-ads/{state}.json", params=params)
+    if resp["status_code"] != 200:
+        raise AssertionError(f"my-ads {state} page={page} returned {resp['status_code']}: {resp.get('json')}")
+    return resp.get("json") or {}
+
+
+def iter_my_ads(
+    api_client,
+    state: str,
+    api_version: Optional[str] = None,
+    max_pages: Optional[int] = None,
+    extra_params: Optional[dict] = None,
+) -> Iterator[dict]:
+    """Yield ads from a my-ads state list page by page, stopping at ``totalPages``."""
+    page = 1
+    while True:
+        body = fetch_my_ads_state(
+            api_client, state, page=page, api_version=api_version, extra_params=extra_params
+        )
+        ads = body.get("ads") or []
+        yield from ads
+        total_pages = body.get("totalPages")
+        if not ads or not isinstance(total_pages, int) or page >= total_pages:
+            return
+        if max_pages is not None and page >= max_pages:
+            return
+        page += 1
+
+
+def _slug_path(slug_or_url: str) -> str:
+    """
+    Normalise a slug or URL to its path without host, ``.json`` or trailing slash.
+
+    Paths keep their own section (``/used-bikes/...``); bare slugs are
+    treated as used cars.
+    """
+    slug_path = (slug_or_url or "").strip()
+    if slug_path.startswith(("http://", "https://")):
+        slug_path = urlparse(slug_path).path
+    if not slug_path.startswith("/"):
+        slug_path = _ensure_slug_path(slug_path)
+    if slug_path.endswith(".json"):
+        slug_path = slug_path[: -len(".json")]
+    return slug_path.rstrip("/")
+
+
+def ad_matches(ad: dict, ad_id: Optional[int], slug_path: Optional[str]) -> bool:
+    """
+    True if a my-ads entry refers to ``slug_path`` (or ``ad_id`` when no slug is given).
+
+    Slug paths are compared whole: ``...-123`` does not match ``...-1234``, and
+    a bike with the same numeric id as a car does not match the car's slug.
+    """
+    if not isinstance(ad, dict):
+        return False
+    if slug_path:
+        return any(
+            isinstance(ad.get(key), str) and ad[key] and _slug_path(ad[key]) == slug_path
+            for key in ("urlSlug", "detail_url")
+        )
+    return ad_id is not None and ad.get("id") == ad_id
+
+
+def ad_locator(slug_or_url: str) -> tuple:
+    """Return ``(ad_id, slug_path)`` used to find an ad in my-ads lists."""
+    slug_path = _slug_path(slug_or_url)
+    return _extract_id_from_slug(slug_path), slug_path
+
+
+class MyAdsIndex:
+    """
+    Ads from several my-ads lists keyed by slug path and by ``(type, id)``.
+
+    Used cars, bikes and accessories have overlapping numeric ids, so an id
+    alone is never a key: look ads up by slug/URL or by ``(type, id)`` such
+    as ``("UsedCar", 123)``. ``states_of``/``state_of``/``find`` are
+    dictionary lookups, so checking many ads against lists of hundreds costs
+    no scans. An ad can briefly appear in two lists while it changes state;
+    every state it was seen in is kept.
+    """
+
+    def __init__(self, states: Iterable[str] = MY_ADS_STATES) -> None:
+        self.states = tuple(states)
+        self.counts: Dict[str, int] = {state: 0 for state in self.states}
+        self.pages: Dict[str, int] = {state: 0 for state in self.states}
+        self._by_id: Dict[Tuple[str, int], Dict[str, dict]] = {}
+        self._by_slug: Dict[str, Dict[str, dict]] = {}
+        self._ads: Set[Union[Tuple[str, int], str]] = set()
+
+    def add(self, state: str, ad: dict) -> None:
+        if not isinstance(ad, dict):
+            return
+        self.counts[state] = self.counts.get(state, 0) + 1
+        key = None
+        if isinstance(ad.get("id"), int) and ad.get("type"):
+            key = (str(ad["type"]), ad["id"])
+            self._by_id.setdefault(key, {})[state] = ad
+        for field in ("urlSlug", "detail_url"):
+            value = ad.get(field)
+            if isinstance(value, str) and value:
+                slug_path = _slug_path(value)
+                self._by_slug.setdefault(slug_path, {})[state] = ad
+                key = key or slug_path
+        if key is not None:
+            self._ads.add(key)
+
+    def _entries(self, ref: Union[str, Tuple[str, int]]) -> Dict[str, dict]:
+        if isinstance(ref, tuple):
+            return self._by_id.get((str(ref[0]), int(ref[1])), {})
+        if isinstance(ref, str):
+            return self._by_slug.get(_slug_path(ref), {})
+        raise TypeError(f"Look ads up by slug/URL or (type, id), not {ref!r}; bare ids overlap across ad types")
+
+    def states_of(self, ref: Union[str, Tuple[str, int]]) -> Tuple[str, ...]:
+        """Every state ``ref`` (slug, URL or ``(type, id)``) was listed under, in index order."""
+        entries = self._entries(ref)
+        return tuple(state for state in self.states if state in entries)
+
+    def state_of(self, ref: Union[str, Tuple[str, int]], among: Optional[Iterable[str]] = None) -> Optional[str]:
+        """First state ``ref`` was listed under, optionally restricted to ``among``."""
+        allowed = set(among) if among is not None else None
+        for state in self.states_of(ref):
+            if allowed is None or state in allowed:
+                return state
+        return None
+
+    def find(self, ref: Union[str, Tuple[str, int]], state: Optional[str] = None) -> Optional[dict]:
+        """The listing entry for ``ref`` (in ``state`` if given)."""
+        entries = self._entries(ref)
+        if state is not None:
+            return entries.get(state)
+        for name in self.states:
+            if name in entries:
+                return entries[name]
+        return None
+
+    def __contains__(self, ref) -> bool:
+        return bool(self._entries(ref))
+
+    def __len__(self) -> int:
+        return len(self._ads)
+
+
+def build_my_ads_index(
+    api_client,
+    states: Iterable[str] = MY_ADS_STATES,
+    api_version: Optional[str] = None,
+    max_pages: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    extra_params: Optional[dict] = None,
+    on_page: Optional[Callable[[str, int, List[dict]], None]] = None,
+) -> MyAdsIndex:
+    """
+    Fetch the my-ads ``states`` lists concurrently and merge them into one ``MyAdsIndex``.
+
+    Page 1 of every list is requested at once. Once a list reports
+    ``totalPages``, its remaining pages (up to ``max_pages``, from
+    ``MY_ADS_INDEX_MAX_PAGES`` when unset; no limit by default or with ``0``) are requested
+    concurrently too. Ads are indexed as each page arrives, and
+    ``on_page(state, page, ads)`` is called for each page. At most
+    ``max_workers`` (``MY_ADS_INDEX_WORKERS``, default 6) pages are in flight.
+    """
+    index = MyAdsIndex(states)
+    if max_pages is None and os.getenv("MY_ADS_INDEX_MAX_PAGES"):
+        max_pages = int(os.getenv("MY_ADS_INDEX_MAX_PAGES"))
+    max_workers = max_workers or int(os.getenv("MY_ADS_INDEX_WORKERS", "6"))
+
+    def _fetch(state: str, page: int) -> Tuple[str, int, dict]:
+        return state, page, fetch_my_ads_state(
+            api_client, state, page=page, api_version=api_version, extra_params=extra_params
+        )
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {pool.submit(_fetch, state, 1) for state in index.states}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                state, page, body = future.result()
+                ads = body.get("ads") or []
+                index.pages[state] += 1
+                for ad in ads:
+                    index.add(state, ad)
+                if on_page is not None:
+                    on_page(state, page, ads)
+
+                total_pages = body.get("totalPages")
+                if page != 1 or not ads or not isinstance(total_pages, int):
+                    continue
+                last = min(total_pages, max_pages) if max_pages else total_pages
+                for next_page in range(2, last + 1):
+                    pending.add(pool.submit(_fetch, state, next_page))
+    wall = time.perf_counter() - started
+
+    print(f"🗂️ Indexed my-ads {index.counts} ({len(index)} ads, pages={index.pages}) in {wall:.2f}s")
+    return index
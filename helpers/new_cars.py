@@ -4,6 +4,8 @@ import os
 from pathlib import Path
 from typing import Optional
 
+from utils.snapshot_shards import snapshot_exists
+
 
 DEFAULT_API_VERSION = os.getenv("API_VERSION", "22")
 SNAPSHOT_ROOT = Path("data/expected_responses/new_cars")
@@ -20,7 +22,7 @@ def _strip_new_cars_prefix(link: str) -> str:
 def _pick_snapshot_path(candidates):
     """Return the first existing path from candidates, otherwise the first candidate."""
     for path in candidates:
-        if path.exists():
+        if snapshot_exists(path):
             return path
     return candidates[0]
 
@@ -82,7 +84,7 @@ def fetch_new_make_details(
 
     if schema_file and schema_file.exists():
         validator.assert_json_schema(body, str(schema_file))
-    elif snapshot_path and snapshot_path.exists():
+    elif snapshot_path and snapshot_exists(snapshot_path):
         validator.compare_with_expected(body, str(snapshot_path))
     else:
         missing_ref = schema_file or snapshot_path
@@ -152,7 +154,7 @@ def fetch_new_model_details(
 
     if schema_file and schema_file.exists():
         validator.assert_json_schema(body, str(schema_file))
-    # elif snapshot_path and snapshot_path.exists():
+    # elif snapshot_path and snapshot_exists(snapshot_path):
     #     validator.compare_with_expected(body, str(snapshot_path))
     else:
         missing_ref = schema_file or snapshot_path
@@ -202,7 +204,7 @@ def fetch_all_make_models(
     else:
         snapshot_path = Path("data/expected_responses/new_cars/all_makes_models.json")
 
-    if snapshot_path and snapshot_path.exists():
+    if snapshot_path and snapshot_exists(snapshot_path):
         validator.compare_with_expected(body, str(snapshot_path))
     else:
         raise AssertionError(
@@ -273,7 +275,7 @@ def fetch_new_version_details(
 
     if schema_file and schema_file.exists():
         validator.assert_json_schema(body, str(schema_file))
-    elif snapshot_path and snapshot_path.exists():
+    elif snapshot_path and snapshot_exists(snapshot_path):
         validator.compare_with_expected(body, str(snapshot_path))
     else:
         missing_ref = schema_file or snapshot_path
@@ -0,0 +1,231 @@
+"""
+Bounded-concurrency crawler for the new-cars catalogue.
+
+The new-cars tests fetch one make, model and version page each. The crawler
+covers the whole catalogue. It starts from ``/new-cars/all_car_make_models.json``
+and fans out make → model → version, following the ``new-cars/...`` links
+found in each page body. Links are de-duplicated, each page is validated
+against its level's schema as it arrives, and latency is recorded per level
+under ``new_cars_crawl.<level>``. With a ``MerkleStore`` the crawl also
+reports which pages changed since the previous run.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from helpers.metrics import record_latency, summarise
+from utils.merkle import MerkleStore
+
+__all__ = [
+    "crawl_new_cars_catalogue",
+]
+
+DEFAULT_API_VERSION = os.getenv("API_VERSION", "22")
+CRAWL_METRIC = "new_cars_crawl"
+LEVELS = ("all", "make", "model", "version")
+
+# Generic per-level schemas; the Corolla schemas used by the single-page tests
+# pin fields that other models and versions do not have.
+LEVEL_SCHEMAS: Dict[str, Optional[str]] = {
+    "all": os.getenv("NEW_CARS_ALL_SCHEMA", "schemas/new_cars/all_make_models.json"),
+    "make": os.getenv("NEW_CARS_MAKE_SCHEMA", "schemas/new_cars/make_catalogue.json"),
+    "model": os.getenv("NEW_CARS_MODEL_SCHEMA", "schemas/new_cars/model_page.json"),
+    "version": os.getenv("NEW_CARS_VERSION_SCHEMA", "schemas/new_cars/version_page.json"),
+}
+
+# Path segments under /new-cars/ that are not makes, models or versions.
+_RESERVED = {
+    "compare",
+    "dealers",
+    "fast-cache",
+    "fuel-average",
+    "on-road-price",
+    "photos",
+    "reviews",
+    "specifications",
+    "videos",
+}
+_LINK_RE = re.compile(r"^/?new-cars/([a-z0-9-]+(?:/[a-z0-9-]+)*)/?$")
+_GENERATION_RE = re.compile(r"^\d{4}-\d{4}$")
+
+
+def _slugify(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def _schema_digest(schema: Optional[str]) -> str:
+    """Short content hash of a schema file (``"missing"`` if absent)."""
+    if not schema or not Path(schema).exists():
+        return "missing"
+    return hashlib.sha256(Path(schema).read_bytes()).hexdigest()[:12]
+
+
+def _strings(node) -> Iterator[str]:
+    if isinstance(node, dict):
+        for value in node.values():
+            yield from _strings(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _strings(value)
+    elif isinstance(node, str):
+        yield node
+
+
+def _child_links(level: str, path: str, body: dict) -> Set[str]:
+    """Links one level below ``path`` (``make`` or ``make/model``) found anywhere in ``body``."""
+    if level == "all":
+        makes = set()
+        for section in ("popular", "other", "electric_cars"):
+            for entry in body.get(section) or []:
+                make = (entry or {}).get("make") or {}
+                slug = make.get("url_slug") or (make.get("name") and _slugify(make["name"]))
+                if slug:
+                    makes.add(slug)
+        return makes
+
+    depth = path.count("/") + 2
+    children = set()
+    for text in _strings(body):
+        match = _LINK_RE.match(text.strip())
+        if not match:
+            continue
+        parts = match.group(1).split("/")
+        if len(parts) != depth or "/".join(parts[:-1]) != path:
+            continue
+        if parts[-1] in _RESERVED or _GENERATION_RE.match(parts[-1]):
+            continue
+        children.add("/".join(parts))
+    return children
+
+
+def crawl_new_cars_catalogue(
+    api_client,
+    validator,
+    api_version: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    max_makes: Optional[int] = None,
+    max_depth: str = "version",
+    on_page: Optional[Callable[[str, str, dict], None]] = None,
+    hash_store: Optional[MerkleStore] = None,
+) -> dict:
+    """
+    Crawl the catalogue down to ``max_depth`` (``"make"``, ``"model"`` or ``"version"``).
+
+    At most ``max_workers`` (``NEW_CARS_CRAWL_WORKERS``, default 8) pages are in
+    flight. ``max_makes`` limits how many makes are followed. ``on_page(level,
+    path, body)`` is called for every fetched page, e.g. to collect vehicles.
+
+    With ``hash_store`` each page is compared with its Merkle tree from the
+    last run. Pages whose root hash is unchanged skip schema validation (they
+    passed last time, since a page's tree is only saved once it validates).
+    Trees are stored under the level's schema digest, so editing a schema (or
+    pointing ``LEVEL_SCHEMAS`` elsewhere) revalidates every page of that level
+    as on a first run. Changed pages are listed in ``changes`` with their
+    changed/added/removed paths.
+
+    Returns a report with ``pages`` (path → level/status/elapsed/error),
+    ``counts`` per level, ``errors``, ``changes`` and a per-level ``latency``
+    summary of this crawl's requests. Validation failures are reported, not
+    raised, so one bad page does not stop the crawl.
+    """
+    version = str(api_version or DEFAULT_API_VERSION)
+    max_workers = max_workers or int(os.getenv("NEW_CARS_CRAWL_WORKERS", "8"))
+    last_level = LEVELS.index(max_depth)
+
+    seen: Set[str] = set()
+    seen_lock = threading.Lock()
+    pages: Dict[str, dict] = {}
+    durations: Dict[str, List[float]] = {level: [] for level in LEVELS}
+    durations_lock = threading.Lock()
+    digests = {level: _schema_digest(LEVEL_SCHEMAS.get(level)) for level in LEVELS}
+
+    def _fetch(level: str, path: str) -> Tuple[str, str, Optional[dict], dict]:
+        if level == "all":
+            endpoint, params = "/new-cars/all_car_make_models.json", {}
+        else:
+            endpoint, params = f"/new-cars/{path}.json", {"api_version": version}
+
+        start = time.perf_counter()
+        resp = api_client.request("GET", endpoint, params=params)
+        elapsed = time.perf_counter() - start
+        record_latency(f"{CRAWL_METRIC}.{level}", elapsed)
+        with durations_lock:
+            durations[level].append(elapsed)
+
+        page = {"level": level, "status_code": resp["status_code"], "elapsed": round(elapsed, 3), "error": None}
+        body = resp.get("json") if isinstance(resp.get("json"), dict) else None
+        if resp["status_code"] != 200 or body is None:
+            page["error"] = f"HTTP {resp['status_code']}"
+            return level, path, None, page
+
+        hashed = None
+        store_key = f"{level}:{digests[level]}:{path}"
+        if hash_store is not None:
+            hashed = hash_store.check(store_key, body, save=False)
+            page["changed"] = not hashed["unchanged"]
+            page["delta"] = hashed["delta"]
+
+        schema = LEVEL_SCHEMAS.get(level)
+        if hashed is None or not hashed["unchanged"]:
+            try:
+                if not schema or not Path(schema).exists():
+                    raise AssertionError(f"No schema for new-cars level '{level}' at {schema}")
+                validator.assert_json_schema(body, schema)
+            except AssertionError as exc:
+                page["error"] = str(exc)
+        if hashed is not None and not hashed["unchanged"] and page["error"] is None:
+            hash_store.save(store_key, hashed["tree"])
+        if on_page is not None:
+            on_page(level, path, body)
+        return level, path, body, page
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {pool.submit(_fetch, "all", "")}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                level, path, body, page = future.result()
+                pages[path or "all_car_make_models"] = page
+                depth = LEVELS.index(level)
+                if body is None or depth >= last_level:
+                    continue
+
+                children = sorted(_child_links(level, path, body))
+                if level == "all" and max_makes:
+                    children = children[:max_makes]
+                with seen_lock:
+                    fresh = [child for child in children if child not in seen]
+                    seen.update(fresh)
+                for child in fresh:
+                    pending.add(pool.submit(_fetch, LEVELS[depth + 1], child))
+    wall = time.perf_counter() - started
+
+    counts = {level: sum(1 for p in pages.values() if p["level"] == level) for level in LEVELS}
+    errors: List[dict] = [{"path": path, **page} for path, page in pages.items() if page["error"]]
+    changes = {path: page["delta"] for path, page in pages.items() if page.get("delta")}
+    unchanged = sum(1 for page in pages.values() if page.get("changed") is False)
+    latency = {level: summarise(values) for level, values in durations.items()}
+
+    print(
+        f"🕸️ Crawled {len(pages)} new-cars pages in {wall:.1f}s "
+        f"(makes={counts['make']}, models={counts['model']}, versions={counts['version']}, errors={len(errors)})"
+    )
+    if hash_store is not None:
+        print(f"🌳 {unchanged}/{len(pages)} pages unchanged since last run; {len(changes)} changed")
+    return {
+        "pages": pages,
+        "counts": counts,
+        "errors": errors,
+        "changes": changes,
+        "latency": latency,
+        "elapsed": round(wall, 3),
+    }
@@ -0,0 +1,375 @@
+"""
+Seeded synthetic used-car payloads and a bulk poster for seeding listings.
+
+``post_used_car`` always posts ``data/payloads/used_car.json``, which is fine
+for lifecycle tests but not for load-testing search and my-ads, because those
+need many different listings. ``UsedCarPayloadFactory`` builds realistic
+variations of that payload:
+
+* make/model/version ids taken from the new-cars catalogue snapshots, with
+  the model year and transmission that version was actually sold with. Only
+  the snapshots on disk are read, and the repo ships the Toyota Corolla alone,
+  so by default only its versions vary. For more makes and models, pass
+  ``vehicles`` collected from a catalogue crawl (see ``UsedCarPayloadFactory``)
+* prices spread over the 40/80-lac upsell buckets, including the boundaries
+* random ``_FEATURE_FLAGS`` combinations
+* varied cities, colours, mileage and descriptions
+
+Payload ``i`` depends only on ``(seed, i)``, so a run can be reproduced and
+split across workers. ``post_used_cars_bulk`` submits a payload stream with
+bounded concurrency, round-robin across a pool of authenticated clients.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import os
+import random
+import re
+import time
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import helpers.car_ads as car_ads
+from helpers.credits_ledger import get_credits_ledger
+from helpers.metrics import latency_summary, record_latency
+from helpers.product_cache import invalidate_products_cache
+from helpers.new_cars import SNAPSHOT_ROOT
+from helpers.shared import _read_json
+from utils.snapshot_shards import SHARD_SUFFIX, load_snapshot
+
+__all__ = [
+    "UsedCarPayloadFactory",
+    "catalogue_vehicles",
+    "post_used_cars_bulk",
+    "vehicles_from_model_page",
+]
+
+BASE_PAYLOAD_PATH = Path("data/payloads/used_car.json")
+POST_METRIC = "used_car_seed_post"
+
+LAC = 100_000
+# Upsell price buckets (0-40, 40-80, 80+ lac) plus the exact boundary prices.
+PRICE_BANDS: Tuple[Tuple[int, int], ...] = (
+    (5 * LAC, 40 * LAC - 1),
+    (40 * LAC, 80 * LAC - 1),
+    (80 * LAC, 300 * LAC),
+)
+BOUNDARY_PRICES: Tuple[int, ...] = (40 * LAC - 1, 40 * LAC, 80 * LAC - 1, 80 * LAC)
+
+# (city_id, city_area_id) pairs known to the staging catalogue; override with
+# SEED_CITIES="409:50,408:579".
+DEFAULT_CITIES: Tuple[Tuple[int, int], ...] = ((409, 50), (408, 579))
+
+COLOURS = ("White", "Black", "Silver", "Grey", "Strong Blue", "Maroon", "Beige", "Green")
+CONDITIONS = ("Excellent condition", "Genuine condition", "Family used", "Doctor driven", "First owner")
+DETAILS = (
+    "total genuine",
+    "bumper to bumper original",
+    "new tyres",
+    "all documents clear",
+    "token taxes paid",
+    "company maintained",
+    "minor touch-ups",
+    "urgent sale",
+)
+NAMES = ("Ali", "Ahmed", "Sara", "Usman", "Ayesha", "Bilal", "Hina", "Test")
+
+
+def _env_cities() -> Tuple[Tuple[int, int], ...]:
+    raw = os.getenv("SEED_CITIES")
+    if not raw:
+        return DEFAULT_CITIES
+    pairs = []
+    for part in raw.split(","):
+        city, _, area = part.strip().partition(":")
+        if city.isdigit():
+            pairs.append((int(city), int(area) if area.isdigit() else None))
+    return tuple(pairs) or DEFAULT_CITIES
+
+
+def _digits(value) -> Optional[int]:
+    match = re.search(r"\d+", str(value or ""))
+    return int(match.group()) if match else None
+
+
+def _model_years(body: Mapping) -> Optional[Tuple[int, int]]:
+    """
+    Years the page's current generation covers: ``launch_year`` to the page's model year.
+
+    The page year comes from the heading (``Toyota Corolla 2025 Price ...``).
+    Returns None when neither is known.
+    """
+    first = _digits(body.get("launch_year"))
+    match = re.search(r"\b(?:19|20)\d{2}\b", str(body.get("heading") or ""))
+    last = int(match.group()) if match else None
+    if first and last and first <= last:
+        return first, last
+    year = first or last
+    return (year, year) if year else None
+
+
+def vehicles_from_model_page(body: Mapping) -> List[dict]:
+    """Flatten a ``/new-cars/{make}/{model}.json`` body into one entry per version."""
+    make_id, model_id = body.get("make_id"), body.get("model_id")
+    if not make_id or not model_id:
+        return []
+    model_years = _model_years(body)
+    colours = [c.get("name") for c in (body.get("colors") or {}).get("data") or [] if c.get("name")]
+    vehicles = []
+    for version in (body.get("price_block") or {}).get("data") or []:
+        if not version.get("id"):
+            continue
+        vehicles.append(
+            {
+                "name": f"{body.get('model_name') or ''} {version.get('name') or ''}".strip(),
+                "car_manufacturer_id": int(make_id),
+                "car_model_id": int(model_id),
+                "car_version_id": int(version["id"]),
+                "car_model_generation_id": version.get("generation_id"),
+                "engine_capacity": _digits(version.get("engine_capacity")),
+                "engine_type": version.get("engine_type"),
+                "transmission": version.get("transmission_type"),
+                "model_years": model_years,
+                "colours": colours,
+            }
+        )
+    return vehicles
+
+
+def catalogue_vehicles(root: Path = SNAPSHOT_ROOT) -> List[dict]:
+    """Collect make/model/version ids from every model snapshot under ``root``."""
+    vehicles: List[dict] = []
+    paths = sorted(Path(root).glob("*/*.json")) + sorted(Path(root).glob(f"*/*{SHARD_SUFFIX}"))
+    for path in paths:
+        try:
+            # Sharded snapshots only read the shards for the keys used here.
+            body = load_snapshot(path, cache=True)
+        except (OSError, ValueError, KeyError):
+            continue
+        if isinstance(body, Mapping):
+            vehicles.extend(vehicles_from_model_page(body))
+    return vehicles
+
+
+class UsedCarPayloadFactory:
+    """
+    Deterministic generator of ``used_car`` POST bodies.
+
+    ``vehicles`` defaults to ``catalogue_vehicles()``, i.e. only the model
+    snapshots on disk (the Toyota Corolla in this repo). To vary make and model
+    too, collect vehicles from a live crawl::
+
+        vehicles = []
+        crawl_new_cars_catalogue(
+            api_client, validator, max_depth="model",
+            on_page=lambda level, path, body: level == "model" and vehicles.extend(vehicles_from_model_page(body)),
+        )
+        factory = UsedCarPayloadFactory(vehicles=vehicles)
+    """
+
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        base_payload_path: Path = BASE_PAYLOAD_PATH,
+        vehicles: Optional[Sequence[dict]] = None,
+        cities: Optional[Sequence[Tuple[int, Optional[int]]]] = None,
+        boundary_ratio: float = 0.1,
+    ) -> None:
+        self.seed = int(seed if seed is not None else os.getenv("SEED_PAYLOAD_SEED", "1337"))
+        self.base = _read_json(base_payload_path)
+        self.vehicles = list(vehicles) if vehicles is not None else catalogue_vehicles()
+        self.cities = tuple(cities) if cities else _env_cities()
+        self.boundary_ratio = boundary_ratio
+        models = {(v.get("car_manufacturer_id"), v.get("car_model_id")) for v in self.vehicles}
+        if len(models) == 1:
+            print("⚠️ Payload factory has a single make/model; pass vehicles from a catalogue crawl to vary them")
+        if not self.vehicles:
+            # No catalogue snapshots: fall back to the vehicle in the base payload.
+            used_car = self.base["used_car"]
+            self.vehicles = [
+                {
+                    key: used_car.get(key)
+                    for key in (
+                        "car_manufacturer_id",
+                        "car_model_id",
+                        "car_version_id",
+                        "car_model_generation_id",
+                        "engine_capacity",
+                        "engine_type",
+                    )
+                }
+            ]
+
+    def _price(self, rng: random.Random) -> int:
+        if rng.random() < self.boundary_ratio:
+            return rng.choice(BOUNDARY_PRICES)
+        low, high = PRICE_BANDS[rng.randrange(len(PRICE_BANDS))]
+        # Round to the nearest thousand like real listings.
+        return rng.randint(low // 1000, high // 1000) * 1000
+
+    def make(self, index: int) -> dict:
+        """Return payload number ``index`` for this seed."""
+        rng = random.Random(f"{self.seed}:{index}")
+        body = copy.deepcopy(self.base)
+        used_car = body["used_car"]
+        attrs = used_car["ad_listing_attributes"]
+
+        vehicle = rng.choice(self.vehicles)
+        for key in ("car_manufacturer_id", "car_model_id", "car_version_id", "car_model_generation_id"):
+            if vehicle.get(key) is not None:
+                used_car[key] = vehicle[key]
+        if vehicle.get("engine_capacity"):
+            used_car["engine_capacity"] = str(vehicle["engine_capacity"])
+        if vehicle.get("engine_type"):
+            used_car["engine_type"] = vehicle["engine_type"]
+
+        # Year and transmission follow the catalogue version; without them the
+        # base payload's values are kept.
+        if vehicle.get("model_years"):
+            used_car["model_year"] = rng.randint(*vehicle["model_years"])
+        if vehicle.get("transmission"):
+            used_car["transmission"] = vehicle["transmission"]
+        used_car["mileage"] = str(rng.randrange(1_000, 250_000, 500))
+        used_car["assembly"] = rng.choice(("Local", "Imported"))
+        used_car["exterior_color"] = rng.choice(vehicle.get("colours") or COLOURS)
+
+        mask = rng.getrandbits(len(car_ads._FEATURE_FLAGS))
+        for bit, flag in enumerate(car_ads._FEATURE_FLAGS):
+            used_car[flag] = (mask >> bit) & 1
+
+        city_id, city_area_id = rng.choice(self.cities)
+        attrs["city_id"] = city_id
+        if city_area_id is not None:
+            attrs["city_area_id"] = city_area_id
+        else:
+            attrs.pop("city_area_id", None)
+
+        price = self._price(rng)
+        attrs["price"] = str(price)
+        attrs["display_name"] = rng.choice(NAMES)
+        attrs["allow_whatsapp"] = rng.random() < 0.5
+        attrs["description"] = (
+            f"{rng.choice(CONDITIONS)} {vehicle.get('name') or 'car'}, "
+            f"{', '.join(rng.sample(DETAILS, k=rng.randint(1, 3)))}. Seed {self.seed}-{index}."
+        )
+        used_car["price_calculator_params"] = {
+            "initial_price": price,
+            "estimated_price": price,
+            "estimated_price_lower_bound": int(price * 0.95),
+            "estimated_price_upper_bound": int(price * 1.05),
+        }
+        return body
+
+    def stream(self, count: int, start: int = 0) -> Iterator[dict]:
+        """Yield ``count`` payloads starting at ``start``."""
+        for index in range(start, start + count):
+            yield self.make(index)
+
+
+def _account_pictures(api_client, files: List[Path]) -> dict:
+    """Upload (or reuse) the account's pictures once and return a pictures_attributes template."""
+    scratch: dict = {}
+    car_ads._attach_pictures(api_client, scratch, files, api_client.access_token)
+    return scratch["used_car"]["ad_listing_attributes"]["pictures_attributes"]
+
+
+def post_used_cars_bulk(
+    api_clients: Sequence,
+    payloads: Iterable[dict],
+    api_version: str = car_ads.DEFAULT_API_VERSION,
+    max_workers: Optional[int] = None,
+    pictures_dir: Optional[Path] = Path("data/pictures"),
+) -> List[dict]:
+    """
+    POST ``payloads`` round-robin across ``api_clients`` with at most ``max_workers`` in flight.
+
+    ``payloads`` is consumed lazily and at most ``2 * max_workers`` posts are
+    pending at once, so a generator of thousands of bodies is never
+    materialised. Pictures are uploaded once per account and their ids are
+    shared by all of that account's ads. Returns one result per payload, in
+    order: ``index``, ``account``, ``status_code``, ``elapsed``, ``ad_id``,
+    ``ad_listing_id``, ``slug``, ``price`` and ``error``.
+    """
+    if not api_clients:
+        raise AssertionError("Need at least one api_client to seed ads.")
+    max_workers = max_workers or int(os.getenv("SEED_POST_WORKERS", "4"))
+
+    pictures: Dict[int, dict] = {}
+    files = sorted(p for p in pictures_dir.iterdir() if p.is_file()) if pictures_dir and pictures_dir.exists() else []
+    if files:
+        for account, client in enumerate(api_clients):
+            pictures[account] = _account_pictures(client, files)
+
+    def _post(index: int, body: dict) -> dict:
+        account = index % len(api_clients)
+        client = api_clients[account]
+        attrs = body["used_car"]["ad_listing_attributes"]
+        if account in pictures:
+            attrs["pictures_attributes"] = copy.deepcopy(pictures[account])
+        via_whatsapp = "true" if attrs.get("allow_whatsapp") is True else "false"
+
+        result = {
+            "index": index,
+            "account": account,
+            "status_code": None,
+            "elapsed": None,
+            "ad_id": None,
+            "ad_listing_id": None,
+            "slug": None,
+            "price": int(attrs["price"]),
+            "error": None,
+        }
+        start = time.perf_counter()
+        try:
+            resp = client.request(
+                "POST",
+                car_ads.POST_ENDPOINT,
+                params={"api_version": api_version, "via_whatsapp": via_whatsapp},
+                json_body=body,
+            )
+        except Exception as exc:
+            result.update(elapsed=round(time.perf_counter() - start, 3), error=str(exc))
+            return result
+        elapsed = time.perf_counter() - start
+        record_latency(POST_METRIC, elapsed)
+
+        ack = resp.get("json") or {}
+        ok = resp["status_code"] == 200 and ack.get("ad_id")
+        result.update(status_code=resp["status_code"], elapsed=round(elapsed, 3))
+        if ok:
+            invalidate_products_cache(client)
+            get_credits_ledger(client).mark_stale()
+            result.update(
+                ad_id=int(ack["ad_id"]),
+                ad_listing_id=int(ack["ad_listing_id"]) if ack.get("ad_listing_id") else None,
+                slug=ack.get("success") or ack.get("slug"),
+            )
+        else:
+            result["error"] = json.dumps(ack)[:500]
+        return result
+
+    results: List[dict] = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = set()
+        for index, body in enumerate(payloads):
+            if len(pending) >= max_workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                results.extend(future.result() for future in done)
+            pending.add(pool.submit(_post, index, body))
+        for future in pending:
+            results.append(future.result())
+    results.sort(key=lambda result: result["index"])
+    wall = time.perf_counter() - started
+
+    posted = sum(1 for r in results if r.get("ad_id"))
+    rate = len(results) / wall if wall else 0.0
+    print(
+        f"🌱 Seeded {posted}/{len(results)} used-car ads across {len(api_clients)} account(s) "
+        f"in {wall:.1f}s ({rate:.1f}/s) {latency_summary(POST_METRIC)[POST_METRIC]}"
+    )
+    return results
@@ -3,12 +3,29 @@ Payment-related helpers that wrap APIClient requests.
 """
 
 from __future__ import annotations
+from helpers.ad_details import fetch_ad_details, invalidate_ad_details
+from helpers.credits_ledger import get_credits_ledger
+from helpers.payment_poller import FAILURE_STATUSES, SUCCESS_STATUSES, get_payment_poller
+from helpers.product_cache import cached_products_list, invalidate_products_cache
 from helpers.shared import _validate_response
 
 import os
 import time
 from typing import Optional
 
+def _credit_state(api_client):
+    """
+    Hashable snapshot of the account's ledger balances, used as a products-cache dimension.
+
+    normalCarCount and the offered packages depend on remaining credits, so a
+    listing cached under one balance is never served after the balance changes.
+    """
+    ledger = get_credits_ledger(api_client)
+    if not ledger.available():
+        return None
+    return tuple(sorted(ledger.balances().items()))
+
+
 def product_upsell_request(
     api_client,
     validator,
@@ -18,7 +35,11 @@ def product_upsell_request(
     "schemas/upsell/feature_upsell.json",
     "schemas/upsell/boost_upsell.json",
     "schemas/upsell/limit_exceed.json"],
-    include_normal: Optional[bool] = None):
+    include_normal: Optional[bool] = None,
+    *,
+    ad_price: Optional[int] = None,
+    credit_state=None,
+    refresh: bool = False):
 
     endpoint = os.getenv("FEATURE_PRODUCTS_ENDPOINT", "/products/products_list.json")
     params = _env_params("FEATURE_PRODUCTS_QUERY") or {}
@@ -29,11 +50,22 @@ def product_upsell_request(
     })
     if include_normal:
         params["include_normal"] = include_normal
+    if credit_state is None:
+        credit_state = _credit_state(api_client)
 
-    resp =  api_client.request(
-        method=os.getenv("FEATURE_PRODUCTS_METHOD", "GET"),
-        endpoint=endpoint,
-        params=params,
+    resp = cached_products_list(
+        api_client,
+        ad_id,
+        product_type,
+        lambda: api_client.request(
+            method=os.getenv("FEATURE_PRODUCTS_METHOD", "GET"),
+            endpoint=endpoint,
+            params=params,
+        ),
+        ad_price=ad_price,
+        include_normal=include_normal,
+        credit_state=credit_state,
+        refresh=refresh,
     )
 
     validator.assert_status_code(resp["status_code"], 200)
@@ -59,6 +91,9 @@ def list_feature_products(
     discount_code: Optional[str] = None,
     s_id: Optional[int] = None,
     s_type: Optional[str] = None,
+    *,
+    ad_price: Optional[int] = None,
+    credit_state=None,
 ):
     endpoint = os.getenv("FEATURE_PRODUCTS_ENDPOINT", "/products/products_list.json")
     params = _env_params("FEATURE_PRODUCTS_QUERY") or {}
@@ -71,10 +106,26 @@ def list_feature_products(
         params["s_id"] = s_id
     if s_type is not None:
         params["s_type"] = s_type
-    return api_client.request(
-        method=os.getenv("FEATURE_PRODUCTS_METHOD", "GET"),
-        endpoint=endpoint,
-        params=params,
+
+    def _fetch() -> dict:
+        return api_client.request(
+            method=os.getenv("FEATURE_PRODUCTS_METHOD", "GET"),
+            endpoint=endpoint,
+            params=params,
+        )
+
+    # Confirmation calls (product/discount/subject selected) always go to the server.
+    if any(value is not None for value in (product_id, discount_code, s_id, s_type)):
+        return _fetch()
+    if credit_state is None:
+        credit_state = _credit_state(api_client)
+    return cached_products_list(
+        api_client,
+        ad_id,
+        params.get("product_type") or "feature",
+        _fetch,
+        ad_price=ad_price,
+        credit_state=credit_state,
     )
 
 
@@ -88,19 +139,11 @@ def my_credits_request(api_client):
     )
 
 def get_user_credit(api_client, credit_name: str) -> int:
-    credits_resp = my_credits_request(api_client)
-
-    if not isinstance(credits_resp, dict):
-        raise AssertionError("json_resp must be a dict")
-
-    credit_details = credits_resp.get("credit_details", {})
-    user_credits = credit_details.get("user_credits", {})
-
-    if not isinstance(user_credits, dict):
-        raise AssertionError("'credit_details.user_credits' must be a dict")
-
-    # Safely return the credit (default: 0 if missing)
-    return int(user_credits.get(credit_name, 0))
+    """Balance of ``credit_name`` from the account's credits ledger (0 if missing)."""
+    ledger = get_credits_ledger(api_client)
+    if not ledger.available():
+        raise AssertionError("Could not load credit balances from my-credits.")
+    return int(ledger.get(credit_name, 0))
 
 
 def proceed_checkout(
@@ -125,12 +168,18 @@ def proceed_checkout(
         payload["payment_method_id"] = payment_method_id
     if payload_overrides:
         payload.update(payload_overrides)
-    return api_client.request(
+    resp = api_client.request(
         method=os.getenv("FEATURE_CHECKOUT_METHOD", "POST"),
         endpoint=endpoint,
         json_body=payload,
         params=params,
     )
+    # A checkout may consume credits or change which products are offered.
+    invalidate_products_cache(api_client)
+    ledger = get_credits_ledger(api_client)
+    if not ledger.apply_response(resp.get("json")):
+        ledger.mark_stale()
+    return resp
 
 
 def initiate_jazz_cash(
@@ -184,6 +233,7 @@ def complete_jazz_cash_payment(
     jazz_mobile = os.getenv("JAZZ_CASH_MOBILE", "03123456789")
     save_info = os.getenv("JAZZ_CASH_SAVE_INFO", "false").lower() == "true"
 
+    started = time.perf_counter()
     initiate_response = initiate_jazz_cash(
         api_client,
         payment_id=payment_id,
@@ -193,29 +243,30 @@ def complete_jazz_cash_payment(
     )
     validator.assert_status_code(initiate_response["status_code"], 200)
 
+    # Keep the old attempts x delay budget as the deadline; the shared poller
+    # backs off adaptively within it and serves concurrent checkouts.
     status_attempts = attempts or int(os.getenv("FEATURE_PAYMENT_STATUS_ATTEMPTS", "5"))
     status_delay = delay or float(os.getenv("FEATURE_PAYMENT_STATUS_DELAY", "2"))
-    final_status = None
-
-    for attempt in range(1, status_attempts + 1):
-        status_response = payment_status(api_client, payment_id)
-        validator.assert_status_code(status_response["status_code"], 200)
-        final_status = _extract_payment_status(status_response.get("json", {}))
-        if final_status in {"paid", "success", "completed"}:
-            break
-        if final_status in {"failed", "declined"}:
-            raise AssertionError(f"Feature payment failed with status: {final_status}")
-        time.sleep(status_delay)
-
-    assert final_status in {"paid", "success", "completed"}, (
-        f"Payment did not complete successfully, last status: {final_status}"
+    result = get_payment_poller(api_client).wait(
+        payment_id,
+        since=started,
+        timeout=status_attempts * status_delay,
     )
+    final_status = result["status"]
+    if result["status_code"] is not None:
+        validator.assert_status_code(result["status_code"], 200)
+    if final_status in FAILURE_STATUSES:
+        raise AssertionError(f"Feature payment failed with status: {final_status}")
 
-    feature_fetch = api_client.request(
-        "GET",
-        f"/used-cars/{ad_id}.json",
-        params={"api_version": api_version},
+    assert final_status in SUCCESS_STATUSES, (
+        f"Payment did not complete successfully, last status: {final_status}"
     )
+
+    # The paid feature changed the ad; drop any cached details before re-reading them.
+    invalidate_ad_details(ad_id=ad_id)
+    invalidate_products_cache(api_client)
+    get_credits_ledger(api_client).mark_stale()
+    feature_fetch = fetch_ad_details(api_client, ad_id=ad_id, api_version=api_version)
     validator.assert_status_code(feature_fetch["status_code"], 200)
     feature_body = feature_fetch.get("json") or {}
 
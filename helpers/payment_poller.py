@@ -0,0 +1,220 @@
+"""
+Shared payment-status poller for Jazz Cash checkouts.
+
+``complete_jazz_cash_payment`` used to poll ``/payments/status.json`` in a
+fixed-delay loop, blocking its thread for every payment. A poller tracks any
+number of payment ids from one background thread. Due payments are polled
+concurrently, each with its own adaptive backoff and deadline. Waiters get a
+future per payment; listeners are called on every status change. The time
+from initiate to confirmed is recorded under ``payment_confirmed``.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from helpers.metrics import record_latency
+
+__all__ = [
+    "PaymentStatusPoller",
+    "get_payment_poller",
+    "stop_payment_pollers",
+]
+
+SUCCESS_STATUSES = frozenset({"paid", "success", "completed"})
+FAILURE_STATUSES = frozenset({"failed", "declined"})
+PAYMENT_METRIC = "payment_confirmed"
+
+_POLLERS: Dict[Tuple[str, Optional[str]], "PaymentStatusPoller"] = {}
+_POLLERS_LOCK = threading.Lock()
+
+
+class _Tracked:
+    __slots__ = ("payment_id", "since", "deadline", "delay", "next_poll", "status", "status_code", "polls", "future")
+
+    def __init__(self, payment_id: str, since: float, deadline: float, delay: float) -> None:
+        self.payment_id = payment_id
+        self.since = since
+        self.deadline = deadline
+        self.delay = delay
+        self.next_poll = time.perf_counter()
+        self.status: Optional[str] = None
+        self.status_code: Optional[int] = None
+        self.polls = 0
+        self.future: Future = Future()
+
+    def result(self, timed_out: bool = False) -> dict:
+        return {
+            "payment_id": self.payment_id,
+            "status": self.status,
+            "status_code": self.status_code,
+            "polls": self.polls,
+            "elapsed": round(time.perf_counter() - self.since, 3),
+            "timed_out": timed_out,
+        }
+
+
+class PaymentStatusPoller:
+    """
+    Background poller for one account's pending payments.
+
+    The polling thread starts with the first watched payment and exits once
+    none are left. A payment's delay grows by ``backoff`` (up to ``max_delay``)
+    while its status is unchanged and resets when the status moves.
+    """
+
+    def __init__(
+        self,
+        api_client,
+        initial_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+        backoff: Optional[float] = None,
+        timeout: Optional[float] = None,
+        max_workers: Optional[int] = None,
+    ) -> None:
+        self.api_client = api_client
+        self.initial_delay = initial_delay if initial_delay is not None else float(os.getenv("PAYMENT_POLL_DELAY", "0.5"))
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv("PAYMENT_POLL_MAX_DELAY", "4"))
+        self.backoff = backoff if backoff is not None else float(os.getenv("PAYMENT_POLL_BACKOFF", "1.5"))
+        self.timeout = timeout if timeout is not None else float(os.getenv("PAYMENT_POLL_TIMEOUT", "30"))
+        self.max_workers = max_workers or int(os.getenv("PAYMENT_POLL_WORKERS", "8"))
+        self._lock = threading.Lock()
+        self._tracked: Dict[str, _Tracked] = {}
+        self._listeners: List[Callable[[str, Optional[str], dict], None]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+    # -- public API ---------------------------------------------------------
+
+    def watch(self, payment_id, since: Optional[float] = None, timeout: Optional[float] = None) -> Future:
+        """
+        Track ``payment_id`` and return a future resolving to its result dict.
+
+        ``since`` is the ``time.perf_counter()`` reading taken before the payment
+        was initiated. The future resolves on a success or failure status, on a
+        non-200 status response, or once ``timeout`` seconds have passed since
+        ``since`` (``timed_out`` is then True).
+        """
+        key = str(payment_id)
+        since = since if since is not None else time.perf_counter()
+        with self._lock:
+            tracked = self._tracked.get(key)
+            if tracked is None:
+                tracked = _Tracked(key, since, since + (timeout or self.timeout), self.initial_delay)
+                self._tracked[key] = tracked
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="payment-status-poller", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return tracked.future
+
+    def wait(self, payment_id, since: Optional[float] = None, timeout: Optional[float] = None) -> dict:
+        """Block until ``payment_id`` settles or its deadline passes."""
+        return self.watch(payment_id, since=since, timeout=timeout).result()
+
+    def add_listener(self, callback: Callable[[str, Optional[str], dict], None]) -> None:
+        """Call ``callback(payment_id, status, result)`` whenever a payment's status changes."""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def pending(self) -> List[str]:
+        with self._lock:
+            return list(self._tracked)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        with self._lock:
+            tracked, self._tracked = list(self._tracked.values()), {}
+        for item in tracked:
+            item.future.cancel()
+
+    # -- polling ------------------------------------------------------------
+
+    def _poll(self, tracked: _Tracked) -> Tuple[_Tracked, Optional[int], Optional[str]]:
+        # Imported here: helpers.payment imports this module.
+        from helpers.payment import _extract_payment_status, payment_status
+
+        try:
+            resp = payment_status(self.api_client, tracked.payment_id)
+        except Exception as exc:
+            print(f"⚠️ Payment {tracked.payment_id} status poll failed: {exc}")
+            return tracked, None, tracked.status
+        return tracked, resp.get("status_code"), _extract_payment_status(resp.get("json") or {})
+
+    def _settle(self, tracked: _Tracked, timed_out: bool = False) -> None:
+        with self._lock:
+            self._tracked.pop(tracked.payment_id, None)
+        if tracked.status in SUCCESS_STATUSES:
+            record_latency(PAYMENT_METRIC, time.perf_counter() - tracked.since)
+        if not tracked.future.done():
+            tracked.future.set_result(tracked.result(timed_out=timed_out))
+
+    def tick(self, executor: ThreadPoolExecutor) -> None:
+        """Poll every due payment once (concurrently) and settle the finished ones."""
+        now = time.perf_counter()
+        with self._lock:
+            due = [t for t in self._tracked.values() if t.next_poll <= now and not t.future.cancelled()]
+            listeners = list(self._listeners)
+
+        for tracked, status_code, status in executor.map(self._poll, due):
+            tracked.polls += 1
+            changed = status != tracked.status
+            tracked.status_code = status_code if status_code is not None else tracked.status_code
+            tracked.status = status
+
+            if changed:
+                for callback in listeners:
+                    try:
+                        callback(tracked.payment_id, status, tracked.result())
+                    except Exception as exc:
+                        print(f"⚠️ Payment listener failed for {tracked.payment_id}: {exc}")
+
+            now = time.perf_counter()
+            if status in SUCCESS_STATUSES or status in FAILURE_STATUSES:
+                self._settle(tracked)
+            elif status_code is not None and status_code != 200:
+                self._settle(tracked)
+            elif now >= tracked.deadline:
+                self._settle(tracked, timed_out=True)
+            else:
+                tracked.delay = self.initial_delay if changed else min(tracked.delay * self.backoff, self.max_delay)
+                tracked.next_poll = min(now + tracked.delay, tracked.deadline)
+
+    def _run(self) -> None:
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="payment-status") as executor:
+            while not self._stop.is_set():
+                self._wake.clear()
+                self.tick(executor)
+                with self._lock:
+                    if not self._tracked:
+                        self._thread = None
+                        return
+                    next_poll = min(t.next_poll for t in self._tracked.values())
+                self._wake.wait(max(0.0, next_poll - time.perf_counter()))
+
+
+def get_payment_poller(api_client) -> PaymentStatusPoller:
+    """Return the shared poller for the account behind ``api_client``."""
+    key = (api_client.base_url, getattr(api_client, "access_token", None))
+    with _POLLERS_LOCK:
+        poller = _POLLERS.get(key)
+        if poller is None:
+            poller = PaymentStatusPoller(api_client)
+            _POLLERS[key] = poller
+        return poller
+
+
+def stop_payment_pollers() -> None:
+    """Stop and forget every shared poller (e.g. at session teardown)."""
+    with _POLLERS_LOCK:
+        pollers = list(_POLLERS.values())
+        _POLLERS.clear()
+    for poller in pollers:
+        poller.stop()
@@ -0,0 +1,94 @@
+"""
+Optional pre-upload stage that turns source images into app-sized JPEGs.
+
+The mobile apps downscale and re-encode photos before uploading them, so
+uploading the raw files in ``data/pictures`` overstates upload latency. When
+enabled (``PICTURE_DERIVATIVES=true``) pictures are resized to fit
+``PICTURE_MAX_SIDE`` and encoded at ``PICTURE_JPEG_QUALITY``. Derivatives are
+cached on disk keyed by source hash and parameters, so each one is encoded
+only once.
+
+Requires Pillow; the default (disabled) path does not import it.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import List, Optional, Sequence, Union
+
+from helpers.picture_store import file_digest
+from helpers.shared import _normalize_bool_flag
+
+__all__ = [
+    "derivatives_enabled",
+    "prepare_picture",
+    "prepare_pictures",
+]
+
+DERIVATIVE_DIR = Path(os.getenv("PICTURE_DERIVATIVE_DIR", ".cache/picture_derivatives"))
+DEFAULT_MAX_SIDE = 1280
+DEFAULT_QUALITY = 80
+
+
+def derivatives_enabled() -> bool:
+    return bool(_normalize_bool_flag(os.getenv("PICTURE_DERIVATIVES", "false")))
+
+
+def _load_pillow():
+    try:
+        from PIL import Image
+    except ImportError as exc:  # pragma: no cover - depends on environment
+        raise RuntimeError(
+            "Pillow is required for PICTURE_DERIVATIVES; install it with `pip install Pillow`."
+        ) from exc
+    return Image
+
+
+def prepare_picture(
+    source: Union[str, Path],
+    max_side: Optional[int] = None,
+    quality: Optional[int] = None,
+    cache_dir: Path = DERIVATIVE_DIR,
+) -> Path:
+    """Return the path of a cached JPEG derivative of ``source``, encoding it on first use."""
+    source = Path(source)
+    max_side = int(max_side or os.getenv("PICTURE_MAX_SIDE", DEFAULT_MAX_SIDE))
+    quality = int(quality or os.getenv("PICTURE_JPEG_QUALITY", DEFAULT_QUALITY))
+
+    target = cache_dir / f"{file_digest(source)[:24]}_{max_side}_q{quality}.jpg"
+    if target.exists():
+        return target
+
+    Image = _load_pillow()
+    with Image.open(source) as img:
+        img.load()
+        if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+            # JPEG has no alpha channel; flatten onto white like the apps do.
+            rgba = img.convert("RGBA")
+            canvas = Image.new("RGB", rgba.size, (255, 255, 255))
+            canvas.paste(rgba, mask=rgba.split()[-1])
+            img = canvas
+        else:
+            img = img.convert("RGB")
+        img.thumbnail((max_side, max_side))
+
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(f".{os.getpid()}.tmp")
+        img.save(tmp, format="JPEG", quality=quality, optimize=True, progressive=True)
+    os.replace(tmp, target)
+
+    print(
+        f"🪄 Derived {source.name} → {target.name} "
+        f"({source.stat().st_size // 1024} KB → {target.stat().st_size // 1024} KB)"
+    )
+    return target
+
+
+def prepare_pictures(
+    sources: Sequence[Union[str, Path]],
+    max_side: Optional[int] = None,
+    quality: Optional[int] = None,
+) -> List[Path]:
+    """Map ``sources`` to their derivatives, preserving order."""
+    return [prepare_picture(src, max_side=max_side, quality=quality) for src in sources]
@@ -0,0 +1,196 @@
+"""
+Content-addressed store of uploaded picture ids.
+
+Maps ``sha256(file bytes)`` to the server ``picture_id`` per account so the
+same image is uploaded once and its id reused by later posts and by other
+pytest-xdist workers (the store is persisted to a small JSON file).
+Entries expire after a TTL and are dropped when the server rejects them.
+
+Writes read, merge and replace the file under an ``flock``. For each digest
+the entry with the newest timestamp wins. Invalidated ids are written as
+tombstones (``removed_at``), so a worker holding an older copy cannot bring
+a dead id back when it persists.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+__all__ = [
+    "PictureIdStore",
+    "file_digest",
+    "get_picture_store",
+    "picture_account_key",
+]
+
+DEFAULT_STORE_PATH = Path(os.getenv("PICTURE_ID_STORE", ".cache/picture_ids.json"))
+DEFAULT_TTL = float(os.getenv("PICTURE_ID_TTL", "3600"))
+
+_STORE: Optional["PictureIdStore"] = None
+_STORE_LOCK = threading.Lock()
+
+
+def file_digest(path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """SHA-256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stamp(entry: dict) -> float:
+    return float(entry.get("removed_at") or entry.get("stored_at") or 0)
+
+
+def _wins(entry: dict, current: dict) -> bool:
+    """True if ``entry`` should replace ``current`` for the same digest."""
+    if entry.get("picture_id") != current.get("picture_id"):
+        # A tombstone only kills the id it names, not a later upload of the same file.
+        if bool(entry.get("removed_at")) != bool(current.get("removed_at")):
+            return not entry.get("removed_at")
+    return _stamp(entry) > _stamp(current)
+
+
+def _merge_entries(into: Dict[str, Dict[str, dict]], other: Dict[str, Dict[str, dict]]) -> None:
+    """Merge ``other`` into ``into``, keeping the newest entry (upload or tombstone) per digest."""
+    for account, entries in other.items():
+        if not isinstance(entries, dict):
+            continue
+        target = into.setdefault(account, {})
+        for digest, entry in entries.items():
+            if isinstance(entry, dict) and (digest not in target or _wins(entry, target[digest])):
+                target[digest] = entry
+
+
+def picture_account_key(base_url: str, access_token: Optional[str]) -> str:
+    """Stable, non-secret key for the account a picture was uploaded under."""
+    token_hash = hashlib.sha256((access_token or "").encode("utf-8")).hexdigest()[:16]
+    return f"{base_url.rstrip('/')}|{token_hash}"
+
+
+class PictureIdStore:
+    """Thread-safe ``account → digest → {picture_id, stored_at}`` map with a TTL."""
+
+    def __init__(self, path: Optional[Path] = DEFAULT_STORE_PATH, ttl: float = DEFAULT_TTL) -> None:
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, dict]] = {}
+        self._served: set = set()
+        self._load()
+
+    def _read(self, quiet: bool = False) -> Dict[str, Dict[str, dict]]:
+        if not self.path or not self.path.exists():
+            return {}
+        try:
+            with self.path.open("r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError) as exc:
+            if not quiet:
+                print(f"⚠️ Ignoring unreadable picture id store {self.path}: {exc}")
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _load(self) -> None:
+        _merge_entries(self._entries, self._read())
+
+    def _persist(self) -> None:
+        if not self.path:
+            return
+        # Merge with what other workers wrote since we loaded, then swap atomically.
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(".lock"), "w") as lock_fh:
+            if fcntl is not None:
+                fcntl.flock(lock_fh, fcntl.LOCK_EX)
+            try:
+                merged = self._read(quiet=True)
+                _merge_entries(merged, self._entries)
+                # Tombstones only need to outlive the entries they shadow, which expire after the TTL.
+                cutoff = time.time() - self.ttl
+                for entries in merged.values():
+                    for digest in [d for d, e in entries.items() if e.get("removed_at") and e["removed_at"] < cutoff]:
+                        entries.pop(digest)
+                tmp = self.path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+                with tmp.open("w", encoding="utf-8") as fh:
+                    json.dump(merged, fh)
+                os.replace(tmp, self.path)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_fh, fcntl.LOCK_UN)
+        self._entries = merged
+
+    def _fresh(self, entry: dict) -> bool:
+        return not entry.get("removed_at") and time.time() - float(entry.get("stored_at", 0)) < self.ttl
+
+    def get(self, account: str, digest: str) -> Optional[int]:
+        """Return a non-expired picture id for ``digest`` or None."""
+        with self._lock:
+            entry = self._entries.get(account, {}).get(digest)
+            if not entry:
+                # Another worker may have uploaded it since we loaded the file.
+                self._load()
+                entry = self._entries.get(account, {}).get(digest)
+            if not entry or not self._fresh(entry):
+                return None
+            picture_id = int(entry["picture_id"])
+            self._served.add(picture_id)
+            return picture_id
+
+    def put(self, account: str, digest: str, picture_id: int) -> None:
+        with self._lock:
+            self._entries.setdefault(account, {})[digest] = {
+                "picture_id": int(picture_id),
+                "stored_at": time.time(),
+            }
+            self._persist()
+
+    def was_reused(self, picture_id: int) -> bool:
+        """True if ``picture_id`` was handed out from the store rather than freshly uploaded."""
+        with self._lock:
+            return int(picture_id) in self._served
+
+    def invalidate(self, account: str, picture_ids: Iterable[int]) -> int:
+        """Tombstone entries whose picture id is in ``picture_ids``; returns how many were removed."""
+        targets = {int(pid) for pid in picture_ids}
+        with self._lock:
+            self._load()
+            entries = self._entries.get(account, {})
+            stale = [
+                d for d, e in entries.items()
+                if not e.get("removed_at") and int(e.get("picture_id", -1)) in targets
+            ]
+            now = time.time()
+            for digest in stale:
+                entries[digest] = {"picture_id": entries[digest]["picture_id"], "removed_at": now}
+            self._served -= targets
+            if stale:
+                self._persist()
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._served.clear()
+            if self.path and self.path.exists():
+                self.path.unlink()
+
+
+def get_picture_store() -> PictureIdStore:
+    """Process-wide store shared by all picture uploads."""
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = PictureIdStore()
+        return _STORE
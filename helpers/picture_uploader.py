@@ -5,16 +5,52 @@ Helper functions for uploading ad pictures via the marketplace API.
 from __future__ import annotations
 
 import mimetypes
+import mmap
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+from helpers.metrics import record_latency, record_value
+from helpers.picture_store import file_digest, get_picture_store, picture_account_key
+
+UPLOAD_LATENCY_METRIC = "picture_upload"
+UPLOAD_CPU_METRIC = "picture_upload_cpu"
+UPLOAD_PEAK_RSS_METRIC = "picture_upload_peak_rss_mb"
+STREAM_CHUNK_SIZE = int(os.getenv("PICTURE_UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+
+UPLOAD_ENDPOINTS = (
+    "/pictures/multi_file_uploader/ad_listing.json",
+    "/multi_file_uploader/ad_listing.json",
+)
+MULTIPART_FIELD_NAMES = ("file", "pictures[]")
+
+# (endpoint, encoding, field_name) — field_name is None for raw uploads.
+UploadStrategy = Tuple[str, str, Optional[str]]
+
+# First strategy that produced a picture_id, keyed by (base_url, api_version).
+_UPLOAD_STRATEGY_CACHE: Dict[Tuple[str, str], UploadStrategy] = {}
+_UPLOAD_STRATEGY_LOCK = threading.Lock()
 
 
 __all__ = [
     "upload_ad_picture",
+    "upload_ad_pictures",
+    "invalidate_reused_pictures",
     "_build_upload_params",
     "_upload_picture_raw",
     "_upload_picture_multipart",
     "_extract_picture_id",
+    "clear_upload_strategy_cache",
 ]
 
 
@@ -34,16 +70,72 @@ def _build_upload_params(
     return params
 
 
+class _StreamedBody:
+    """
+    Read-only, file-like view over a sequence of byte segments.
+
+    Segments are ``bytes`` (multipart envelope) or an ``mmap`` of the picture.
+    requests sees ``read``/``__len__`` and streams the body in ``chunk_size``
+    blocks with a known Content-Length, so the picture is copied into Python
+    bytes one chunk at a time and never as a whole.
+    """
+
+    def __init__(self, *segments, chunk_size: int = STREAM_CHUNK_SIZE) -> None:
+        self._segments = segments
+        self._length = sum(len(seg) for seg in segments)
+        self._chunk_size = chunk_size
+        self._index = 0
+        self._offset = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0 or size > self._chunk_size:
+            size = self._chunk_size
+        while self._index < len(self._segments):
+            segment = self._segments[self._index]
+            if self._offset < len(segment):
+                chunk = segment[self._offset : self._offset + size]
+                self._offset += len(chunk)
+                return bytes(chunk)
+            self._index += 1
+            self._offset = 0
+        return b""
+
+
+@contextmanager
+def _mapped_file(file_path: Path) -> Iterator[Union[mmap.mmap, bytes]]:
+    """Memory-map ``file_path`` read-only (empty files map to ``b""``)."""
+    with file_path.open("rb") as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def _multipart_envelope(boundary: str, field_name: str, filename: str, mime: str) -> Tuple[bytes, bytes]:
+    """Precompute the bytes that go before and after the file part of a multipart body."""
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field_name}"; filename="{filename}"\r\n'
+        f"Content-Type: {mime}\r\n\r\n"
+    ).encode("utf-8")
+    tail = f"\r\n--{boundary}--\r\n".encode("utf-8")
+    return head, tail
+
+
 def _upload_picture_raw(api_client, endpoint: str, file_path: Path, params: dict):
     url = f"{api_client.base_url}{endpoint}"
     filename = file_path.name
     mime = mimetypes.guess_type(filename)[0] or "application/octet-stream"
 
-    with file_path.open("rb") as fh:
+    with _mapped_file(file_path) as mapped:
         resp = api_client.session.post(
             url,
             params=params,
-            data=fh,
+            data=_StreamedBody(mapped),
             headers={
                 "Content-Type": mime,
                 "Accept": "application/json",
@@ -57,32 +149,43 @@ def _upload_picture_raw(api_client, endpoint: str, file_path: Path, params: dict
     return {"status_code": resp.status_code, "json": body}
 
 
-def _upload_picture_multipart(api_client, endpoint: str, file_path: Path, params: dict):
+def _upload_picture_multipart(
+    api_client,
+    endpoint: str,
+    file_path: Path,
+    params: dict,
+    field_names: Sequence[str] = MULTIPART_FIELD_NAMES,
+):
     url = f"{api_client.base_url}{endpoint}"
     filename = file_path.name
     mime = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    boundary = uuid.uuid4().hex
 
     last = None
-    for field_name in ("file", "pictures[]"):
-        try:
-            with file_path.open("rb") as fh:
-                files = {field_name: (filename, fh, mime)}
+    # Map the file once; each field-name attempt only swaps the small envelope.
+    with _mapped_file(file_path) as mapped:
+        for field_name in field_names:
+            head, tail = _multipart_envelope(boundary, field_name, filename, mime)
+            try:
                 resp = api_client.session.post(
                     url,
                     params=params,
-                    files=files,
-                    headers={"Accept": "application/json"},
+                    data=_StreamedBody(head, mapped, tail),
+                    headers={
+                        "Content-Type": f"multipart/form-data; boundary={boundary}",
+                        "Accept": "application/json",
+                    },
                     timeout=90,
                 )
-            try:
-                body = resp.json()
-            except Exception:
-                body = {"raw": resp.text}
-            last = {"status_code": resp.status_code, "json": body}
-            if 200 <= resp.status_code < 300:
-                return last
-        except Exception as exc:
-            last = {"status_code": 0, "json": {"error": str(exc)}}
+                try:
+                    body = resp.json()
+                except Exception:
+                    body = {"raw": resp.text}
+                last = {"status_code": resp.status_code, "json": body}
+                if 200 <= resp.status_code < 300:
+                    return last
+            except Exception as exc:
+                last = {"status_code": 0, "json": {"error": str(exc)}}
     return last
 
 
@@ -132,36 +235,172 @@ def upload_ad_picture(
     """
     Upload a local image and return its picture_id.
     Mirrors the UI behaviour: tries the raw upload first, then multipart.
+    The first strategy that works is remembered per base_url/api_version and
+    tried first next time; the full sequence is only replayed if it fails.
     """
     path = Path(file_path)
     if not path.exists():
         raise FileNotFoundError(f"Picture file not found: {file_path}")
 
     params = _build_upload_params(api_version, access_token, fcm_token, new_version)
+    cache_key = (api_client.base_url, str(api_version))
 
-    endpoints = [
-        "/pictures/multi_file_uploader/ad_listing.json",
-        "/multi_file_uploader/ad_listing.json",
-    ]
+    with _UPLOAD_STRATEGY_LOCK:
+        cached = _UPLOAD_STRATEGY_CACHE.get(cache_key)
 
-    last = None
-    for endpoint in endpoints:
-        raw = _upload_picture_raw(api_client, endpoint, path, params)
-        last = raw
-        if 200 <= raw["status_code"] < 300:
-            pic_id = _extract_picture_id(raw.get("json") or {})
-            if pic_id is not None:
-                return pic_id
+    strategies = _upload_strategies()
+    if cached is not None:
+        strategies.remove(cached)
+        strategies.insert(0, cached)
 
-        multipart = _upload_picture_multipart(api_client, endpoint, path, params)
-        last = multipart
-        if multipart and 200 <= multipart["status_code"] < 300:
-            pic_id = _extract_picture_id(multipart.get("json") or {})
+    last = None
+    for strategy in strategies:
+        result = _attempt_upload(api_client, strategy, path, params)
+        last = result
+        if result and 200 <= result["status_code"] < 300:
+            pic_id = _extract_picture_id(result.get("json") or {})
             if pic_id is not None:
+                if strategy != cached:
+                    with _UPLOAD_STRATEGY_LOCK:
+                        _UPLOAD_STRATEGY_CACHE[cache_key] = strategy
+                    print(f"📌 Picture upload strategy cached for {cache_key}: {strategy}")
                 return pic_id
+        if strategy == cached:
+            # The remembered strategy stopped working; rediscover from scratch.
+            with _UPLOAD_STRATEGY_LOCK:
+                if _UPLOAD_STRATEGY_CACHE.get(cache_key) == cached:
+                    _UPLOAD_STRATEGY_CACHE.pop(cache_key, None)
 
     raise AssertionError(
         f"Picture upload failed or no picture_id found. "
         f"Last status={last['status_code'] if last else 'n/a'} body={last and last.get('json')}"
     )
 
+
+def _upload_strategies() -> List[UploadStrategy]:
+    """All strategies in the order the UI tries them: raw, then multipart field names, per endpoint."""
+    strategies: List[UploadStrategy] = []
+    for endpoint in UPLOAD_ENDPOINTS:
+        strategies.append((endpoint, "raw", None))
+        strategies.extend((endpoint, "multipart", field) for field in MULTIPART_FIELD_NAMES)
+    return strategies
+
+
+def _attempt_upload(api_client, strategy: UploadStrategy, path: Path, params: dict):
+    endpoint, encoding, field_name = strategy
+    if encoding == "raw":
+        return _upload_picture_raw(api_client, endpoint, path, params)
+    return _upload_picture_multipart(api_client, endpoint, path, params, field_names=(field_name,))
+
+
+def clear_upload_strategy_cache() -> None:
+    """Forget every remembered upload strategy."""
+    with _UPLOAD_STRATEGY_LOCK:
+        _UPLOAD_STRATEGY_CACHE.clear()
+
+
+def upload_ad_pictures(
+    api_client,
+    file_paths: Sequence[Union[str, Path]],
+    api_version: str = "18",
+    access_token: Optional[str] = None,
+    fcm_token: Optional[str] = None,
+    new_version: bool = True,
+    max_workers: Optional[int] = None,
+    reuse: bool = True,
+) -> List[int]:
+    """
+    Upload several pictures concurrently and return their picture_ids in input order.
+
+    ``max_workers`` (or ``PICTURE_UPLOAD_WORKERS``, default 4) bounds the pool.
+    Per-file latency is recorded under the ``picture_upload`` metric.
+    With ``reuse`` enabled, files are keyed by SHA-256 and identical content is
+    uploaded once per account; ids from the picture store are reused until
+    they expire or get invalidated.
+    """
+    paths = [Path(p) for p in file_paths]
+    if not paths:
+        return []
+
+    store = get_picture_store()
+    account = picture_account_key(api_client.base_url, access_token or getattr(api_client, "access_token", None))
+    digests = [file_digest(p) for p in paths]
+
+    resolved: Dict[str, int] = {}
+    pending: Dict[str, Path] = {}
+    for path, digest in zip(paths, digests):
+        if digest in resolved or digest in pending:
+            continue
+        cached = store.get(account, digest) if reuse else None
+        if cached is not None:
+            print(f"♻️ Reusing picture_id {cached} for {path.name}")
+            resolved[digest] = cached
+        else:
+            pending[digest] = path
+
+    workers = max_workers or int(os.getenv("PICTURE_UPLOAD_WORKERS", "4"))
+    workers = max(1, min(workers, len(pending) or 1))
+
+    def _upload(path: Path) -> int:
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            pic_id = upload_ad_picture(
+                api_client,
+                file_path=str(path),
+                api_version=api_version,
+                access_token=access_token,
+                fcm_token=fcm_token,
+                new_version=new_version,
+            )
+        except Exception as exc:
+            print(f"❌ Upload of {path.name} failed after {time.perf_counter() - start:.2f}s: {exc}")
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            cpu = time.thread_time() - cpu_start
+            peak_mb = _peak_rss_mb()
+            record_latency(UPLOAD_LATENCY_METRIC, elapsed)
+            record_latency(UPLOAD_CPU_METRIC, cpu)
+            if peak_mb is not None:
+                record_value(UPLOAD_PEAK_RSS_METRIC, peak_mb)
+        print(
+            f"🖼️ Uploaded {path.name} in {elapsed:.2f}s "
+            f"(cpu={cpu * 1000:.1f}ms, peak_rss={peak_mb if peak_mb is not None else 'n/a'}MB)"
+        )
+        return pic_id
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            uploaded = list(pool.map(_upload, pending.values()))
+        for digest, pic_id in zip(pending, uploaded):
+            resolved[digest] = pic_id
+            store.put(account, digest, pic_id)
+
+    return [resolved[digest] for digest in digests]
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Process peak resident set size in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    divisor = 1024 * 1024 if os.uname().sysname == "Darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def invalidate_reused_pictures(api_client, picture_ids: Sequence[int], access_token: Optional[str] = None) -> int:
+    """
+    Forget store entries for ``picture_ids`` that were served from the store.
+
+    Returns the number of reused ids dropped; callers retry with fresh
+    uploads when it is non-zero.
+    """
+    store = get_picture_store()
+    reused = [pid for pid in picture_ids if store.was_reused(pid)]
+    if not reused:
+        return 0
+    account = picture_account_key(api_client.base_url, access_token or getattr(api_client, "access_token", None))
+    removed = store.invalidate(account, reused)
+    print(f"🗑️ Invalidated {removed} reused picture id(s): {reused}")
+    return removed
@@ -0,0 +1,111 @@
+"""
+TTL cache for ``/products/products_list.json`` responses.
+
+Feature and upsell checks list products for every ad they touch, but the list
+only depends on the product type, the ad's price bucket, ``include_normal``
+and the account's credit state. Responses are cached per account under those
+dimensions for ``PRODUCTS_LIST_TTL`` seconds. ``helpers.payment`` passes the
+credits-ledger balances as the credit state. Posting, checkout and credit
+changes call ``invalidate_products_cache`` so the next listing reflects them.
+
+The body is stored as a JSON string and parsed again on every hit, so callers
+that mutate the returned ``json`` (as the checkout helpers do) cannot corrupt
+later lookups.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from helpers.ad_details import peek_ad_details
+from helpers.shared import _get_value_by_path, _to_int_or_none
+
+__all__ = [
+    "cached_products_list",
+    "invalidate_products_cache",
+    "clear_products_cache",
+    "price_bucket",
+]
+
+PRODUCTS_TTL = float(os.getenv("PRODUCTS_LIST_TTL", "300"))
+
+# Lower bounds of the upsell price buckets: 0-40 lac, 40-80 lac, 80 lac and above.
+PRICE_BUCKET_BOUNDS: Tuple[int, ...] = (0, 4_000_000, 8_000_000)
+
+# (base_url, access_token) -> {dimensions: (stored_at, response without json, json text)}
+_PRODUCTS_CACHE: Dict[Tuple[str, Optional[str]], Dict[Tuple, Tuple[float, dict, str]]] = {}
+_PRODUCTS_LOCK = threading.Lock()
+
+
+def price_bucket(price: Optional[int]) -> Optional[int]:
+    """Index of the upsell bucket for ``price`` (None when unknown or negative)."""
+    if price is None or price < 0:
+        return None
+    return bisect_right(PRICE_BUCKET_BOUNDS, price) - 1
+
+
+def _account(api_client) -> Tuple[str, Optional[str]]:
+    return api_client.base_url, getattr(api_client, "access_token", None)
+
+
+def _ad_bucket(api_client, ad_id: int, ad_price: Optional[int]) -> Hashable:
+    """Bucket dimension for an ad: its price bucket if known, otherwise the ad itself."""
+    if ad_price is None:
+        details = peek_ad_details(api_client, ad_id, api_version=os.getenv("API_VERSION", "22"))
+        if details:
+            ad_price = _to_int_or_none(_get_value_by_path(details.get("json") or {}, "ad_listing.price"))
+    bucket = price_bucket(ad_price)
+    return f"bucket:{bucket}" if bucket is not None else f"ad:{int(ad_id)}"
+
+
+def cached_products_list(
+    api_client,
+    ad_id: int,
+    product_type: str,
+    fetch: Callable[[], dict],
+    *,
+    ad_price: Optional[int] = None,
+    include_normal: Any = None,
+    credit_state: Hashable = None,
+    refresh: bool = False,
+) -> dict:
+    """
+    Return a products_list response for these dimensions, calling ``fetch`` on a miss.
+
+    Only 200 responses are cached. ``ad_price`` places the ad in a price bucket;
+    when it is not given the cached ad details are consulted and, failing that,
+    the response is cached for this ad alone.
+    """
+    account = _account(api_client)
+    key = (str(product_type), _ad_bucket(api_client, ad_id, ad_price), bool(include_normal), credit_state)
+
+    if not refresh:
+        with _PRODUCTS_LOCK:
+            cached = _PRODUCTS_CACHE.get(account, {}).get(key)
+        if cached and time.time() - cached[0] < PRODUCTS_TTL:
+            return {**cached[1], "json": json.loads(cached[2])}
+
+    resp = fetch()
+    if resp.get("status_code") == 200:
+        meta = {k: v for k, v in resp.items() if k != "json"}
+        entry = (time.time(), meta, json.dumps(resp.get("json")))
+        with _PRODUCTS_LOCK:
+            _PRODUCTS_CACHE.setdefault(account, {})[key] = entry
+    return resp
+
+
+def invalidate_products_cache(api_client) -> int:
+    """Drop the account's cached product lists (after checkout or a credit change)."""
+    with _PRODUCTS_LOCK:
+        dropped = _PRODUCTS_CACHE.pop(_account(api_client), {})
+    return len(dropped)
+
+
+def clear_products_cache() -> None:
+    with _PRODUCTS_LOCK:
+        _PRODUCTS_CACHE.clear()
@@ -22,10 +22,12 @@ FILTER_MAP = {
     "seller":"user.user_type"
 }
 
-def search_request(api_client,validator, endpoint: str):
+def search_request(api_client,validator, endpoint: str, page: Optional[int] = None):
 
     schema_path= "schemas/search/used_car_main.json"
     params = {"api_version":19, "extra_info" : True}
+    if page is not None:
+        params["page"] = page
 
     resp = api_client.request(
         method = "GET",
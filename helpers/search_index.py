@@ -0,0 +1,298 @@
+"""
+Facet/count consistency checks for used-car search results.
+
+``search_request`` asks the API for ``extra_info=True`` which returns the
+server-side totals (``total_count``/``result_count``) and facet counts
+(``filters`` and ``related_results``). The index below crawls the search pages,
+builds ``value → ad ids`` postings for every ``FILTER_MAP`` field and checks the
+reported numbers against what was actually returned.
+
+Only facets for the endpoint's own discrete filters (``ct_lahore`` →
+``city_name == lahore``) are compared. Facets for other values (other cities,
+price buckets) describe ads outside the crawled result set. The crawl stops
+after ``SEARCH_INDEX_MAX_PAGES`` pages (default 5).
+
+Only compact integer ids are kept per ad; the ad dicts themselves are dropped
+as soon as a page has been indexed.
+"""
+
+from __future__ import annotations
+
+import os
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from helpers.search import (
+    FILTER_MAP,
+    extract_filter_slugs,
+    get_field_value,
+    parse_range_slug,
+    search_request,
+)
+
+__all__ = [
+    "SearchFacetIndex",
+    "crawl_search_index",
+    "endpoint_filters",
+    "extract_facet_counts",
+    "assert_search_counts_consistent",
+]
+
+FacetCount = Tuple[str, str, int]
+
+SEARCH_INDEX_MAX_PAGES = int(os.getenv("SEARCH_INDEX_MAX_PAGES", "5"))
+
+_FACET_LABEL_KEYS = ("title", "name", "label", "value")
+_FACET_PARAM_KEYS = ("key_param", "key", "param", "slug")
+
+
+def _normalize_facet_value(value: Any) -> Optional[str]:
+    """Lower-case and collapse whitespace so facet labels, slugs and ad fields compare equal."""
+    if value is None:
+        return None
+    text = " ".join(str(value).split()).lower()
+    return text or None
+
+
+def endpoint_filters(endpoint: str) -> Dict[str, Set[str]]:
+    """
+    Discrete filters encoded in a search endpoint as ``prefix → normalised values``.
+
+    Range slugs (``pr_``, ``ml_``, ``yr_``, ``ec_`` bounds) are skipped; their
+    facets are price/mileage buckets, not single values.
+    """
+    filters: Dict[str, Set[str]] = {}
+    for slug in extract_filter_slugs(endpoint):
+        if parse_range_slug(slug) is not None:
+            continue
+        prefix, raw = slug.split("_", 1)
+        if prefix not in FILTER_MAP:
+            continue
+        value = _normalize_facet_value(raw.replace("--", " - ").replace("-", " "))
+        if value:
+            filters.setdefault(prefix, set()).add(value)
+    return filters
+
+
+def _prefix_from_url(url: Any) -> Optional[str]:
+    """Pull a FILTER_MAP prefix out of the last slug of a search URL (``.../mk_toyota``)."""
+    if not isinstance(url, str) or not url:
+        return None
+    for part in reversed(url.split("?")[0].rstrip("/").split("/")):
+        part = part.replace(".json", "")
+        if "_" not in part:
+            continue
+        prefix = part.split("_", 1)[0]
+        if prefix in FILTER_MAP:
+            return prefix
+    return None
+
+
+def _facet_prefix(item: dict, parent_prefix: Optional[str]) -> Optional[str]:
+    for key in _FACET_PARAM_KEYS:
+        value = item.get(key)
+        if isinstance(value, str) and value in FILTER_MAP:
+            return value
+    return _prefix_from_url(item.get("url")) or parent_prefix
+
+
+def extract_facet_counts(json_resp: dict) -> List[FacetCount]:
+    """
+    Collect ``(prefix, value, count)`` triples from the facet metadata of a search page.
+
+    Facets are read from ``filters`` (``ad_info``/``locations``) and
+    ``related_results``. Entries whose field cannot be mapped onto a
+    ``FILTER_MAP`` prefix are skipped.
+    """
+    facets: List[FacetCount] = []
+
+    def _walk(node: Any, parent_prefix: Optional[str]) -> None:
+        if isinstance(node, list):
+            for item in node:
+                _walk(item, parent_prefix)
+            return
+        if not isinstance(node, dict):
+            return
+
+        prefix = _facet_prefix(node, parent_prefix)
+        count = node.get("count")
+        label = next(
+            (node.get(k) for k in _FACET_LABEL_KEYS if isinstance(node.get(k), (str, int))),
+            None,
+        )
+        if prefix and isinstance(count, int) and not isinstance(count, bool) and label is not None:
+            value = _normalize_facet_value(label)
+            if value:
+                facets.append((prefix, value, count))
+
+        for child in node.values():
+            if isinstance(child, (list, dict)):
+                _walk(child, prefix)
+
+    filters = json_resp.get("filters") or {}
+    if isinstance(filters, dict):
+        for group in ("ad_info", "locations"):
+            _walk(filters.get(group) or [], None)
+    _walk(json_resp.get("related_results") or [], None)
+    return facets
+
+
+class SearchFacetIndex:
+    """
+    Inverted index over crawled search pages.
+
+    Each ad is interned to a dense integer id the first time it is seen and the
+    postings store only those ids (``array('I')``), so memory grows with the
+    number of ads rather than with the size of the ad payloads.
+
+    ``filters`` (``prefix → values``, see ``endpoint_filters``) selects the
+    facets that are kept and compared; without it only totals are checked.
+    """
+
+    def __init__(
+        self,
+        fields: Optional[Dict[str, str]] = None,
+        filters: Optional[Dict[str, Set[str]]] = None,
+    ) -> None:
+        self.fields: Dict[str, str] = dict(fields or FILTER_MAP)
+        self.filters: Dict[str, Set[str]] = {prefix: set(values) for prefix, values in (filters or {}).items()}
+        self._ad_ids: Dict[int, int] = {}
+        self._postings: Dict[str, Dict[str, array]] = {prefix: {} for prefix in self.fields}
+        self.reported_total: Optional[int] = None
+        self.reported_pages: Optional[int] = None
+        self.pages_indexed = 0
+        self.duplicates = 0
+        self.page_mismatches: List[dict] = []
+        self.facets: Dict[Tuple[str, str], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ad_ids)
+
+    def _intern(self, ad_id: int) -> Optional[int]:
+        if ad_id in self._ad_ids:
+            self.duplicates += 1
+            return None
+        compact = len(self._ad_ids)
+        self._ad_ids[ad_id] = compact
+        return compact
+
+    def add_ad(self, ad: dict) -> None:
+        """Index a single search result; ads already indexed are counted as duplicates."""
+        ad_id = ad.get("ad_id")
+        if ad_id is None:
+            return
+        compact = self._intern(int(ad_id))
+        if compact is None:
+            return
+        for prefix, field_path in self.fields.items():
+            value = _normalize_facet_value(get_field_value(ad, field_path))
+            if value is None:
+                continue
+            self._postings[prefix].setdefault(value, array("I")).append(compact)
+
+    def add_page(self, json_resp: dict) -> None:
+        """Index a search page and keep only its reported counters and facets."""
+        results = json_resp.get("result") or []
+        page_num = json_resp.get("page_num")
+
+        result_count = json_resp.get("result_count")
+        if isinstance(result_count, int) and result_count != len(results):
+            self.page_mismatches.append(
+                {"page": page_num, "result_count": result_count, "actual": len(results)}
+            )
+
+        total = json_resp.get("total_count")
+        if isinstance(total, int) and self.reported_total is None:
+            self.reported_total = total
+        pages = json_resp.get("total_pages")
+        if isinstance(pages, int) and self.reported_pages is None:
+            self.reported_pages = pages
+
+        for ad in results:
+            if isinstance(ad, dict):
+                self.add_ad(ad)
+
+        if self.pages_indexed == 0:
+            for prefix, value, count in extract_facet_counts(json_resp):
+                if value in self.filters.get(prefix, ()):
+                    self.facets.setdefault((prefix, value), count)
+        self.pages_indexed += 1
+
+    def ad_count(self, prefix: str, value: Any) -> int:
+        """Number of indexed ads whose FILTER_MAP field equals ``value``."""
+        postings = self._postings.get(prefix) or {}
+        return len(postings.get(_normalize_facet_value(value) or "", ()))
+
+    def values(self, prefix: str) -> Dict[str, int]:
+        """Return ``value → ad count`` for a FILTER_MAP prefix."""
+        return {value: len(ids) for value, ids in (self._postings.get(prefix) or {}).items()}
+
+    @property
+    def complete(self) -> bool:
+        """True when every page reported by the server has been indexed."""
+        return self.reported_pages is not None and self.pages_indexed >= self.reported_pages
+
+    def check(self) -> Dict[str, List[dict]]:
+        """Compare server totals and facet counts with the indexed postings."""
+        report: Dict[str, List[dict]] = {"totals": [], "pages": list(self.page_mismatches), "facets": []}
+
+        if self.complete and self.reported_total is not None and self.reported_total != len(self):
+            report["totals"].append({"total_count": self.reported_total, "indexed": len(self)})
+
+        for (prefix, value), count in sorted(self.facets.items()):
+            actual = self.ad_count(prefix, value)
+            # On a partial crawl the index can only under-count.
+            if actual > count or (self.complete and actual != count):
+                report["facets"].append(
+                    {"field": self.fields.get(prefix, prefix), "value": value, "reported": count, "indexed": actual}
+                )
+        return report
+
+
+def crawl_search_index(
+    api_client,
+    validator,
+    endpoint: str,
+    max_pages: Optional[int] = None,
+    fields: Optional[Dict[str, str]] = None,
+) -> SearchFacetIndex:
+    """
+    Crawl ``endpoint`` page by page and return the populated index.
+
+    The crawl stops at the server-reported ``total_pages`` or after
+    ``max_pages`` (default ``SEARCH_INDEX_MAX_PAGES``); pass ``max_pages=0``
+    to follow ``total_pages`` without a cap.
+    """
+    if max_pages is None:
+        max_pages = SEARCH_INDEX_MAX_PAGES
+
+    index = SearchFacetIndex(fields, filters=endpoint_filters(endpoint))
+    page = 1
+    while True:
+        json_resp = search_request(api_client, validator, endpoint, page=page)
+        index.add_page(json_resp)
+        if not json_resp.get("result"):
+            break
+        if index.reported_pages is not None and page >= index.reported_pages:
+            break
+        if max_pages and page >= max_pages:
+            break
+        page += 1
+
+    print(
+        f"🔎 Indexed {len(index)} ads over {index.pages_indexed} page(s) for '{endpoint}' "
+        f"(reported total={index.reported_total}, duplicates={index.duplicates})"
+    )
+    return index
+
+
+def assert_search_counts_consistent(index: SearchFacetIndex, ignore_fields: Iterable[str] = ()) -> None:
+    """Raise AssertionError when reported totals/facets disagree with the crawled index."""
+    ignored = set(ignore_fields)
+    report = index.check()
+    report["facets"] = [f for f in report["facets"] if f["field"] not in ignored]
+
+    if any(report.values()):
+        raise AssertionError(f"Search count/facet mismatch: {report}")
+
+    print(f"✅ Search counts consistent ({len(index.facets)} facet(s), complete={index.complete})")
@@ -8,7 +8,7 @@ import json
 import os
 import re
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 from urllib.parse import urlparse
 
 import requests
@@ -21,6 +21,7 @@ __all__ = [
     "_normalize_lower",
     "_normalize_whitespace",
     "_get_value_by_path",
+    "_compile_path",
     "_to_int_or_none",
     "_choose_feature_weeks",
     "_extract_id_from_slug",
@@ -101,6 +102,37 @@ def _get_value_by_path(data: dict, path: str) -> Any:
     return current
 
 
+def _compile_path(path: str) -> Callable[[Any], Any]:
+    """
+    Return an accessor equivalent to ``_get_value_by_path(data, path)``.
+
+    The path is split once, so rule tables applied to many documents do not
+    re-parse it on every lookup.
+    """
+    parts = tuple(path.split("."))
+
+    if len(parts) == 2:
+        first, second = parts
+
+        def get(data: Any) -> Any:
+            if not isinstance(data, dict):
+                return None
+            inner = data.get(first)
+            return inner.get(second) if isinstance(inner, dict) else None
+
+        return get
+
+    def get(data: Any) -> Any:
+        current = data
+        for part in parts:
+            if not isinstance(current, dict):
+                return None
+            current = current.get(part)
+        return current
+
+    return get
+
+
 def _to_int_or_none(value):
     """Convert values like '1300cc' or '2023' to int; return None if not numeric."""
     if value is None or value == "":
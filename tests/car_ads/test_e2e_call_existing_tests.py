@@ -90,6 +90,11 @@ def test_boost_upsell(api_client,validator):
      posted_ad = get_session_ad_metadata(api_client, validator)
      product_upsell_request(api_client,validator,posted_ad["ad_id"],product_type="boost_upsell")
 
+@pytest.mark.car_ad_post
+def test_pooled_ad_feature_upsell(api_client, validator, pooled_ad):
+    product_list_data = product_upsell_request(api_client, validator, pooled_ad["ad_id"], product_type="used_car_upsell")
+    upsell_product_validation(product_list_data, pooled_ad["price"])
+
 @pytest.mark.car_ad_post
 def test_limitExceed_upsell(api_client,validator):
     posted_ad = get_session_ad_metadata(api_client, validator)
@@ -6,11 +6,13 @@ import pytest
 
 from helpers import (
     verify_auction_sheet,
+    verify_auction_sheets_batch,
     create_auction_sheet_request,
     fetch_auction_sheet_product_options,
     proceed_checkout,
     my_credits_request,
     initiate_jazz_cash,
+    run_lead_pipeline,
 )
 
 PAYLOAD_PATH = Path("data/payloads/lead_forms/auction_sheet_request.json")
@@ -36,6 +38,31 @@ def test_verify_auction_sheet(api_client, validator):
     assert "matchesUsedCar" in response
 
 
+@pytest.mark.lead_forms
+@pytest.mark.requires_auth
+def test_verify_auction_sheets_batch(api_client, validator, tmp_path):
+    chassis = os.getenv("AUCTION_SHEET_CHASSIS")
+    if not chassis:
+        pytest.skip("AUCTION_SHEET_CHASSIS not configured.")
+
+    report_path = tmp_path / "auction_sheet_verify.jsonl"
+    summary = verify_auction_sheets_batch(
+        api_client,
+        validator,
+        [chassis, chassis.lower(), chassis],
+        report_path=report_path,
+        refresh=True,
+    )
+
+    print("[AuctionSheet] Batch summary:", summary)
+    assert summary["unique"] == 1
+    assert summary["requests"] == 1
+    assert summary["errors"] == 0
+    rows = [json.loads(line) for line in report_path.read_text(encoding="utf-8").splitlines()]
+    assert len(rows) == 3
+    assert sum(1 for row in rows if row["cached"]) == 2
+
+
 @pytest.mark.lead_forms
 @pytest.mark.requires_auth
 def test_create_auction_sheet_request(api_client, validator):
@@ -173,3 +200,23 @@ def ensure_jazzcash_checkout(
     )
     validator.assert_status_code(jazz_response["status_code"], 200)
     print("[AuctionSheet] JazzCash initiation response:", jazz_response.get("json"))
+
+
+@pytest.mark.lead_forms
+@pytest.mark.requires_auth
+def test_auction_sheet_pipeline(api_client, validator):
+    chassis = os.getenv("AUCTION_SHEET_CHASSIS")
+    if not chassis:
+        pytest.skip("AUCTION_SHEET_CHASSIS not configured.")
+
+    report = run_lead_pipeline(api_client, validator, "auction_sheet", inputs={"chassis_number": chassis})
+
+    results = report["results"]
+    assert "auctionSheetFound" in results["verify"]
+    if "create" not in results:
+        assert "create" in report["skipped"]
+        return
+    assert results["create"].get("s_type") == "auction_sheet"
+    product_id = int(results["create"].get("product_id") or 0)
+    assert any(item.get("id") == product_id for item in results["products"].get("products") or [])
+    assert "checkout" in results or "checkout" in report["skipped"]
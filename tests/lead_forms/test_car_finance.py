@@ -4,7 +4,7 @@ from pathlib import Path
 
 import pytest
 
-from helpers import submit_car_finance_lead
+from helpers import run_lead_pipeline, submit_car_finance_lead
 
 NEW_PAYLOAD_PATH = Path("data/payloads/lead_forms/car_finance_request.json")
 NEW_EXPECTED_PATH = Path("data/expected_responses/lead_forms/car_finance_response.json")
@@ -67,3 +67,13 @@ def test_submit_used_car_finance_lead(api_client, validator):
     print("[CarFinance] Used lead response:", response)
     _assert_response(response, USED_EXPECTED_PATH)
 
+
+@pytest.mark.lead_forms
+@pytest.mark.requires_auth
+def test_car_finance_pipeline(api_client, validator):
+    report = run_lead_pipeline(api_client, validator, "finance")
+
+    submitted = report["results"]["submit"]
+    assert set(submitted) == {"new", "used"}
+    _assert_response(submitted["new"], NEW_EXPECTED_PATH)
+    _assert_response(submitted["used"], USED_EXPECTED_PATH)
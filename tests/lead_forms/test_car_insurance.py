@@ -4,7 +4,7 @@ from pathlib import Path
 
 import pytest
 
-from helpers import submit_car_insurance_lead
+from helpers import run_lead_pipeline, submit_car_insurance_lead
 
 PAYLOAD_PATH = Path("data/payloads/lead_forms/car_insurance_request.json")
 
@@ -33,4 +33,12 @@ def test_submit_car_insurance_lead(api_client, validator):
     assert isinstance(response, dict)
 
 
-   
+@pytest.mark.lead_forms
+@pytest.mark.requires_auth
+def test_car_insurance_pipeline(api_client, validator):
+    report = run_lead_pipeline(api_client, validator, "insurance")
+
+    print("[Insurance] Pipeline stages:", report["stages"], "skipped:", report["skipped"])
+    assert isinstance(report["results"]["submit"], dict)
+    # Packages need vehicle params; without them the stage is skipped, not failed.
+    assert "packages" in report["results"] or "packages" in report["skipped"]
@@ -5,6 +5,7 @@ from pathlib import Path
 import pytest
 
 from helpers import (
+    run_lead_pipeline,
     submit_car_registration_transfer_lead,
     update_car_registration_transfer_lead,
 )
@@ -63,3 +64,16 @@ def test_submit_car_registration_transfer_lead(api_client, validator):
         assert update_response.get("success") == expected_update.get("success")
         assert update_response.get("error") == expected_update.get("error")
         assert update_response.get("mobile_verified") == expected_update.get("mobile_verified")
+
+
+@pytest.mark.lead_forms
+@pytest.mark.requires_auth
+def test_car_registration_transfer_pipeline(api_client, validator):
+    report = run_lead_pipeline(api_client, validator, "registration")
+
+    results = report["results"]
+    assert results["submit"].get("car_registration_transfer_lead_id")
+    assert isinstance(results["update"], dict)
+    if UPDATE_EXPECTED_PATH.exists():
+        expected_update = json.loads(UPDATE_EXPECTED_PATH.read_text(encoding="utf-8"))
+        assert results["update"].get("success") == expected_update.get("success")
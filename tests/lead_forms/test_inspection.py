@@ -13,6 +13,7 @@ from helpers import (
     proceed_checkout,
     initiate_jazz_cash,
     payment_status,
+    run_lead_pipeline,
 )
 
 CITY_ID_ENV = "CARSURE_CITY_ID"
@@ -33,7 +34,8 @@ def test_carsure_full_flow(api_client, validator):
         pytest.skip("API client does not have an access token.")
 
     print("\n[LeadForms] Step 1: Fetching Carsure cities")
-    cities_response = fetch_carsure_cities(api_client, validator, access_token=access_token)
+    # refresh=True: this flow checks the endpoints themselves, not the shared cache.
+    cities_response = fetch_carsure_cities(api_client, validator, access_token=access_token, refresh=True)
     cities = cities_response.get("carsure_cities") or []
     print(f"[LeadForms] Found {len(cities)} cities")
 
@@ -53,6 +55,7 @@ def test_carsure_full_flow(api_client, validator):
         access_token=access_token,
         city_id=city_id,
         city_areas_type="inspection",
+        refresh=True,
     )
     popular_areas = areas_response.get("popular") or []
     other_areas = areas_response.get("other") or []
@@ -156,3 +159,24 @@ def test_carsure_full_flow(api_client, validator):
     status_response = payment_status(api_client, payment_id)
     validator.assert_status_code(status_response["status_code"], 200)
     print("[LeadForms] Payment status response:", status_response.get("json") or {})
+
+
+@pytest.mark.lead_forms
+@pytest.mark.requires_auth
+def test_carsure_pipeline(api_client, validator):
+    access_token = getattr(api_client, "access_token", None)
+    if not access_token:
+        pytest.skip("API client does not have an access token.")
+
+    inputs = {"payment_method_id": int(os.getenv("CARSURE_PAYMENT_METHOD_ID") or 107)}
+    if os.getenv(CITY_ID_ENV):
+        inputs["city_id"] = int(os.getenv(CITY_ID_ENV))
+    report = run_lead_pipeline(api_client, validator, "inspection", inputs=inputs)
+
+    results = report["results"]
+    assert "carsure_cities" in results["cities"]
+    assert all("popular" in areas for areas in results["areas"].values())
+    assert results["submit"].get("carsure_ticket_id")
+    assert "update" in results or "update" in report["skipped"]
+    if "checkout" in results:
+        assert results["checkout"].get("payment_id") or results["checkout"].get("paymentId")
@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+from helpers import LeadPayloadGenerator, run_lead_load
+
+
+@pytest.mark.lead_forms
+@pytest.mark.requires_auth
+def test_lead_load_smoke(api_client, validator):
+    count = int(os.getenv("LEAD_LOAD_RECORDS", "0"))
+    if count <= 0:
+        pytest.skip("Set LEAD_LOAD_RECORDS to run the lead load driver (it creates real leads).")
+    if not getattr(api_client, "access_token", None):
+        pytest.skip("API client does not have an access token.")
+
+    generator = LeadPayloadGenerator(update_fraction=float(os.getenv("LEAD_LOAD_UPDATE_FRACTION", "0.5")))
+    report = run_lead_load([api_client], validator, generator.stream(count))
+
+    print("[LeadLoad] Report:", report)
+    assert report["submitted"] + report["dropped"] == count
+    max_error_rate = float(os.getenv("LEAD_LOAD_MAX_ERROR_RATE", "0.05"))
+    for product, summary in report["products"].items():
+        assert summary["error_rate"] <= max_error_rate, f"{product}: {summary['sample_errors']}"
@@ -7,6 +7,7 @@ from helpers import (
     fetch_sell_it_for_me_city_areas,
     submit_sell_it_for_me_lead,
     update_sell_it_for_me_lead,
+    run_lead_pipeline,
 )
 
 SIFM_SCHEMA_PATH = "schemas/sifm/cities.json"
@@ -26,6 +27,7 @@ def test_fetch_sifm_cities(api_client, validator):
         validator,
         access_token=access_token,
         schema_path=SIFM_SCHEMA_PATH,
+        refresh=True,
     )
 
     assert "sell_it_for_me_cities" in response
@@ -46,6 +48,7 @@ def test_fetch_sifm_city_areas(api_client, validator):
         access_token=access_token,
         city_id=city_id,
         schema_path=SIFM_CITY_AREAS_SCHEMA_PATH,
+        refresh=True,
     )
 
     assert "popular" in response
@@ -121,3 +124,23 @@ def test_update_sifm_lead(api_client, validator):
 
     assert update_response.get("sell_it_for_me_lead_id") == lead_id
     assert update_response.get("mobile") == lead_mobile
+
+
+@pytest.mark.sifm
+def test_sifm_pipeline(api_client, validator):
+    access_token = getattr(api_client, "access_token", None)
+    if not access_token:
+        pytest.skip("API client does not have an access token.")
+
+    report = run_lead_pipeline(
+        api_client,
+        validator,
+        "sifm",
+        inputs={"city_id": int(os.getenv("SIFM_CITY_ID", "1"))},
+    )
+
+    results = report["results"]
+    assert "sell_it_for_me_cities" in results["cities"]
+    assert all("popular" in areas for areas in results["areas"].values())
+    assert results["submit"].get("sell_it_for_me_lead_id")
+    assert "update" in results or "update" in report["skipped"]
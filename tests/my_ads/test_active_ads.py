@@ -1,6 +1,6 @@
 import pytest
 
-from helpers import fetch_my_active_ads, fetch_my_pending_ads, fetch_my_removed_ads
+from helpers import build_my_ads_index, fetch_my_active_ads, fetch_my_pending_ads, fetch_my_removed_ads
 
 ACTIVE_SNAPSHOT_PATH = "data/expected_responses/my_ads/active_ads.json"
 ACTIVE_SCHEMA_PATH = "schemas/my_ads/active_ads_schema.json"
@@ -66,3 +66,24 @@ def test_fetch_my_pending_ads(api_client, validator):
 
     assert response.get("resultCount") is not None
     assert isinstance(response.get("ads"), list)
+
+
+@pytest.mark.my_ads
+@pytest.mark.requires_auth
+def test_my_ads_index_covers_removed_list(api_client, validator):
+    access_token = getattr(api_client, "access_token", None)
+    if not access_token:
+        pytest.skip("API client does not have an access token.")
+
+    index = build_my_ads_index(api_client)
+    removed = fetch_my_removed_ads(
+        api_client,
+        validator,
+        access_token=access_token,
+        schema_path=REMOVED_SCHEMA_PATH,
+        expected_path=REMOVED_SNAPSHOT_PATH,
+    )
+
+    for ad in removed.get("ads") or []:
+        assert "st_removed" in index.states_of(ad["urlSlug"]), f"Removed ad {ad['urlSlug']} missing from my-ads index"
+        assert "st_removed" in index.states_of((ad["type"], ad["id"]))
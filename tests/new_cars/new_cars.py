@@ -1,3 +1,5 @@
+import os
+
 import pytest
 
 from helpers import (
@@ -6,6 +8,8 @@ from helpers import (
     fetch_new_model_details,
     fetch_new_version_details,
 )
+from helpers.new_cars_crawler import crawl_new_cars_catalogue
+from utils.merkle import MerkleStore
 
 MAKE_SCHEMA_PATH = "schemas/new_cars/make_catalogue.json"
 COROLLA_MODEL_SCHEMA_PATH = "schemas/new_cars/corolla.json"
@@ -54,3 +58,14 @@ def test_get_toyota_corolla_version_details(api_client, validator):
     )
     assert response.get("version_id") == 3105
     assert response.get("version_name") == "Toyota Corolla XLi Automatic"
+
+
+@pytest.mark.new_cars
+def test_crawl_new_cars_catalogue(api_client, validator):
+    max_makes = int(os.getenv("NEW_CARS_CRAWL_MAX_MAKES", "2")) or None
+    # Pages unchanged since the last run skip schema validation; changed ones list their paths.
+    report = crawl_new_cars_catalogue(api_client, validator, max_makes=max_makes, hash_store=MerkleStore())
+    print("Per-level latency:", report["latency"])
+    print("Changed pages:", sorted(report["changes"]))
+    assert report["counts"]["make"] > 0, "Crawler found no makes in all_car_make_models"
+    assert not report["errors"], f"New-cars pages failed: {report['errors']}"
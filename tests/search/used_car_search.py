@@ -4,6 +4,10 @@ from helpers.search import (
     search_request,
     validate_filters_applied
 )
+from helpers.search_index import (
+    assert_search_counts_consistent,
+    crawl_search_index,
+)
 
 pytestmark = pytest.mark.parametrize(
     "api_client",
@@ -30,3 +34,16 @@ pytestmark = pytest.mark.parametrize(
 def test_search(api_client, validator, endpoint):
     resp = search_request(api_client, validator, endpoint)
     validate_filters_applied(resp,endpoint)
+
+
+
+@pytest.mark.parametrize(
+    "endpoint",
+    [
+        "/used-cars/search/-/ct_lahore/tr_automatic.json",
+        "/used-cars/search/-/mk_toyota/md_corolla/ct_karachi/tr_automatic.json",
+    ],
+)
+def test_search_facet_counts(api_client, validator, endpoint):
+    index = crawl_search_index(api_client, validator, endpoint)
+    assert_search_counts_consistent(index)
@@ -50,7 +50,8 @@ class APIClient:
         return {
             "status_code": resp.status_code,
             "json": json_data,
-            "elapsed": elapsed
+            "elapsed": elapsed,
+            "response": resp,
         }
 
     def env_params(self, env_var: str):
@@ -0,0 +1,157 @@
+# utils/merkle.py
+"""
+Merkle-style hashing of JSON documents.
+
+Every object key and list item gets a hash built from its children's hashes,
+so two documents can be compared root-first. If the roots match, nothing
+changed. Otherwise only subtrees whose hashes differ are descended into, which
+yields a precise list of changed paths without deep-diffing the rest.
+
+``MerkleStore`` persists trees between runs (``CATALOGUE_HASH_DIR``, default
+``.cache/catalogue_hashes``). ``check(name, document)`` reports whether the
+document changed since the last saved tree, and how.
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+HASH_DIR = Path(os.getenv("CATALOGUE_HASH_DIR", ".cache/catalogue_hashes"))
+# Trees keep child hashes down to this depth; deeper changes are reported at it.
+MAX_DEPTH = int(os.getenv("MERKLE_MAX_DEPTH", "6"))
+
+
+def _combine(kind, items):
+    digest = hashlib.sha256(kind)
+    for label, child_hash in items:
+        digest.update(label.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(child_hash.encode("ascii"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:32]
+
+
+def _node(value, depth, max_depth):
+    """Return ``(hash, children)``; children is None for scalars or below ``max_depth``."""
+    if isinstance(value, dict):
+        nodes = {str(k): _node(v, depth + 1, max_depth) for k, v in value.items()}
+        node_hash = _combine(b"{", sorted((k, n[0]) for k, n in nodes.items()))
+    elif isinstance(value, list):
+        nodes = {f"[{i}]": _node(v, depth + 1, max_depth) for i, v in enumerate(value)}
+        node_hash = _combine(b"[", [(k, n[0]) for k, n in nodes.items()])
+    else:
+        encoded = json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        return hashlib.sha256(b"=" + encoded).hexdigest()[:32], None
+
+    if max_depth is not None and depth >= max_depth:
+        return node_hash, None
+    return node_hash, nodes
+
+
+def _to_tree(node):
+    node_hash, children = node
+    tree = {"h": node_hash}
+    if children is not None:
+        tree["c"] = {k: _to_tree(child) for k, child in children.items()}
+    return tree
+
+
+def subtree_hash(value):
+    """Hash of a JSON value (equal values always hash equal)."""
+    return _node(value, 0, 0)[0]
+
+
+def combine_object_hashes(key_hashes):
+    """Root hash of an object from its top-level ``{key: subtree_hash}``."""
+    return _combine(b"{", sorted(key_hashes.items()))
+
+
+def merkle_tree(value, max_depth=MAX_DEPTH):
+    """``{"h": hash, "c": {child_label: subtree}}`` down to ``max_depth``."""
+    return _to_tree(_node(value, 0, max_depth))
+
+
+def _join(path, label):
+    if label.startswith("["):
+        return f"{path}{label}"
+    return f"{path}.{label}" if path else label
+
+
+def diff_merkle(old, new, path=""):
+    """
+    Compare two trees root-first.
+
+    Returns ``{"changed": [...], "added": [...], "removed": [...]}`` of paths;
+    subtrees with equal hashes are never visited.
+    """
+    delta = {"changed": [], "added": [], "removed": []}
+    if old["h"] == new["h"]:
+        return delta
+    old_children, new_children = old.get("c"), new.get("c")
+    if old_children is None or new_children is None:
+        delta["changed"].append(path or "<root>")
+        return delta
+
+    for label, child in new_children.items():
+        child_path = _join(path, label)
+        if label not in old_children:
+            delta["added"].append(child_path)
+            continue
+        sub = diff_merkle(old_children[label], child, child_path)
+        for kind in delta:
+            delta[kind].extend(sub[kind])
+    delta["removed"].extend(_join(path, label) for label in old_children if label not in new_children)
+    return delta
+
+
+class MerkleStore:
+    """Persisted Merkle trees, one JSON file per document name."""
+
+    def __init__(self, root=HASH_DIR, max_depth=MAX_DEPTH):
+        self.root = Path(root)
+        self.max_depth = max_depth
+
+    def _path(self, name):
+        return self.root / f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', name)}.json"
+
+    def load(self, name):
+        path = self._path(name)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, name, tree):
+        path = self._path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(tree, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def check(self, name, document, save=True):
+        """
+        Compare ``document`` with the tree saved under ``name``.
+
+        Returns ``{"unchanged", "first_run", "root", "delta", "tree"}``; ``delta``
+        is None when unchanged or on the first run. The new tree is saved
+        unless ``save`` is False (e.g. to save only after validation passes).
+        """
+        tree = merkle_tree(document, self.max_depth)
+        previous = self.load(name)
+        unchanged = previous is not None and previous.get("h") == tree["h"]
+        delta = None if unchanged or previous is None else diff_merkle(previous, tree)
+        if save and not unchanged:
+            self.save(name, tree)
+        return {
+            "unchanged": unchanged,
+            "first_run": previous is None,
+            "root": tree["h"],
+            "delta": delta,
+            "tree": tree,
+        }
@@ -0,0 +1,151 @@
+# utils/snapshot_shards.py
+"""
+Sharded expected-response snapshots.
+
+Large snapshots (e.g. new-cars model pages) are stored as a directory next to
+the original file, ``<name>.shards/``, holding ``index.json`` plus one file per
+large top-level key. Small values stay inline in the index. ``load_snapshot``
+returns a read-only mapping that reads a shard only when its key is accessed
+and, by default, does not keep it. A subset comparison therefore holds at most
+one shard in memory at a time, and checking a few keys reads only their shards.
+The index also records Merkle hashes (``utils.merkle``) of the whole snapshot
+and of each sharded key, so unchanged subtrees can be skipped without reading them.
+
+Convert a monolithic snapshot with ``python -m utils.snapshot_shards <file.json>``.
+"""
+
+import json
+import re
+import sys
+from collections.abc import Mapping
+from pathlib import Path
+
+from utils.merkle import combine_object_hashes, subtree_hash
+
+SHARD_SUFFIX = ".shards"
+INDEX_FILE = "index.json"
+# Values whose JSON is smaller than this stay inline in the index.
+INLINE_MAX_BYTES = 512
+
+
+def shard_dir_for(path):
+    """``foo/corolla.json`` -> ``foo/corolla.shards``."""
+    path = Path(path)
+    if path.suffix == SHARD_SUFFIX:
+        return path
+    return path.with_suffix(SHARD_SUFFIX)
+
+
+def snapshot_exists(path):
+    """True when either the monolithic file or its shard directory exists."""
+    path = Path(path)
+    return path.exists() or (shard_dir_for(path) / INDEX_FILE).exists()
+
+
+class ShardedSnapshot(Mapping):
+    """Lazy, read-only view of a sharded snapshot's top-level keys."""
+
+    def __init__(self, shard_dir, cache=False):
+        self.shard_dir = Path(shard_dir)
+        with open(self.shard_dir / INDEX_FILE, "r", encoding="utf-8") as f:
+            self.index = json.load(f)
+        self._keys = self.index["keys"]
+        self._cache = {} if cache else None
+        self.shards_loaded = 0
+
+    @property
+    def root_hash(self):
+        """Merkle root of the whole snapshot (None for indexes written without hashes)."""
+        return self.index.get("root")
+
+    def key_hash(self, key):
+        """Subtree hash of ``key`` without reading its shard."""
+        entry = self._keys[key]
+        if "hash" in entry:
+            return entry["hash"]
+        return subtree_hash(entry["value"]) if "value" in entry else None
+
+    def __getitem__(self, key):
+        entry = self._keys[key]
+        if "value" in entry:
+            return entry["value"]
+        if self._cache is not None and key in self._cache:
+            return self._cache[key]
+        with open(self.shard_dir / entry["file"], "r", encoding="utf-8") as f:
+            value = json.load(f)
+        self.shards_loaded += 1
+        if self._cache is not None:
+            self._cache[key] = value
+        return value
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+def load_snapshot(path, cache=False):
+    """
+    Load an expected-response snapshot.
+
+    Returns a ``ShardedSnapshot`` when ``path`` (or ``path``'s ``.shards``
+    sibling) is sharded, otherwise the parsed JSON file.
+    """
+    shard_dir = shard_dir_for(path)
+    if (shard_dir / INDEX_FILE).exists():
+        return ShardedSnapshot(shard_dir, cache=cache)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _shard_name(key, used):
+    base = re.sub(r"[^A-Za-z0-9_-]+", "_", key) or "key"
+    name, n = base, 1
+    while name.lower() in used:
+        n += 1
+        name = f"{base}_{n}"
+    used.add(name.lower())
+    return f"{name}.json"
+
+
+def write_sharded_snapshot(data, shard_dir, inline_max_bytes=INLINE_MAX_BYTES):
+    """Write a top-level dict as ``index.json`` plus one shard per large key."""
+    if not isinstance(data, dict):
+        raise ValueError("Only object snapshots can be sharded")
+    shard_dir = Path(shard_dir)
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    keys, used = {}, set()
+    for key, value in data.items():
+        encoded = json.dumps(value, indent=4, ensure_ascii=False)
+        if len(encoded.encode("utf-8")) < inline_max_bytes:
+            keys[key] = {"value": value}
+            continue
+        file_name = _shard_name(key, used)
+        with open(shard_dir / file_name, "w", encoding="utf-8") as f:
+            f.write(encoded + "\n")
+        keys[key] = {"file": file_name, "hash": subtree_hash(value)}
+
+    key_hashes = {key: entry.get("hash") or subtree_hash(entry["value"]) for key, entry in keys.items()}
+    index = {"format": 1, "root": combine_object_hashes(key_hashes), "keys": keys}
+    with open(shard_dir / INDEX_FILE, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=4, ensure_ascii=False)
+        f.write("\n")
+    return shard_dir
+
+
+def shard_snapshot_file(path, remove_source=True):
+    """Convert a monolithic ``*.json`` snapshot into its ``.shards`` directory."""
+    path = Path(path)
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    shard_dir = write_sharded_snapshot(data, shard_dir_for(path))
+    if remove_source:
+        path.unlink()
+    return shard_dir
+
+
+if __name__ == "__main__":
+    for arg in sys.argv[1:]:
+        print(f"Sharded {arg} -> {shard_snapshot_file(arg)}")
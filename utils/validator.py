@@ -1,8 +1,32 @@
 # utils/validator.py
 import json
 import os
+from collections.abc import Mapping
 from jsonschema import validate, ValidationError
 
+from utils.merkle import combine_object_hashes, subtree_hash
+from utils.snapshot_shards import ShardedSnapshot, load_snapshot
+
+
+class _KeySubset(Mapping):
+    """Lazy view of ``keys`` of a snapshot; sharded values are still read one at a time."""
+
+    def __init__(self, data, keys):
+        self._data = data
+        self._keys = [k for k in keys if k in data]
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+
 class Validator:
     def assert_status_code(self, status_code, expected=200):
         assert status_code == expected, f"Expected {expected}, got {status_code}"
@@ -23,15 +47,31 @@ class Validator:
         except ValidationError as e:
             raise AssertionError(f"Schema validation failed: {e.message}")
 
-    def compare_with_expected(self, actual_data, expected_path):
+    def compare_with_expected(self, actual_data, expected_path, keys=None):
         """
         Deep subset comparison:
         - Every key/value in `expected` must be present (and equal) in `actual`
         - `actual` can have extra fields
         - Common volatile/dynamic keys are ignored anywhere in the tree
+        - Sharded snapshots are read shard by shard; `keys` limits the
+          comparison (and the shards read) to those top-level keys
         """
-        with open(expected_path, "r", encoding="utf-8") as f:
-            expected_data = json.load(f)
+        expected_data = load_snapshot(expected_path)
+        if isinstance(expected_data, ShardedSnapshot) and expected_data.root_hash and isinstance(actual_data, dict):
+            # Merkle fast path: identical subtrees satisfy the subset check, so
+            # only keys whose hashes differ are read and diffed.
+            wanted = list(expected_data) if keys is None else [k for k in keys if k in expected_data]
+            if keys is None and set(wanted) == set(actual_data):
+                actual_hashes = {k: subtree_hash(v) for k, v in actual_data.items()}
+                if combine_object_hashes(actual_hashes) == expected_data.root_hash:
+                    print("✅ Response matches expected snapshot (identical Merkle root).")
+                    return
+            keys = [
+                k for k in wanted
+                if k not in actual_data or subtree_hash(actual_data[k]) != expected_data.key_hash(k)
+            ]
+        if keys is not None:
+            expected_data = _KeySubset(expected_data, keys)
 
         ignore_keys = {
             # top-level ids & volatile fields
@@ -59,7 +99,7 @@ class Validator:
             if key_name in ignore_keys:
                 return mismatches, missing
 
-            if isinstance(expected, dict):
+            if isinstance(expected, Mapping):
                 if not isinstance(actual, dict):
                     mismatches[path or "<root>"] = {"expected": expected, "actual": actual}
                     return mismatches, missing